@@ -3,37 +3,46 @@ from __future__ import annotations
 import argparse
 import json
 import re
+import time
 from pathlib import Path
 from textwrap import dedent
 from typing import List
 
-from neuravia.llm.base import LLMRequest
-from neuravia.llm.ollama import OllamaCLI
+from neuravia.config import load_settings
+from neuravia.llm.base import LLM, LLMRequest
+from neuravia.llm.budget import DEFAULT_NUM_CTX, Block, TokenBudget, fit_prompt
+from neuravia.llm.cache import CachedLLM, cached_from_settings
+from neuravia.llm.ollama import BACKENDS, OllamaCLI, ollama_from_settings
 from neuravia.memory.db import MemoryDB
+from neuravia.memory.dedupe import find_near_duplicates
+from neuravia.memory.goals import goal_variants, register_goal
+from neuravia.memory.retrieval import RETRIEVAL_MODES, with_neighbours
 
 DEFAULT_DB_PATH = Path("data/memory.db")
+# Régénérations maximum d'une étape quasi-identique à un step déjà mémorisé.
+DEDUPE_RETRIES = 2
+# "step" : un appel LLM par étape ; "batch" : toutes les étapes en un seul appel JSON.
+PLAN_MODES = ("step", "batch")
 
 
 # ---------------------------------------------------------------------------
 # Chargement de la mémoire "locale" (steps + reviews)
 # ---------------------------------------------------------------------------
 
-def _load_context(db: MemoryDB, goal: str, max_steps: int = 10, max_reviews: int = 5):
-    """Récupère les derniers steps et revues pour ce goal."""
-    all_steps = [
-        e for e in db.list_events(kind="agent_step", limit=200)
-        if e.get("message") == goal
-    ]
-    all_reviews = [
-        e for e in db.list_events(kind="agent_review", limit=50)
-        if e.get("message") == goal
-    ]
-
-    all_steps.sort(key=lambda e: e["id"])
-    all_reviews.sort(key=lambda e: e["id"])
-
-    steps_ctx = all_steps[-max_steps:]
-    reviews_ctx = all_reviews[-max_reviews:]
+def _load_context(db: MemoryDB, goal: str, max_steps: int = 10, max_reviews: int = 5, retrieval: str = "goal"):
+    """Récupère les derniers steps et revues pour ce goal (context pack goal_context).
+
+    Les reformulations du même goal (cluster de la table goals) sont fusionnées.
+    Avec retrieval="vector" ou "ann", les places libres sont complétées par des
+    steps/revues sémantiquement proches issus d'autres goals.
+    """
+    # context pack matérialisé (goal_context) : une lecture par clé et par variante, en cache
+    packs = [db.goal_context(g, max_steps=max_steps, max_reviews=max_reviews) for g in goal_variants(db, goal)]
+    steps_ctx = sorted((e for p in packs for e in p["steps"]), key=lambda e: e["id"])[-max_steps:]
+    reviews_ctx = sorted((e for p in packs for e in p["reviews"]), key=lambda e: e["id"])[-max_reviews:]
+
+    steps_ctx = with_neighbours(db, goal, steps_ctx, kind="agent_step", limit=max_steps, mode=retrieval)
+    reviews_ctx = with_neighbours(db, goal, reviews_ctx, kind="agent_review", limit=max_reviews, mode=retrieval)
     return steps_ctx, reviews_ctx
 
 
@@ -154,15 +163,12 @@ def _load_masterplan(db: MemoryDB, goal: str) -> Optional[Dict[str, Any]]:
         "notes": "..."
       }
     """
-    plans = [
-        e for e in db.list_events(kind="agent_masterplan", limit=20)
-        if e.get("message") == goal
-    ]
+    plans = [p for g in goal_variants(db, goal) if (p := db.goal_context(g)["masterplan"]) is not None]
     if not plans:
         return None
 
-    plans.sort(key=lambda e: e["id"])
-    latest = plans[-1]
+    latest = max(plans, key=lambda e: e["id"])
+
     data = latest.get("data") or {}
 
     # on normalise un peu pour être sûr
@@ -225,24 +231,8 @@ def _masterplan_block(masterplan: Optional[Dict[str, Any]]) -> str:
 # Construction des prompts d'étapes
 # ---------------------------------------------------------------------------
 
-def _build_step_prompt(
-    goal: str,
-    step_index: int,
-    max_steps: int,
-    run_steps: List[str],
-    mem_steps,
-    mem_reviews,
-    masterplan: dict | None = None,
-) -> str:
-    """Construit le prompt pour une étape de planification, en intégrant la mémoire ET le master-plan."""
-
-    # --- Contexte du run en cours ---
-    if run_steps:
-        run_block = "\n".join(
-            f"- Étape {i+1}: {s}" for i, s in enumerate(run_steps)
-        )
-    else:
-        run_block = "(aucune étape encore dans ce run)"
+def _context_blocks(goal: str, mem_steps, mem_reviews, masterplan: dict | None) -> tuple[str, str, str]:
+    """Blocs texte (master-plan, anciens steps, revues) communs aux prompts d'étape et de plan."""
 
     # --- Contexte des anciens steps mémorisés ---
     mem_steps_block_lines: list[str] = []
@@ -304,11 +294,41 @@ def _build_step_prompt(
     else:
         masterplan_block = "(aucun master-plan enregistré pour cet objectif)"
 
-    prompt = f"""
+    return masterplan_block, mem_steps_block, mem_reviews_block
+
+
+def _build_step_prompt(
+    goal: str,
+    step_index: int,
+    max_steps: int,
+    run_steps: List[str],
+    mem_steps,
+    mem_reviews,
+    masterplan: dict | None = None,
+    budget: TokenBudget | None = None,
+) -> str:
+    """Construit le prompt pour une étape de planification, en intégrant la mémoire ET le master-plan.
+
+    Avec un budget, les blocs sont réduits (revues, puis anciens steps, puis
+    étapes du run...) pour que le prompt tienne dans num_ctx.
+    """
+
+    # --- Contexte du run en cours ---
+    if run_steps:
+        run_block = "\n".join(
+            f"- Étape {i+1}: {s}" for i, s in enumerate(run_steps)
+        )
+    else:
+        run_block = "(aucune étape encore dans ce run)"
+
+    masterplan_block, mem_steps_block, mem_reviews_block = _context_blocks(goal, mem_steps, mem_reviews, masterplan)
+
+    def render(goal_text: str, masterplan_block: str, run_block: str, mem_steps_block: str, mem_reviews_block: str) -> str:
+        prompt = f"""
 Tu es un agent autonome de planification qui construit des plans en plusieurs étapes NUMÉROTÉES pour atteindre un objectif.
 
 OBJECTIF GLOBAL :
-{goal}
+{goal_text}
 
 MASTER-PLAN GLOBAL ACTUEL (phase 12) :
 {masterplan_block}
@@ -341,8 +361,79 @@ RÉSULTAT ATTENDU: <ce que cette étape permet d'obtenir ou de sécuriser>
 
 Ne rajoute rien en dehors de ces trois lignes.
 """
-    return dedent(prompt).strip()
+        return dedent(prompt).strip()
+
+    return fit_prompt(render, [
+        Block("goal_text", goal, priority=100, quota=0.15),
+        Block("masterplan_block", masterplan_block, priority=80, quota=0.35),
+        Block("run_block", run_block, priority=70, keep="tail"),
+        Block("mem_steps_block", mem_steps_block, priority=40, keep="tail"),
+        Block("mem_reviews_block", mem_reviews_block, priority=30, keep="tail"),
+    ], budget)
+
+
+
+def _build_plan_prompt(
+    goal: str,
+    max_steps: int,
+    mem_steps,
+    mem_reviews,
+    masterplan: dict | None = None,
+    budget: TokenBudget | None = None,
+) -> str:
+    """Prompt du mode batch : toutes les étapes du run en un seul appel, en JSON."""
+    masterplan_block, mem_steps_block, mem_reviews_block = _context_blocks(goal, mem_steps, mem_reviews, masterplan)
+
+    def render(goal_text: str, masterplan_block: str, mem_steps_block: str, mem_reviews_block: str) -> str:
+        prompt = f"""
+Tu es un agent autonome de planification qui construit des plans en plusieurs étapes NUMÉROTÉES pour atteindre un objectif.
+
+OBJECTIF GLOBAL :
+{goal_text}
+
+MASTER-PLAN GLOBAL ACTUEL (phase 12) :
+{masterplan_block}
+
+Tu dois produire en une seule fois les {max_steps} étapes de CE RUN.
+
+Règles importantes :
+- Chaque étape doit être CONCRÈTE et ACTIONNABLE (ce que tu fais, configures ou décides).
+- Les étapes doivent être COMPLÉMENTAIRES : pas de redite, pas de paraphrase.
+- Elles doivent rester COHÉRENTES avec la trajectoire globale du master-plan ci-dessus.
+- Tu dois tirer parti des tentatives précédentes et de leurs critiques pour améliorer ce plan.
+- Ne réécris pas mot pour mot une ancienne étape.
+- Si l'objectif mentionne plusieurs aspects, couvre-les tous au fil des {max_steps} étapes.
+
+Exemples d'étapes issues de runs précédents (à NE PAS répéter telles quelles) :
+{mem_steps_block}
+
+Synthèse des revues précédentes :
+{mem_reviews_block}
+
+FORMAT DE SORTIE OBLIGATOIRE (JSON UNIQUEMENT, en français) :
+
+{{
+  "steps": [
+    {{
+      "title": "<un très court résumé de l'étape>",
+      "action": "<ce que tu fais concrètement, phrase ou deux maximum>",
+      "expected_result": "<ce que cette étape permet d'obtenir ou de sécuriser>"
+    }}
+  ]
+}}
+
+Règles de format :
+- Exactement {max_steps} objets dans "steps", dans l'ordre d'exécution.
+- Ne rajoute AUCUN texte avant ou après le JSON ; doubles guillemets uniquement.
+"""
+        return dedent(prompt).strip()
 
+    return fit_prompt(render, [
+        Block("goal_text", goal, priority=100, quota=0.15),
+        Block("masterplan_block", masterplan_block, priority=80, quota=0.35),
+        Block("mem_steps_block", mem_steps_block, priority=40, keep="tail"),
+        Block("mem_reviews_block", mem_reviews_block, priority=30, keep="tail"),
+    ], budget)
 
 
 # ---------------------------------------------------------------------------
@@ -564,16 +655,200 @@ def _parse_step_output(text: str) -> dict:
     }
 
 
+def _iter_plan_steps(text: str):
+    """
+    Parse incrémental de la sortie du mode batch : objets du tableau "steps"
+    décodés un par un (json.raw_decode), dès qu'ils sont complets.
+
+    Un objet illisible donne None (sa place est gardée) et le parse reprend
+    à l'objet suivant ; une sortie tronquée s'arrête au dernier objet complet.
+    """
+    key = text.find('"steps"')
+    pos = text.find("[", key if key >= 0 else 0)
+    if pos < 0:
+        return
+    decoder = json.JSONDecoder()
+    pos += 1
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] == "]":
+            return
+        try:
+            obj, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            nxt = text.find("{", pos + 1)
+            if nxt < 0:
+                return
+            yield None
+            pos = nxt
+            continue
+        yield obj
+
+
+def _plan_step(obj) -> dict | None:
+    """Étape du mode batch au format de _parse_step_output(), None si inexploitable."""
+    if not isinstance(obj, dict):
+        return None
+    action = obj.get("action")
+    if not isinstance(action, str) or not action.strip():
+        return None
+    title = obj.get("title")
+    expected = obj.get("expected_result")
+    return {
+        "title": (title.strip() if isinstance(title, str) else "") or "Étape planifiée",
+        "action": action.strip(),
+        "expected_result": expected.strip() if isinstance(expected, str) and expected.strip() else None,
+        "raw": json.dumps(obj, ensure_ascii=False),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Génération d'une étape (avec rejet des quasi-doublons)
+# ---------------------------------------------------------------------------
+
+class _TimedLLM:
+    """Enveloppe un LLM pour compter les appels et le temps passé à générer."""
+
+    def __init__(self, llm: LLM):
+        self.llm = llm
+        self.calls = 0
+        self.seconds = 0.0
+
+    def generate(self, req: LLMRequest) -> str:
+        t0 = time.perf_counter()
+        try:
+            return self.llm.generate(req)
+        finally:
+            self.calls += 1
+            self.seconds += time.perf_counter() - t0
+
+    def stream(self, req: LLMRequest):
+        t0 = time.perf_counter()
+        stream = self.llm.stream(req)
+        try:
+            yield from stream
+        finally:
+            stream.close()
+            self.calls += 1
+            self.seconds += time.perf_counter() - t0
+
+
+_ACTION_LINE_RE = re.compile(r"^\W*action\W*:", re.IGNORECASE | re.MULTILINE)
+_RESULT_LINE_RE = re.compile(r"^\W*r[ée]sultat attendu\W*:[^\n]*\S[^\n]*\n", re.IGNORECASE | re.MULTILINE)
+
+
+def _step_complete(text: str) -> bool:
+    """Vrai dès que ACTION puis une ligne RÉSULTAT ATTENDU terminée sont sortis (arrêt anticipé)."""
+    result = _RESULT_LINE_RE.search(text)
+    action = _ACTION_LINE_RE.search(text)
+    return bool(result and action and action.start() < result.start())
+
+
+def _plan_complete(max_steps: int):
+    """Arrêt anticipé du mode batch : max_steps objets complets dans "steps"."""
+    def done(text: str) -> bool:
+        return "}" in text[-8:] and sum(1 for _ in zip(range(max_steps), _iter_plan_steps(text))) >= max_steps
+    return done
+
+
+def _stream_text(llm, req: LLMRequest, *, done=None, echo: bool = True) -> str:
+    """
+    Consomme llm.stream(req) en affichant chaque morceau dès réception ;
+    la génération est interrompue dès que done(texte reçu) est vrai.
+    """
+    parts: list[str] = []
+    stream = llm.stream(req)
+    try:
+        for chunk in stream:
+            parts.append(chunk)
+            if echo:
+                print(chunk, end="", flush=True)
+            if done is not None and done("".join(parts)):
+                break
+    finally:
+        stream.close()
+    if echo:
+        print()
+    return "".join(parts)
+
+
+def _generate_step(
+    llm, db: MemoryDB, prompt: str, goals: List[str], *, retries: int = DEDUPE_RETRIES, stream: bool = False,
+    temperature: float = LLMRequest.temperature,
+) -> dict:
+    """
+    Génère et parse une étape ; si elle paraphrase un step déjà mémorisé pour
+    ce goal (runs précédents ou run en cours), on la régénère en signalant au
+    modèle l'étape à éviter, au plus `retries` fois.
+
+    Avec stream=True, la sortie s'affiche au fil de l'eau et la génération
+    s'arrête dès que TITRE / ACTION / RÉSULTAT ATTENDU sont complets.
+
+    La dernière proposition est gardée dans tous les cas ; si elle reste un
+    quasi-doublon, parsed["duplicate_of"] contient l'id du step le plus proche.
+    """
+    def generate(p: str) -> str:
+        if stream:
+            return _stream_text(llm, LLMRequest(prompt=p, temperature=temperature), done=_step_complete)
+        return llm.generate(LLMRequest(prompt=p, temperature=temperature))
+
+    parsed = _parse_step_output(generate(prompt))
+    for attempt in range(retries + 1):
+        dups = find_near_duplicates(db, parsed["action"] or parsed["raw"], goal=goals, limit=1)
+        if not dups:
+            return parsed
+        event, score = dups[0]
+        parsed["duplicate_of"] = event.id
+        if attempt == retries:
+            break
+        previous = parsed["action"] or parsed["raw"]
+        print(f"[dedupe] étape trop proche du step #{event.id} (similarité {score:.2f}) : régénération")
+        retry_prompt = (
+            f"{prompt}\n\nATTENTION : ta proposition précédente « {previous} » reprend une étape déjà "
+            "planifiée. Propose une étape DIFFÉRENTE, au même format."
+        )
+        parsed = _parse_step_output(generate(retry_prompt))
+    return parsed
+
+
 # ---------------------------------------------------------------------------
 # Boucle principale
 # ---------------------------------------------------------------------------
 
-def run_agent(goal: str, model: str, max_steps: int, db_path: Path = DEFAULT_DB_PATH) -> None:
-    """Boucle principale de l'agent autonome."""
+def run_agent(
+    goal: str,
+    model: str,
+    max_steps: int,
+    db_path: Path = DEFAULT_DB_PATH,
+    *,
+    retrieval: str = "goal",
+    project: str | None = None,
+    dedupe_retries: int = DEDUPE_RETRIES,
+    plan_mode: str = "step",
+    llm: LLM | None = None,
+    num_ctx: int = DEFAULT_NUM_CTX,
+    stream: bool = True,
+    temperature: float = LLMRequest.temperature,
+) -> None:
+    """Boucle principale de l'agent autonome.
+
+    plan_mode="batch" demande toutes les étapes en un seul appel (JSON) ; les
+    étapes manquantes, illisibles ou quasi-dupliquées sont régénérées une à
+    une comme en mode "step". `llm` remplace le modèle Ollama (tests, autres backends).
+    Les prompts sont ajustés à la fenêtre de contexte num_ctx (voir llm/budget.py).
+    Avec stream=True, la sortie du modèle s'affiche au fil de l'eau.
+    `temperature` s'applique à tous les appels (0 = réponses reproductibles,
+    réutilisables par le cache LLM).
+    """
+    if plan_mode not in PLAN_MODES:
+        raise ValueError(f"plan_mode inconnu : {plan_mode!r} (attendu : {', '.join(PLAN_MODES)})")
+    started = time.perf_counter()
     db = MemoryDB(str(db_path))
+    register_goal(db, goal, project=project)
 
     # 1) Charger le contexte depuis la mémoire
-    mem_steps, mem_reviews = _load_context(db, goal)
+    mem_steps, mem_reviews = _load_context(db, goal, retrieval=retrieval)
 
     # 1.bis) Charger un éventuel master-plan
     masterplan = _load_masterplan(db, goal)
@@ -583,22 +858,50 @@ def run_agent(goal: str, model: str, max_steps: int, db_path: Path = DEFAULT_DB_
         _print_masterplan(masterplan)
 
     # 2) Préparer le LLM
-    llm = OllamaCLI(model)
+    llm = _TimedLLM(llm if llm is not None else OllamaCLI(model))
     run_steps: list[str] = []
+    goals = goal_variants(db, goal)
+
+    # 2.bis) Mode batch : un seul appel pour toutes les étapes
+    planned: list[dict | None] = []
+    if plan_mode == "batch":
+        plan_tokens = min(256 * max_steps, num_ctx // 2)
+        plan_prompt = _build_plan_prompt(
+            goal, max_steps, mem_steps, mem_reviews, masterplan,
+            budget=TokenBudget(num_ctx, reserve=plan_tokens),
+        )
+        plan_req = LLMRequest(prompt=plan_prompt, max_tokens=plan_tokens, temperature=temperature)
+        if stream:
+            print("=== PLAN (mode batch) ===")
+            out = _stream_text(llm, plan_req, done=_plan_complete(max_steps))
+        else:
+            out = llm.generate(plan_req)
+        for obj in _iter_plan_steps(out):
+            planned.append(_plan_step(obj))
+            if len(planned) >= max_steps:
+                break
 
     # 3) Génération des étapes
     for i in range(1, max_steps + 1):
-        prompt = _build_step_prompt(
-            goal=goal,
-            step_index=i,
-            max_steps=max_steps,
-            run_steps=run_steps,
-            mem_steps=mem_steps,
-            mem_reviews=mem_reviews,
-            masterplan=masterplan,
-        )
-        out = llm.generate(LLMRequest(prompt=prompt))
-        parsed = _parse_step_output(out)
+        parsed = planned[i - 1] if i <= len(planned) else None
+        if parsed is not None and find_near_duplicates(db, parsed["action"], goal=goals, limit=1):
+            parsed = None  # paraphrase d'un step mémorisé : régénérée à l'unité
+        if parsed is None:
+            prompt = _build_step_prompt(
+                goal=goal,
+                step_index=i,
+                max_steps=max_steps,
+                run_steps=run_steps,
+                mem_steps=mem_steps,
+                mem_reviews=mem_reviews,
+                masterplan=masterplan,
+                budget=TokenBudget(num_ctx, reserve=LLMRequest.max_tokens),
+            )
+            if stream:
+                print(f"--- étape {i} ---")
+            parsed = _generate_step(
+                llm, db, prompt, goals, retries=dedupe_retries, stream=stream, temperature=temperature
+            )
         step_text = parsed["action"] or parsed["raw"]
 
         print(f"[STEP {i}] {parsed['title']} — {parsed['action']}")
@@ -615,12 +918,19 @@ def run_agent(goal: str, model: str, max_steps: int, db_path: Path = DEFAULT_DB_
                 "action": parsed["action"],
                 "expected_result": parsed["expected_result"],
                 "raw": parsed["raw"],
+                **({"duplicate_of": parsed["duplicate_of"]} if "duplicate_of" in parsed else {}),
             },
         )
 
+    steps_seconds = time.perf_counter() - started
+
     # 4) Revue globale du run
-    review_prompt = _build_review_prompt(goal, run_steps)
-    review_raw = llm.generate(LLMRequest(prompt=review_prompt))
+    review_req = LLMRequest(prompt=_build_review_prompt(goal, run_steps), temperature=temperature)
+    if stream:
+        print("--- revue ---")
+        review_raw = _stream_text(llm, review_req)
+    else:
+        review_raw = llm.generate(review_req)
     summary, improvements = _parse_review_output(review_raw)
 
     print("\n=== REVUE DU RUN ENREGISTRÉE EN MÉMOIRE ===")
@@ -635,6 +945,13 @@ def run_agent(goal: str, model: str, max_steps: int, db_path: Path = DEFAULT_DB_
         review_data["summary"] = summary
     if improvements:
         review_data["improvements"] = improvements
+    review_data["timing"] = {
+        "plan_mode": plan_mode,
+        "llm_calls": llm.calls,
+        "llm_seconds": round(llm.seconds, 3),
+        "steps_seconds": round(steps_seconds, 3),
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
 
     db.add_event(
         kind="agent_review",
@@ -648,6 +965,11 @@ def run_agent(goal: str, model: str, max_steps: int, db_path: Path = DEFAULT_DB_
     for s in run_steps:
         print(s)
     print()
+    t = review_data["timing"]
+    print(
+        f"=== TEMPS (mode {plan_mode}) : {t['total_seconds']:.2f}s au total, "
+        f"étapes {t['steps_seconds']:.2f}s, {t['llm_calls']} appels LLM ({t['llm_seconds']:.2f}s) ==="
+    )
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -678,9 +1000,87 @@ def main(argv: list[str] | None = None) -> int:
         help="Chemin de la base SQLite de mémoire persistante.",
     )
 
+    parser.add_argument(
+        "--retrieval",
+        choices=RETRIEVAL_MODES,
+        default="goal",
+        help="Mémoire chargée : goal exact, + voisins sémantiques (vector: exact, ann: index IVF).",
+    )
+    parser.add_argument(
+        "--project",
+        default=None,
+        help="Projet auquel rattacher ce goal (regroupement des runs).",
+    )
+    parser.add_argument(
+        "--plan-mode",
+        choices=PLAN_MODES,
+        default="step",
+        help="step : un appel LLM par étape ; batch : toutes les étapes en un appel JSON (repli par étape).",
+    )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Attendre la réponse complète du modèle au lieu de l'afficher au fil de l'eau.",
+    )
+    parser.add_argument(
+        "--num-ctx",
+        type=int,
+        default=None,
+        help="Fenêtre de contexte du modèle en tokens (défaut : [llm] num_ctx de la config).",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=None,
+        help="Backend Ollama : cli (ollama run) ou http (API REST keep-alive) ; défaut : [llm] backend.",
+    )
+    parser.add_argument(
+        "--temperature",
+        type=float,
+        default=None,
+        help="Temperature des appels LLM (défaut : [llm] temperature ; 0 = réponses réutilisables par le cache).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignorer le cache disque des réponses LLM ([llm] cache_enabled).",
+    )
+    parser.add_argument("--config", default="config", help="Dossier de configuration (section [llm]).")
+    parser.add_argument("--profile", default="safe", help="Profil de configuration.")
+    parser.add_argument(
+        "--dedupe-retries",
+        type=int,
+        default=DEDUPE_RETRIES,
+        help="Régénérations max. d'une étape quasi-identique à un step mémorisé (0 = aucune).",
+    )
+
     args = parser.parse_args(argv)
+    cfg = load_settings(args.config, args.profile).llm
+    num_ctx = args.num_ctx or cfg.num_ctx
+    llm = cached_from_settings(
+        ollama_from_settings(args.model, cfg, backend=args.backend, num_ctx=num_ctx),
+        cfg,
+        db_path=args.memory_db,
+        bypass=args.no_cache,
+    )
 
-    run_agent(goal=args.goal, model=args.model, max_steps=args.max_steps, db_path=args.memory_db)
+    run_agent(
+        goal=args.goal,
+        model=args.model,
+        max_steps=args.max_steps,
+        db_path=args.memory_db,
+        retrieval=args.retrieval,
+        project=args.project,
+        dedupe_retries=args.dedupe_retries,
+        plan_mode=args.plan_mode,
+        num_ctx=num_ctx,
+        llm=llm,
+        stream=not args.no_stream,
+        temperature=cfg.temperature if args.temperature is None else args.temperature,
+    )
+    if isinstance(llm, CachedLLM):
+        print("=== CACHE LLM ===", llm.info())
+        llm.close()
     return 0
 
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 import argparse
+import sys
 from pathlib import Path
 from . import __version__
 from .config import load_settings
@@ -114,6 +115,12 @@ def build_parser() -> argparse.ArgumentParser:
 
 # === Main ====================================================================
 def main(argv: list[str] | None = None) -> int:
+    # Sous-commandes de maintenance mémoire : `neuravia memory <cmd> ...`
+    raw = list(sys.argv[1:] if argv is None else argv)
+    if raw[:1] == ["memory"]:
+        from .memory.cli import main as memory_main
+        return memory_main(raw[1:])
+
     ap = build_parser()
     args = ap.parse_args(argv)
 
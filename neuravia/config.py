@@ -42,11 +42,35 @@ class Modules:
 class LLM:
     local_enabled: bool = True
     remote_enabled: bool = False
+    # fenêtre de contexte (tokens) : les prompts agent / méta-agent sont ajustés à cette taille
+    num_ctx: int = 4096
+    # backend Ollama : "cli" (sous-processus 'ollama run') | "http" (API REST, connexion gardée)
+    backend: str = "cli"
+    ollama_host: str = ""          # vide = $OLLAMA_HOST ou http://127.0.0.1:11434
+    keep_alive: str = "5m"         # durée de maintien du modèle en mémoire côté serveur (backend http)
+    # temperature des appels de l'agent et du méta-agent (--temperature) ; 0 = déterministe, cacheable
+    temperature: float = 0.2
+    # cache disque des réponses (clé : modèle, prompt, temperature, max_tokens) ; --no-cache pour l'ignorer
+    cache_enabled: bool = False
+    cache_path: str = ""           # vide = llm_cache.db dans le dossier de la base mémoire
+    cache_ttl_hours: float = 168   # 0 = sans expiration
+    cache_max_entries: int = 5000  # éviction LRU au-delà (0 = sans limite)
+    cache_max_mb: float = 64
+    cache_max_temperature: float = 0.0  # requêtes plus aléatoires jamais mises en cache (0 = déterministes seulement)
 
 @dataclass
 class Memory:
     db_path: str = "data/memory.db"
     index_enabled: bool = False
+    # moteur de l'index texte : "simple" (BM25 maison) | "fts5" (SQLite FTS5)
+    index_engine: str = "simple"
+    # racinisation française légère de l'index "simple" (changer ce réglage réindexe)
+    index_stemming: bool = False
+    # indexe automatiquement steps / reviews / master-plans (incrémental, avant chaque recherche)
+    index_events: bool = True
+    # rétention : kind -> jours avant archivage ("*" = autres kinds ; absent ou 0 = conserver)
+    retention_days: dict[str, float] = field(default_factory=dict)
+    archive_dir: str = "data/archive"
 
 @dataclass
 class Settings:
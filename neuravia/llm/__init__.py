@@ -1,5 +1,6 @@
 from .base import LLM, LLMRequest
+from .cache import CachedLLM
 from .dummy import DummyLLM
-from .ollama import OllamaCLI, has_ollama
+from .ollama import OllamaCLI, OllamaHTTP, has_ollama, make_ollama
 
-__all__ = ["LLM", "LLMRequest", "DummyLLM", "OllamaCLI", "has_ollama"]
+__all__ = ["LLM", "LLMRequest", "CachedLLM", "DummyLLM", "OllamaCLI", "OllamaHTTP", "has_ollama", "make_ollama"]
@@ -1,12 +1,25 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from typing import Iterator
 
 @dataclass
 class LLMRequest:
     prompt: str
     max_tokens: int = 256
     temperature: float = 0.2
+    # fenêtre de contexte et durée de maintien du modèle en mémoire (ex. "5m") ;
+    # None = valeur du backend (seuls les backends HTTP les transmettent)
+    num_ctx: int | None = None
+    keep_alive: str | None = None
 
 class LLM:
     def generate(self, req: LLMRequest) -> str:  # pragma: no cover - interface
         raise NotImplementedError
+
+    def stream(self, req: LLMRequest) -> Iterator[str]:
+        """Texte généré par morceaux, au fil de l'eau.
+
+        Fermer le générateur (break, close()) arrête la génération. Par défaut,
+        un seul morceau : la réponse complète de generate().
+        """
+        yield self.generate(req)
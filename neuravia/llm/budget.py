@@ -0,0 +1,146 @@
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+# Fenêtre de contexte par défaut (tokens), surchargée par [llm] num_ctx.
+DEFAULT_NUM_CTX = 4096
+# Texte d'un bloc entièrement retiré par le budget
+OMITTED = "(omis : fenêtre de contexte limitée)"
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation hors ligne du nombre de tokens d'un texte.
+
+    Approximation d'un tokenizer BPE : un token par signe de ponctuation,
+    un par mot court et environ un par tranche de 4 caractères au-delà.
+    Volontairement un peu pessimiste sur le français accentué.
+    """
+    n = 0
+    for m in _TOKEN_RE.finditer(text or ""):
+        size = len(m.group())
+        n += 1 if size <= 4 else (size + 3) // 4
+    return n
+
+
+@dataclass
+class Block:
+    """Bloc de prompt soumis au budget.
+
+    - priority : les blocs de plus basse priorité sont réduits en premier ;
+    - quota : part maximale du budget disponible (0..1), None = pas de plafond ;
+    - min_tokens : taille conservée tant que réduire les autres blocs suffit ;
+    - keep : "head" garde les premières lignes, "tail" les dernières (les plus récentes).
+    """
+    name: str
+    text: str
+    priority: int = 0
+    quota: float | None = None
+    min_tokens: int = 0
+    keep: str = "head"
+
+
+def truncate(text: str, max_tokens: int, *, keep: str = "head") -> str:
+    """Réduit un texte à max_tokens en gardant des lignes entières.
+
+    Les lignes retirées sont résumées par une ligne "(... N lignes omises)".
+    Une ligne seule trop longue est coupée au mot.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+    ordered = lines if keep == "head" else list(reversed(lines))
+    marker_cost = estimate_tokens(f"(... {len(lines)} lignes omises)")
+    if max_tokens < marker_cost:
+        return ""
+    room = max_tokens - marker_cost
+    kept: list[str] = []
+    used = 0
+    for line in ordered:
+        cost = estimate_tokens(line)
+        if used + cost > room:
+            if not kept:
+                kept.append(_cut_words(line, room))
+            break
+        kept.append(line)
+        used += cost
+    if keep != "head":
+        kept.reverse()
+    omitted = len(lines) - len(kept)
+    marker = f"(... {omitted} lignes omises)" if omitted else "(...)"
+    return "\n".join(kept + [marker] if keep == "head" else [marker] + kept)
+
+
+def _cut_words(line: str, max_tokens: int) -> str:
+    out: list[str] = []
+    used = 0
+    for word in line.split():
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens:
+            break
+        out.append(word)
+        used += cost
+    return " ".join(out)
+
+
+class TokenBudget:
+    """Répartit la fenêtre de contexte (num_ctx) entre les blocs d'un prompt.
+
+    `reserve` tokens sont laissés à la réponse du modèle et `margin` (fraction)
+    absorbe l'imprécision de l'estimation.
+    """
+
+    def __init__(self, num_ctx: int = DEFAULT_NUM_CTX, *, reserve: int = 256, margin: float = 0.1):
+        self.num_ctx = int(num_ctx)
+        self.reserve = int(reserve)
+        self.margin = float(margin)
+
+    @property
+    def available(self) -> int:
+        """Tokens utilisables pour le prompt entier."""
+        return max(0, int(self.num_ctx * (1 - self.margin)) - self.reserve)
+
+    def fit(self, blocks: Iterable[Block], *, fixed: int = 0) -> dict[str, str]:
+        """Textes des blocs ajustés pour que fixed + blocs tiennent dans `available`.
+
+        1) chaque bloc est plafonné à son quota ; 2) s'il faut encore réduire,
+        les blocs de plus basse priorité descendent jusqu'à min_tokens, puis,
+        en dernier recours, jusqu'à disparaître.
+        """
+        blocks = list(blocks)
+        room = max(0, self.available - int(fixed))
+        texts = {b.name: b.text for b in blocks}
+        sizes = {b.name: estimate_tokens(b.text) for b in blocks}
+        for b in blocks:
+            if b.quota is not None and sizes[b.name] > int(b.quota * room):
+                self._shrink(b, texts, sizes, int(b.quota * room))
+        by_priority = sorted(blocks, key=lambda b: b.priority)
+        for floor in (True, False):
+            for b in by_priority:
+                excess = sum(sizes.values()) - room
+                if excess <= 0:
+                    return texts
+                target = max(b.min_tokens if floor else 0, sizes[b.name] - excess)
+                if target < sizes[b.name]:
+                    self._shrink(b, texts, sizes, target)
+        return texts
+
+    @staticmethod
+    def _shrink(b: Block, texts: dict, sizes: dict, max_tokens: int) -> None:
+        texts[b.name] = truncate(texts[b.name], max_tokens, keep=b.keep)
+        sizes[b.name] = estimate_tokens(texts[b.name])
+
+
+def fit_prompt(render: Callable[..., str], blocks: list[Block], budget: TokenBudget | None) -> str:
+    """Rend un prompt dont les blocs (arguments nommés de render) tiennent dans le budget.
+
+    Le coût fixe (consignes, format de sortie) est mesuré en rendant le
+    gabarit avec des blocs vides. Sans budget, les blocs sont rendus tels quels.
+    """
+    if budget is None:
+        return render(**{b.name: b.text for b in blocks})
+    fixed = estimate_tokens(render(**{b.name: "" for b in blocks}))
+    texts = budget.fit(blocks, fixed=fixed)
+    return render(**{name: text or OMITTED for name, text in texts.items()})
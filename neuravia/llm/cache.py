@@ -0,0 +1,242 @@
+"""Cache disque des réponses LLM (SQLite), autour de n'importe quel LLM.
+
+Clé : modèle, empreinte du prompt, temperature, max_tokens (et num_ctx, qui
+change la troncature du prompt côté serveur). Éviction LRU bornée en nombre
+d'entrées et en octets, expiration (TTL), statistiques hits / misses.
+
+À temperature 0, un flux abandonné par l'appelant (ex. l'agent qui coupe dès
+que l'étape est complète) est gardé comme entrée partielle : il resert tel
+quel aux flux suivants, mais generate() l'ignore et régénère la réponse
+complète. Au-delà, un début de réponse ne peut pas être prolongé par un
+nouveau tirage : seules les réponses complètes sont gardées.
+"""
+from __future__ import annotations
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from .base import LLM, LLMRequest
+
+CACHE_FILENAME = "llm_cache.db"
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        complete INTEGER NOT NULL DEFAULT 1,
+        size INTEGER NOT NULL,
+        created REAL NOT NULL,
+        accessed REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed)",
+    "CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created)",
+]
+
+
+def cache_key(model: str, req: LLMRequest) -> str:
+    prompt = hashlib.sha256(req.prompt.encode("utf-8")).hexdigest()
+    parts = (model, prompt, repr(float(req.temperature)), str(int(req.max_tokens)), str(req.num_ctx or ""))
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0   # bypass actif ou temperature au-dessus de max_temperature
+    evicted: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachedLLM(LLM):
+    """
+    Enveloppe un LLM et mémorise ses réponses dans une base SQLite.
+
+    - ttl_s : durée de vie d'une entrée en secondes (0 = sans expiration) ;
+    - max_entries / max_bytes : au-delà, les entrées les moins récemment lues
+      sont évincées (0 = sans limite) ;
+    - max_temperature : les requêtes plus aléatoires passent sans cache ;
+    - bypass : ni lecture ni écriture, l'appel va toujours au modèle.
+    """
+    def __init__(
+        self,
+        inner: LLM,
+        path: str | Path,
+        *,
+        model: str | None = None,
+        ttl_s: float = 7 * 86400,
+        max_entries: int = 5000,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_temperature: float = 0.0,
+        bypass: bool = False,
+    ):
+        self.inner = inner
+        self.model = model or getattr(inner, "model", None) or type(inner).__name__
+        self.path = str(path)
+        self.ttl_s = float(ttl_s)
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.max_temperature = float(max_temperature)
+        self.bypass = bool(bypass)
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        for stmt in SCHEMA:
+            self.conn.execute(stmt)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ---------------- stockage ----------------
+    def _cacheable(self, req: LLMRequest) -> bool:
+        if self.bypass or req.temperature > self.max_temperature:
+            self.stats.bypassed += 1
+            return False
+        return True
+
+    def _get(self, key: str, *, partial: bool = False) -> tuple[str, bool] | None:
+        """(réponse, complète) si l'entrée existe, n'a pas expiré et est complète (ou partial=True)."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response, complete, created FROM llm_cache WHERE key=?", (key,)
+            ).fetchone()
+            if row is None or not (row[1] or partial):
+                return None
+            if self.ttl_s and row[2] < now - self.ttl_s:
+                self.conn.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE llm_cache SET accessed=?, hits=hits+1 WHERE key=?", (now, key))
+            self.conn.commit()
+            return row[0], bool(row[1])
+
+    def _put(self, key: str, response: str, *, complete: bool = True) -> None:
+        now = time.time()
+        with self._lock:
+            if not complete and self.conn.execute(
+                "SELECT 1 FROM llm_cache WHERE key=? AND (complete=1 OR length(response) >= ?)", (key, len(response))
+            ).fetchone():
+                return  # une réponse complète ou un début plus long vaut mieux que ce début de flux
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache(key, model, response, complete, size, created, accessed) "
+                "VALUES (?,?,?,?,?,?,?)",
+                (key, self.model, response, int(complete), len(response.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float) -> None:
+        before = self.conn.total_changes
+        if self.ttl_s:
+            self.conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_s,))
+        if self.max_entries:
+            self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        if self.max_bytes:
+            self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER "
+                "(ORDER BY accessed DESC, key ROWS UNBOUNDED PRECEDING) AS total FROM llm_cache) WHERE total > ?)",
+                (self.max_bytes,),
+            )
+        self.stats.evicted += self.conn.total_changes - before
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM llm_cache")
+            self.conn.commit()
+
+    def info(self) -> dict:
+        """Statistiques de la session et taille actuelle du cache."""
+        with self._lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        s = self.stats
+        return {"hits": s.hits, "misses": s.misses, "bypassed": s.bypassed, "evicted": s.evicted,
+                "hit_rate": round(s.hit_rate, 3), "entries": entries, "bytes": size}
+
+    # ---------------- génération ----------------
+    def generate(self, req: LLMRequest) -> str:
+        if not self._cacheable(req):
+            return self.inner.generate(req)
+        key = cache_key(self.model, req)
+        cached = self._get(key)
+        if cached is not None:
+            self.stats.hits += 1
+            return cached[0]
+        self.stats.misses += 1
+        out = self.inner.generate(req)
+        self._put(key, out)
+        return out
+
+    def stream(self, req: LLMRequest) -> Iterator[str]:
+        """
+        Réponse en cache rendue d'un seul morceau. À temperature 0 seulement,
+        une entrée partielle est aussi servie : si l'appelant en redemande
+        au-delà, le modèle est rappelé (décodage déterministe, même début) et
+        seule la suite est transmise.
+        """
+        if not self._cacheable(req):
+            yield from self.inner.stream(req)
+            return
+        key = cache_key(self.model, req)
+        deterministic = req.temperature == 0
+        cached = self._get(key, partial=deterministic)
+        prefix = ""
+        if cached is not None:
+            self.stats.hits += 1
+            prefix, complete = cached
+            yield prefix
+            if complete:
+                return
+        else:
+            self.stats.misses += 1
+        text = ""
+        inner = self.inner.stream(req)
+        try:
+            for chunk in inner:
+                text += chunk
+                if len(text) > len(prefix):
+                    rest, prefix = text[len(prefix):], text
+                    yield rest
+        except GeneratorExit:
+            if text and deterministic:
+                self._put(key, text, complete=False)
+            raise
+        finally:
+            inner.close()
+        self._put(key, text)
+
+
+def cache_path_for(cfg, db_path: str | Path) -> Path:
+    """[llm] cache_path, ou llm_cache.db dans le dossier de la base mémoire."""
+    return Path(cfg.cache_path) if cfg.cache_path else Path(db_path).parent / CACHE_FILENAME
+
+
+def cached_from_settings(llm: LLM, cfg, *, db_path: str | Path, bypass: bool = False) -> LLM:
+    """Enveloppe `llm` dans un CachedLLM si [llm] cache_enabled ; sinon le renvoie tel quel."""
+    if not cfg.cache_enabled:
+        return llm
+    return CachedLLM(
+        llm,
+        cache_path_for(cfg, db_path),
+        ttl_s=cfg.cache_ttl_hours * 3600,
+        max_entries=cfg.cache_max_entries,
+        max_bytes=int(cfg.cache_max_mb * 1024 * 1024),
+        max_temperature=cfg.cache_max_temperature,
+        bypass=bypass,
+    )
@@ -2,7 +2,7 @@ from __future__ import annotations
 import argparse, sys
 from .base import LLMRequest
 from .dummy import DummyLLM
-from .ollama import OllamaCLI, has_ollama
+from .ollama import BACKENDS, OllamaHTTP, has_ollama, make_ollama
 
 def main(argv: list[str] | None = None) -> int:
     ap = argparse.ArgumentParser("neuravia.llm.demo", description="Démo LLM local (dummy/ollama)")
@@ -10,20 +10,28 @@ def main(argv: list[str] | None = None) -> int:
     ap.add_argument("--model", default="dummy", help="dummy | <nom_ollama> (ex: llama3.1:8b-instruct)")
     ap.add_argument("--max-tokens", type=int, default=256)
     ap.add_argument("--temperature", type=float, default=0.2)
+    ap.add_argument("--backend", choices=BACKENDS, default="cli", help="cli (ollama run) | http (API REST locale)")
+    ap.add_argument("--host", default=None, help="URL du serveur Ollama (backend http)")
+    ap.add_argument("--no-stream", action="store_true", help="Afficher la réponse en une fois (pas au fil de l'eau)")
     args = ap.parse_args(argv)
 
     if args.model.lower() == "dummy":
         llm = DummyLLM()
     else:
-        if not has_ollama():
+        llm = make_ollama(args.model, args.backend, host=args.host)
+        ok = llm.available() if isinstance(llm, OllamaHTTP) else has_ollama()
+        if not ok:
             print("ERR: Ollama non disponible. Installez-le ou utilisez --model dummy.", file=sys.stderr)
             return 2
-        llm = OllamaCLI(args.model)
 
     req = LLMRequest(prompt=args.goal, max_tokens=args.max_tokens, temperature=args.temperature)
-    txt = llm.generate(req).strip()
     print("=== PLAN (model:", args.model, ") ===")
-    print(txt)
+    if args.no_stream:
+        print(llm.generate(req).strip())
+        return 0
+    for chunk in llm.stream(req):
+        print(chunk, end="", flush=True)
+    print()
     return 0
 
 if __name__ == "__main__":
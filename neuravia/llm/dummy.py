@@ -1,4 +1,6 @@
 from __future__ import annotations
+import re
+from typing import Iterator
 from .base import LLM, LLMRequest
 
 class DummyLLM(LLM):
@@ -13,3 +15,7 @@ class DummyLLM(LLM):
             f"2. Élaborer un plan d'actions minimal\n"
             f"3. Simuler l'exécution et consigner les observations\n"
         )
+
+    def stream(self, req: LLMRequest) -> Iterator[str]:
+        # mot par mot (espaces et retours à la ligne compris), comme un vrai modèle
+        yield from re.findall(r"\S+\s*|\s+", self.generate(req))
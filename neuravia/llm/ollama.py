@@ -1,8 +1,13 @@
 from __future__ import annotations
-import shutil, subprocess
+import codecs, http.client, json, os, shutil, subprocess, tempfile, threading
+from typing import Iterator
+from urllib.parse import urlsplit
 from .base import LLM, LLMRequest
 from ..security.kill import check_kill
 
+DEFAULT_HOST = "http://127.0.0.1:11434"
+BACKENDS = ("cli", "http")
+
 def has_ollama() -> bool:
     return bool(shutil.which("ollama"))
 
@@ -15,13 +20,16 @@ class OllamaCLI(LLM):
         self.model = model
         self.extra = list(extra or [])
 
-    def generate(self, req: LLMRequest) -> str:
+    def _cmd(self, req: LLMRequest) -> list[str]:
         # respecte le kill-switch global (chemin par défaut)
         check_kill("data/kill.switch")
         if not has_ollama():
             raise RuntimeError("Ollama non disponible (binaire 'ollama' introuvable sur PATH).")
+        return ["ollama", "run", self.model, req.prompt]
+
+    def generate(self, req: LLMRequest) -> str:
         # Important: forcer UTF-8 pour éviter le mojibake sous Windows
-        cmd = ["ollama", "run", self.model, req.prompt]
+        cmd = self._cmd(req)
         p = subprocess.run(
             cmd,
             text=True,
@@ -34,3 +42,202 @@ class OllamaCLI(LLM):
             raise RuntimeError(f"ollama run a échoué: {p.stderr.strip() or p.stdout.strip()}")
         out = p.stdout.strip()
         return out if out else "(réponse vide)"
+
+    def stream(self, req: LLMRequest) -> Iterator[str]:
+        """Sortie de 'ollama run' lue au fil de l'eau ; fermer le générateur tue le processus.
+
+        stderr (progression, avertissements) part dans un fichier temporaire :
+        un pipe plein bloquerait le processus pendant qu'on lit stdout.
+        """
+        cmd = self._cmd(req)
+        errf = tempfile.TemporaryFile()
+        try:
+            p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errf)
+        except BaseException:
+            errf.close()
+            raise
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        completed = False
+        try:
+            while True:
+                data = p.stdout.read1(4096)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            if p.wait() != 0:
+                errf.seek(0)
+                err = errf.read().decode("utf-8", errors="replace").strip()
+                raise RuntimeError(f"ollama run a échoué: {err}")
+            completed = True
+        finally:
+            if not completed and p.poll() is None:
+                p.kill()
+            p.wait()
+            p.stdout.close()
+            errf.close()
+
+
+class OllamaHTTP(LLM):
+    """
+    Client de l'API REST locale d'Ollama (/api/generate ou /api/chat).
+
+    Une seule connexion HTTP/1.1 keep-alive est réutilisée d'un appel à
+    l'autre (rouverte si le serveur l'a fermée) : ni démarrage de processus,
+    ni limite de taille d'argv sur le prompt. temperature, max_tokens
+    (num_predict), num_ctx et keep_alive de LLMRequest sont transmis ; les
+    deux derniers retombent sur les valeurs du constructeur.
+    """
+    def __init__(
+        self,
+        model: str,
+        *,
+        host: str | None = None,
+        chat: bool = False,
+        num_ctx: int | None = None,
+        keep_alive: str | None = "5m",
+        timeout: float = 300.0,
+    ):
+        self.model = model
+        self.host = host or os.environ.get("OLLAMA_HOST") or DEFAULT_HOST
+        if "://" not in self.host:
+            self.host = f"http://{self.host}"
+        self.chat = chat
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        self.timeout = float(timeout)
+        self._conn: http.client.HTTPConnection | None = None
+        self._lock = threading.Lock()
+
+    # ---------------- connexion ----------------
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            u = urlsplit(self.host)
+            cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(u.hostname or "127.0.0.1", u.port, timeout=self.timeout)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _request(self, method: str, path: str, body: dict | None = None) -> http.client.HTTPResponse:
+        """Envoie la requête ; une seule nouvelle tentative si la connexion gardée était fermée."""
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (0, 1):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                resp = conn.getresponse()
+            except TimeoutError:
+                self.close()
+                raise
+            except (http.client.HTTPException, OSError):
+                # connexion gardée fermée par le serveur (délai d'inactivité, redémarrage)
+                self.close()
+                if attempt:
+                    raise
+                continue
+            if resp.status != 200:
+                detail = resp.read().decode("utf-8", errors="replace").strip()
+                raise RuntimeError(f"ollama HTTP {resp.status} sur {path}: {detail}")
+            return resp
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    def available(self) -> bool:
+        """Vrai si le serveur répond sur /api/version."""
+        try:
+            with self._lock:
+                self._request("GET", "/api/version").read()
+            return True
+        except Exception:
+            self.close()
+            return False
+
+    # ---------------- génération ----------------
+    def _payload(self, req: LLMRequest, stream: bool) -> tuple[str, dict]:
+        options = {"temperature": req.temperature, "num_predict": req.max_tokens}
+        num_ctx = req.num_ctx or self.num_ctx
+        if num_ctx:
+            options["num_ctx"] = int(num_ctx)
+        body = {"model": self.model, "stream": stream, "options": options}
+        keep_alive = req.keep_alive or self.keep_alive
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        if self.chat:
+            body["messages"] = [{"role": "user", "content": req.prompt}]
+            return "/api/chat", body
+        body["prompt"] = req.prompt
+        return "/api/generate", body
+
+    def _text(self, obj: dict) -> str:
+        if self.chat:
+            return (obj.get("message") or {}).get("content") or ""
+        return obj.get("response") or ""
+
+    def generate(self, req: LLMRequest) -> str:
+        check_kill("data/kill.switch")
+        path, body = self._payload(req, stream=False)
+        with self._lock:
+            try:
+                obj = json.loads(self._request("POST", path, body).read())
+            except Exception:
+                self.close()
+                raise
+        out = self._text(obj).strip()
+        return out if out else "(réponse vide)"
+
+    def stream(self, req: LLMRequest) -> Iterator[str]:
+        """Réponse NDJSON lue ligne à ligne ; fermer le générateur avant la fin ferme la connexion."""
+        check_kill("data/kill.switch")
+        path, body = self._payload(req, stream=True)
+        with self._lock:
+            completed = False
+            try:
+                resp = self._request("POST", path, body)
+                while True:
+                    line = resp.readline()
+                    if not line:
+                        break
+                    if not line.strip():
+                        continue
+                    obj = json.loads(line)
+                    if obj.get("error"):
+                        raise RuntimeError(f"ollama: {obj['error']}")
+                    text = self._text(obj)
+                    if text:
+                        yield text
+                    if obj.get("done"):
+                        break
+                resp.read()  # vide la réponse : la connexion reste réutilisable
+                completed = True
+            finally:
+                if not completed:
+                    # réponse abandonnée en cours : la connexion n'est plus réutilisable
+                    self.close()
+
+
+def make_ollama(model: str, backend: str = "cli", **http_options) -> LLM:
+    """Backend Ollama : "cli" (sous-processus 'ollama run') ou "http" (API REST, connexion gardée)."""
+    if backend == "http":
+        return OllamaHTTP(model, **http_options)
+    if backend == "cli":
+        return OllamaCLI(model)
+    raise ValueError(f"backend Ollama inconnu : {backend!r} (attendu : {', '.join(BACKENDS)})")
+
+
+def ollama_from_settings(model: str, cfg, *, backend: str | None = None, num_ctx: int | None = None) -> LLM:
+    """Backend Ollama d'après la section [llm] de la config (backend, ollama_host, keep_alive, num_ctx)."""
+    return make_ollama(
+        model,
+        backend or cfg.backend,
+        host=cfg.ollama_host or None,
+        num_ctx=num_ctx or cfg.num_ctx,
+        keep_alive=cfg.keep_alive or None,
+    )
@@ -0,0 +1,126 @@
+"""Serveur HTTP local imitant l'API d'Ollama (/api/generate, /api/chat, /api/version).
+
+Sert aux tests et aux benchmarks du backend OllamaHTTP sans modèle installé :
+la réponse est produite par une fonction (prompt -> texte), renvoyée d'un
+bloc ou en NDJSON découpé par mots (Transfer-Encoding: chunked, comme Ollama).
+Les requêtes reçues et le nombre de connexions TCP ouvertes sont enregistrés.
+"""
+from __future__ import annotations
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+
+def echo_reply(prompt: str) -> str:
+    return f"écho : {prompt[:200]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # en-têtes et corps écrits séparément : pas d'attente d'ACK retardé
+    server: "_Server"
+
+    def log_message(self, *args) -> None:  # silencieux
+        pass
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.stub._lock:
+            self.server.stub.connections += 1
+
+    def _send_json(self, obj: dict, status: int = 200) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self) -> None:
+        if self.path == "/api/version":
+            self._send_json({"version": "stub"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self) -> None:
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json({"error": "not found"}, 404)
+            return
+        chat = self.path == "/api/chat"
+        prompt = body["messages"][-1]["content"] if chat else body.get("prompt", "")
+        with stub._lock:
+            stub.requests.append({"path": self.path, **body})
+        text = stub.reply(prompt)
+
+        def wrap(piece: str, done: bool) -> dict:
+            obj = {"model": body.get("model"), "done": done}
+            if chat:
+                obj["message"] = {"role": "assistant", "content": piece}
+            else:
+                obj["response"] = piece
+            return obj
+
+        if body.get("stream", True) is False:
+            self._send_json(wrap(text, True))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for piece in re.findall(r"\S+\s*|\s+", text):
+                self._chunk((json.dumps(wrap(piece, False)) + "\n").encode("utf-8"))
+            self._chunk((json.dumps(wrap("", True)) + "\n").encode("utf-8"))
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "OllamaStub"
+
+
+class OllamaStub:
+    """Faux serveur Ollama sur 127.0.0.1 (port libre), à utiliser comme context manager."""
+
+    def __init__(self, reply: Callable[[str], str] = echo_reply):
+        self.reply = reply
+        self.requests: list[dict] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server: _Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "serveur non démarré"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStub":
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ollama-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -72,40 +72,37 @@ def get_recent(
     """
     db = _open_db(db_path)
     try:
-        # On prend un peu plus large puis on filtre
-        events = db.list_events(kind="agent_step", limit=limit * 5)
+        # store_step met le goal dans 'message' : requête indexée (kind, message, id)
+        events = db.list_events(kind="agent_step", goal=goal, limit=limit)
+        # data est décodé (et les textes externalisés relus) pendant que la base est ouverte
+        filtered: List[AgentMemoryEntry] = []
+        for e in events:
+            # e: {"id","ts","kind","level","message","data"}
+            data = e.get("data") or {}
+
+            try:
+                step = int(data.get("step", 0))
+            except Exception:
+                step = 0
+
+            tags = data.get("tags") or []
+            if not isinstance(tags, list):
+                tags = []
+
+            entry = AgentMemoryEntry(
+                id=e["id"],
+                ts=e["ts"],
+                goal=data.get("goal") or e.get("message") or "",
+                step=step,
+                content=str(data.get("content") or ""),
+                tags=tags,
+                run_label=data.get("run_label"),
+            )
+            filtered.append(entry)
     finally:
         db.close()
 
-    filtered: List[AgentMemoryEntry] = []
-    for e in events:
-        # e: {"id","ts","kind","level","message","data"}
-        data = e.get("data") or {}
-        # On accepte soit message == goal, soit data["goal"] == goal
-        if e.get("message") != goal and data.get("goal") != goal:
-            continue
-
-        try:
-            step = int(data.get("step", 0))
-        except Exception:
-            step = 0
-
-        tags = data.get("tags") or []
-        if not isinstance(tags, list):
-            tags = []
-
-        entry = AgentMemoryEntry(
-            id=e["id"],
-            ts=e["ts"],
-            goal=data.get("goal") or e.get("message") or "",
-            step=step,
-            content=str(data.get("content") or ""),
-            tags=tags,
-            run_label=data.get("run_label"),
-        )
-        filtered.append(entry)
-
     # MemoryDB.list_events renvoie du plus récent au plus ancien.
     # Pour le contexte, on préfère du plus ancien au plus récent.
-    filtered.sort(key=lambda x: x.ts)
-    return filtered[-limit:]
+    filtered.reverse()
+    return filtered
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import math
+import weakref
+from pathlib import Path
+
+from .db import MemoryDB, routed_write
+from .vectors import VectorStore, _require_numpy, open_store
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - dépendance optionnelle
+    np = None
+
+# En dessous de ce nombre de vecteurs, la recherche exacte est plus rapide que l'IVF.
+MIN_TRAIN_ROWS = 1024
+# Réentraînement automatique quand le store a grossi de ce facteur depuis le dernier
+# entraînement (nlist ≈ sqrt(n) redevient adapté, listes rééquilibrées).
+RETRAIN_GROWTH = 2.0
+
+# IVFIndex ouverts, par store et par fichier (voir open_ivf)
+_INDEXES: "weakref.WeakKeyDictionary[VectorStore, dict[Path, IVFIndex]]" = weakref.WeakKeyDictionary()
+
+
+def _kmeans(x, k: int, *, iters: int = 10, seed: int = 0):
+    """k-means sphérique (vecteurs normalisés, affectation par produit scalaire)."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            # clusters vides : réinitialisés sur des points tirés au hasard
+            sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """Index approximatif IVF (inverted file) au-dessus d'un VectorStore.
+
+    - quantification grossière par k-means (NumPy) : nlist centroïdes
+      persistés dans <db>.ivf.npy, à côté de memory.db ;
+    - listes inversées ligne -> centroïde dans la table SQLite `ivf_lists`
+      (indexée par liste) ;
+    - insertion incrémentale : les vecteurs ajoutés au store après
+      l'entraînement sont affectés à leur centroïde le plus proche (sync()) ;
+    - recherche : on ne score que les nprobe listes les plus proches ;
+    - réentraînement automatique (ensure_trained) quand le store a grossi
+      de RETRAIN_GROWTH depuis le dernier entraînement.
+
+    Tant que l'index n'est pas entraîné (ou si le store est petit), search()
+    retombe sur la recherche exacte du store.
+    """
+    def __init__(self, store: VectorStore, path: str | Path | None = None, *, nprobe: int = 8) -> None:
+        _require_numpy()
+        self.store = store
+        self.db = store.db
+        self.nprobe = int(nprobe)
+        self.path = Path(path) if path else Path(self.db.path).with_suffix(".ivf.npy")
+        if not self.db._columns("ivf_lists"):
+            self.db.conn.execute(
+                "CREATE TABLE IF NOT EXISTS ivf_lists (row INTEGER PRIMARY KEY, list_id INTEGER NOT NULL)"
+            )
+            self.db.conn.execute("CREATE INDEX IF NOT EXISTS idx_ivf_lists_list ON ivf_lists(list_id, row)")
+            self.db._commit()
+        self._centroids = None
+        self._centroids_stamp = None
+
+    @property
+    def trained(self) -> bool:
+        return self.path.exists()
+
+    @property
+    def _rows_key(self) -> str:
+        return f"ivf.{self.path.name}.trained_rows"
+
+    @property
+    def trained_rows(self) -> int:
+        """Taille du store au dernier entraînement (≈ nlist² pour un index antérieur au suivi)."""
+        rows = self.db.get_meta(self._rows_key)
+        return rows or len(self.centroids()) ** 2
+
+    def centroids(self):
+        # rechargés si le fichier a changé (réentraînement ici ou par un autre processus)
+        st = self.path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._centroids is None or stamp != self._centroids_stamp:
+            self._centroids = np.load(self.path)
+            self._centroids_stamp = stamp
+        return self._centroids
+
+    def train(self, *, nlist: int | None = None, sample: int = 50000, iters: int = 10, seed: int = 0) -> int:
+        """(Ré)entraîne les centroïdes sur un échantillon puis réaffecte tous les vecteurs."""
+        mat = self.store.matrix()
+        n = len(mat)
+        if n == 0:
+            raise ValueError("VectorStore vide : rien à entraîner")
+        nlist = min(n, nlist or max(1, int(math.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        idx = np.sort(rng.choice(n, size=min(n, sample), replace=False))
+        centroids = _kmeans(np.asarray(mat[idx]), nlist, iters=iters, seed=seed)
+        np.save(self.path, centroids)
+        self._centroids = None
+        with self.db.batch():
+            self.db.conn.execute("DELETE FROM ivf_lists")
+            self._assign(0, n)
+            self.db.set_meta(self._rows_key, n)
+        return nlist
+
+    def _assign(self, start: int, stop: int, chunk: int = 65536) -> None:
+        mat = self.store.matrix()
+        centroids = self.centroids()
+        for lo in range(start, stop, chunk):
+            hi = min(stop, lo + chunk)
+            lists = np.argmax(np.asarray(mat[lo:hi]) @ centroids.T, axis=1)
+            self.db.conn.executemany(
+                "INSERT OR REPLACE INTO ivf_lists(row, list_id) VALUES (?, ?)",
+                ((lo + i, int(l)) for i, l in enumerate(lists)),
+            )
+
+    def sync(self) -> int:
+        """Affecte aux listes les vecteurs ajoutés depuis le dernier appel."""
+        if not self.trained:
+            return 0
+        done = int(self.db.conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM ivf_lists").fetchone()[0])
+        n = len(self.store)
+        if n > done:
+            with self.db.batch():
+                self._assign(done, n)
+        return n - done
+
+    def add_many(self, items) -> int:
+        n = self.store.add_many(items)
+        self.sync()
+        return n
+
+    def ensure_trained(self) -> bool:
+        """Entraîne dès que le store dépasse MIN_TRAIN_ROWS vecteurs, réentraîne après RETRAIN_GROWTH."""
+        n = len(self.store)
+        if not self.trained:
+            if n >= MIN_TRAIN_ROWS:
+                self.train()
+        elif n >= RETRAIN_GROWTH * self.trained_rows:
+            self.train()
+        return self.trained
+
+    def refresh(self) -> bool:
+        """Entraîne si besoin et affecte les nouveaux vecteurs (par le MemoryWriter s'il y en a un)."""
+        if self.db.delegates_writes:
+            return _refresh(self.db, str(self.store.path), str(self.path))
+        if not self.ensure_trained():
+            return False
+        self.sync()
+        return True
+
+    def search(self, query, top_k: int = 5, *, nprobe: int | None = None) -> list[tuple[str, float]]:
+        if not self.refresh():
+            return self.store.search(query, top_k=top_k)
+        q = self.store.query_vector(query)
+        centroids = self.centroids()
+        p = min(len(centroids), max(1, nprobe or self.nprobe))
+        probe = np.argpartition(-(centroids @ q), p - 1)[:p]
+        marks = ",".join("?" * p)
+        rows = np.fromiter(
+            (r for (r,) in self.db.conn.execute(
+                f"SELECT row FROM ivf_lists WHERE list_id IN ({marks}) ORDER BY row", [int(x) for x in probe]
+            )),
+            dtype=np.int64,
+        )
+        if not len(rows):
+            return []
+        scores = np.asarray(self.store.matrix()[rows]) @ q
+        k = min(max(1, top_k), len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        names = self.store.refs(rows[top])
+        return [(names[int(rows[i])], float(scores[i])) for i in top]
+
+
+def open_ivf(store: VectorStore, path: str | Path | None = None) -> IVFIndex:
+    """IVFIndex de `store`, ouvert une fois par store et par fichier (centroïdes gardés en mémoire)."""
+    path = Path(path) if path else Path(store.db.path).with_suffix(".ivf.npy")
+    indexes = _INDEXES.setdefault(store, {})
+    if path not in indexes:
+        indexes[path] = IVFIndex(store, path)
+    return indexes[path]
+
+
+@routed_write
+def _refresh(db: MemoryDB, store_path: str, path: str) -> bool:
+    return open_ivf(open_store(db, store_path), path).refresh()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import argparse
+import sys
+import time
+
+from .db import MemoryDB
+
+DEFAULT_DB_PATH = "data/memory.db"
+
+
+def _cmd_migrate_blobs(args) -> int:
+    db = MemoryDB(args.db, blob_threshold=args.threshold)
+    try:
+        stats = db.migrate_blobs(batch_size=args.batch_size)
+    finally:
+        db.close()
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    print(f"[memory] {stats['events']} events réécrits, {stats['blobs']} blobs, {saved} octets retirés de events.data")
+    return 0
+
+
+def _parse_ttls(values: list[str]) -> dict[str, float]:
+    ttls = {}
+    for v in values:
+        kind, sep, days = v.partition("=")
+        if not sep:
+            raise SystemExit(f"--ttl attend KIND=JOURS, reçu {v!r}")
+        ttls[kind.strip()] = float(days)
+    return ttls
+
+
+def _cmd_compact(args) -> int:
+    from ..config import load_settings
+    from .retention import apply_retention, compact
+    mem = load_settings(args.config, args.profile).memory
+    ttls = {**mem.retention_days, **_parse_ttls(args.ttl)}
+    db = MemoryDB(args.db or mem.db_path)
+    try:
+        kept = apply_retention(db, ttls, archive_dir=args.archive_dir or mem.archive_dir)
+        sizes = compact(db, analyze=not args.no_analyze)
+    finally:
+        db.close()
+    print(f"[memory] {kept['events']} events archivés dans {len(kept['archives'])} fichier(s), "
+          f"{kept['blobs']} blobs supprimés")
+    for path in kept["archives"]:
+        print(f"  - {path}")
+    print(f"[memory] {sizes['bytes_before']} -> {sizes['bytes_after']} octets ({sizes['reclaimed']} récupérés)")
+    return 0
+
+
+def _cmd_writer(args) -> int:
+    from .writer import MemoryWriter
+    writer = MemoryWriter(args.db, args.address, max_batch=args.max_batch, busy_timeout=args.busy_timeout)
+    print(f"[memory] writer sur {writer.address} (Ctrl+C pour arrêter)")
+    print(f"[memory] clients : NEURAVIA_MEMORY_WRITER={writer.address}")
+    writer.serve_forever()
+    print(f"[memory] writer arrêté : {writer.stats['ops']} écritures en {writer.stats['commits']} commits")
+    return 0
+
+
+def _progress(quiet: bool):
+    """Affiche le nombre de lignes traitées par table sur stderr (une ligne réécrite)."""
+    if quiet:
+        return None
+    t0 = time.monotonic()
+
+    def report(table: str, n: int) -> None:
+        rate = n / max(time.monotonic() - t0, 1e-6)
+        print(f"\r[memory] {table}: {n} lignes ({rate:.0f}/s)", end="", file=sys.stderr, flush=True)
+    return report
+
+
+def _cmd_export(args) -> int:
+    from .transfer import export_memory
+    db = MemoryDB(args.db, readonly=True)
+    try:
+        counts = export_memory(db, args.out, fmt=args.format, tables=args.table or None,
+                               batch_size=args.batch_size, progress=_progress(args.quiet))
+    finally:
+        db.close()
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"[memory] export {args.format} -> {args.out} : " + ", ".join(f"{t}={n}" for t, n in counts.items()))
+    return 0
+
+
+def _cmd_import(args) -> int:
+    from .transfer import import_memory
+    db = MemoryDB(args.db)
+    try:
+        counts = import_memory(db, args.src, tables=args.table or None,
+                               batch_size=args.batch_size, progress=_progress(args.quiet))
+    finally:
+        db.close()
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"[memory] import {args.src} -> {args.db} : " + ", ".join(f"{t}={n}" for t, n in counts.items()))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser("neuravia memory", description="Maintenance de la mémoire SQLite (data/memory.db)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("migrate-blobs", help="Externaliser les longs textes des events existants dans `blobs`")
+    p.add_argument("--db", default=DEFAULT_DB_PATH, help="Chemin de la base SQLite.")
+    p.add_argument("--threshold", type=int, default=MemoryDB.BLOB_THRESHOLD, help="Taille minimale (caractères).")
+    p.add_argument("--batch-size", type=int, default=500)
+    p.set_defaults(func=_cmd_migrate_blobs)
+
+    p = sub.add_parser("compact", help="Archiver les events expirés puis VACUUM incrémental + ANALYZE")
+    p.add_argument("--db", default=None, help="Chemin de la base SQLite (défaut : [memory] db_path).")
+    p.add_argument("--config", default=None, help="Dossier de config (défaut : config/).")
+    p.add_argument("--profile", default="safe")
+    p.add_argument("--ttl", action="append", default=[], metavar="KIND=JOURS",
+                   help="Rétention d'un kind (répétable, '*' = autres kinds) ; prioritaire sur la config.")
+    p.add_argument("--archive-dir", default=None, help="Dossier des archives (défaut : [memory] archive_dir).")
+    p.add_argument("--no-analyze", action="store_true", help="Ne pas relancer ANALYZE.")
+    p.set_defaults(func=_cmd_compact)
+
+    p = sub.add_parser("writer", help="Écrivain unique : sérialise les écritures de plusieurs processus")
+    p.add_argument("--db", default=DEFAULT_DB_PATH, help="Chemin de la base SQLite.")
+    p.add_argument("--address", default=None, help="Socket Unix / pipe nommé (défaut : <db>.writer.sock).")
+    p.add_argument("--max-batch", type=int, default=500, help="Opérations max par transaction.")
+    p.add_argument("--busy-timeout", type=float, default=MemoryDB.BUSY_TIMEOUT, help="Attente d'un verrou (s).")
+    p.set_defaults(func=_cmd_writer)
+
+    from .transfer import FORMATS, TABLES
+    p = sub.add_parser("export", help="Exporter events/actions/artifacts/index_docs (JSONL gzip ou Parquet)")
+    p.add_argument("out", help="Dossier de destination.")
+    p.add_argument("--db", default=DEFAULT_DB_PATH, help="Chemin de la base SQLite.")
+    p.add_argument("--format", choices=FORMATS, default="jsonl", help="parquet nécessite pyarrow.")
+    p.add_argument("--table", action="append", choices=list(TABLES), help="Limiter à certaines tables (répétable).")
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.add_argument("--quiet", action="store_true", help="Sans progression.")
+    p.set_defaults(func=_cmd_export)
+
+    p = sub.add_parser("import", help="Importer un export (transactions par lots)")
+    p.add_argument("src", help="Dossier d'export (contient manifest.json).")
+    p.add_argument("--db", default=DEFAULT_DB_PATH, help="Chemin de la base SQLite.")
+    p.add_argument("--table", action="append", choices=list(TABLES), help="Limiter à certaines tables (répétable).")
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.add_argument("--quiet", action="store_true", help="Sans progression.")
+    p.set_defaults(func=_cmd_import)
+    return ap
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return int(args.func(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,52 @@
 from __future__ import annotations
-import sqlite3, json, hashlib
+import sqlite3, json, hashlib, time, heapq, math, os, sys, threading, zlib
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from functools import partial, wraps
+from itertools import islice
 from pathlib import Path
-from typing import Optional, List
+from typing import Callable, Iterable, Iterator, Optional, List
+
+from .minhash import bands as minhash_bands, text_minhash, to_blob
+from .tokens import TOKENIZER_VERSION, tokenize
+
+try:
+    import zstandard
+except Exception:  # pragma: no cover - compression zstd optionnelle
+    zstandard = None
 
 ISO = lambda: datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
 
+# Profondeur du "context pack" matérialisé par goal (table goal_context).
+CONTEXT_STEPS = 50
+CONTEXT_REVIEWS = 20
+_CONTEXT_KINDS = "('agent_step', 'agent_review', 'agent_masterplan')"
+
+
+def _last_ids(kind: str, n: int, goal: str) -> str:
+    """Sous-requête : tableau JSON des n derniers ids de `kind` pour le goal (parcours d'index)."""
+    return (f"(SELECT json_group_array(id) FROM (SELECT id FROM events "
+            f"WHERE kind = '{kind}' AND message = {goal} ORDER BY id DESC LIMIT {n}))")
+
+
+def _masterplan_id(goal: str) -> str:
+    return f"(SELECT MAX(id) FROM events WHERE kind = 'agent_masterplan' AND message = {goal})"
+
+
+def _goal_context_refresh(row: str) -> str:
+    """UPDATE de goal_context pour le goal de `row` (NEW/OLD), colonne du kind concerné seulement."""
+    goal = f"{row}.message"
+    return f"""UPDATE goal_context SET
+            steps = CASE WHEN {row}.kind = 'agent_step' THEN {_last_ids('agent_step', CONTEXT_STEPS, goal)} ELSE steps END,
+            reviews = CASE WHEN {row}.kind = 'agent_review' THEN {_last_ids('agent_review', CONTEXT_REVIEWS, goal)} ELSE reviews END,
+            masterplan_id = CASE WHEN {row}.kind = 'agent_masterplan' THEN {_masterplan_id(goal)} ELSE masterplan_id END
+        WHERE goal = {goal};"""
+
+
 SCHEMA = [
     """CREATE TABLE IF NOT EXISTS events (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -13,7 +54,8 @@ SCHEMA = [
         kind TEXT NOT NULL,
         level TEXT NOT NULL,
         message TEXT NOT NULL,
-        data TEXT
+        data TEXT,
+        ts_epoch INTEGER
     );""",
     """CREATE TABLE IF NOT EXISTS actions (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -31,119 +73,1167 @@ SCHEMA = [
         meta TEXT
     );""",
     """CREATE TABLE IF NOT EXISTS index_docs (
-        doc_id TEXT PRIMARY KEY,
+        id INTEGER PRIMARY KEY,
+        doc_id TEXT NOT NULL UNIQUE,
         text TEXT NOT NULL,
-        tokens TEXT NOT NULL
-    );"""
+        terms BLOB NOT NULL,
+        length INTEGER NOT NULL DEFAULT 0
+    );""",
+    # Index inversé : dictionnaire des termes (avec document frequency) + postings.
+    """CREATE TABLE IF NOT EXISTS index_terms (
+        term_id INTEGER PRIMARY KEY,
+        term TEXT NOT NULL UNIQUE,
+        df INTEGER NOT NULL DEFAULT 0
+    );""",
+    """CREATE TABLE IF NOT EXISTS index_postings (
+        term_id INTEGER NOT NULL,
+        doc INTEGER NOT NULL,
+        tf INTEGER NOT NULL,
+        PRIMARY KEY (term_id, doc)
+    ) WITHOUT ROWID;""",
+    # Statistiques globales de l'index (nb de docs, longueur totale, version...).
+    """CREATE TABLE IF NOT EXISTS index_stats (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );""",
+    # Textes volumineux des events, adressés par contenu (SHA-256), compressés et dédupliqués.
+    """CREATE TABLE IF NOT EXISTS blobs (
+        sha256 TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        data BLOB NOT NULL
+    ) WITHOUT ROWID;""",
+    # Paires clé/valeur internes (filigranes d'indexation, versions...).
+    """CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );""",
+    # Compteurs matérialisés (tables, events par kind/level, actions par status),
+    # tenus à jour par triggers : /api/stats lit en O(1) au lieu de COUNT(*).
+    """CREATE TABLE IF NOT EXISTS counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID;""",
+    """CREATE TRIGGER IF NOT EXISTS trg_events_count_ins AFTER INSERT ON events BEGIN
+        INSERT INTO counters(name, value)
+            VALUES ('events', 1), ('events.kind:' || NEW.kind, 1), ('events.level:' || NEW.level, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END;""",
+    """CREATE TRIGGER IF NOT EXISTS trg_events_count_del AFTER DELETE ON events BEGIN
+        UPDATE counters SET value = value - 1
+            WHERE name IN ('events', 'events.kind:' || OLD.kind, 'events.level:' || OLD.level);
+    END;""",
+    """CREATE TRIGGER IF NOT EXISTS trg_actions_count_ins AFTER INSERT ON actions BEGIN
+        INSERT INTO counters(name, value)
+            VALUES ('actions', 1), ('actions.status:' || NEW.status, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END;""",
+    """CREATE TRIGGER IF NOT EXISTS trg_actions_count_del AFTER DELETE ON actions BEGIN
+        UPDATE counters SET value = value - 1 WHERE name IN ('actions', 'actions.status:' || OLD.status);
+    END;""",
+    """CREATE TRIGGER IF NOT EXISTS trg_artifacts_count_ins AFTER INSERT ON artifacts BEGIN
+        INSERT INTO counters(name, value) VALUES ('artifacts', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END;""",
+    """CREATE TRIGGER IF NOT EXISTS trg_artifacts_count_del AFTER DELETE ON artifacts BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'artifacts';
+    END;""",
+    # Horodatage entier (secondes UTC) : plages de temps et histogrammes indexés.
+    # Le trigger complète les lignes insérées sans ts_epoch (écrivains externes).
+    """CREATE INDEX IF NOT EXISTS idx_events_ts_epoch ON events(ts_epoch);""",
+    """CREATE INDEX IF NOT EXISTS idx_events_kind_ts_epoch ON events(kind, ts_epoch);""",
+    """CREATE TRIGGER IF NOT EXISTS trg_events_ts_epoch AFTER INSERT ON events WHEN NEW.ts_epoch IS NULL BEGIN
+        UPDATE events SET ts_epoch = CAST(strftime('%s', NEW.ts) AS INTEGER) WHERE id = NEW.id;
+    END;""",
+    # Requêtes "par goal" : kind + message (= goal) + id, parcours ordonné sans tri.
+    # IF NOT EXISTS => migration implicite des bases existantes à l'ouverture.
+    """CREATE INDEX IF NOT EXISTS idx_events_kind_message_id ON events(kind, message, id);""",
+    # "Context pack" par goal : ids (JSON, du plus récent au plus ancien) des
+    # derniers steps/reviews et master-plan courant, tenus à jour par triggers
+    # (quel que soit l'écrivain) : le démarrage d'un agent = une lecture par clé.
+    """CREATE TABLE IF NOT EXISTS goal_context (
+        goal TEXT PRIMARY KEY,
+        steps TEXT NOT NULL DEFAULT '[]',
+        reviews TEXT NOT NULL DEFAULT '[]',
+        masterplan_id INTEGER
+    ) WITHOUT ROWID;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_goal_context_ins AFTER INSERT ON events
+        WHEN NEW.kind IN {_CONTEXT_KINDS} BEGIN
+        INSERT INTO goal_context(goal) VALUES (NEW.message) ON CONFLICT(goal) DO NOTHING;
+        {_goal_context_refresh("NEW")}
+    END;""",
+    # Identité canonique des goals : forme normalisée + id (hash), projet,
+    # cluster de reformulations (SimHash + Jaccard, voir goals.py), cluster proche
+    # non fusionné (near) et alias = messages bruts.
+    """CREATE TABLE IF NOT EXISTS goals (
+        id TEXT PRIMARY KEY,
+        text TEXT NOT NULL,
+        norm TEXT NOT NULL,
+        simhash INTEGER NOT NULL,
+        project TEXT,
+        cluster TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        near TEXT
+    ) WITHOUT ROWID;""",
+    """CREATE INDEX IF NOT EXISTS idx_goals_project ON goals(project, cluster);""",
+    """CREATE INDEX IF NOT EXISTS idx_goals_cluster ON goals(cluster);""",
+    """CREATE TABLE IF NOT EXISTS goal_aliases (
+        alias TEXT PRIMARY KEY,
+        goal_id TEXT NOT NULL
+    ) WITHOUT ROWID;""",
+    """CREATE INDEX IF NOT EXISTS idx_goal_aliases_goal ON goal_aliases(goal_id);""",
+    # Bandes LSH des empreintes SimHash : candidats proches sans comparer tous les goals.
+    """CREATE TABLE IF NOT EXISTS goal_bands (
+        band INTEGER NOT NULL,
+        value INTEGER NOT NULL,
+        goal_id TEXT NOT NULL,
+        PRIMARY KEY (band, value, goal_id)
+    ) WITHOUT ROWID;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_goal_context_del AFTER DELETE ON events
+        WHEN OLD.kind IN {_CONTEXT_KINDS} BEGIN
+        {_goal_context_refresh("OLD")}
+    END;""",
+    # Signatures MinHash des agent_step et leurs bandes LSH (quasi-doublons, voir dedupe.py).
+    """CREATE TABLE IF NOT EXISTS step_signatures (
+        event_id INTEGER PRIMARY KEY,
+        minhash BLOB NOT NULL
+    );""",
+    """CREATE TABLE IF NOT EXISTS step_bands (
+        band INTEGER NOT NULL,
+        value INTEGER NOT NULL,
+        event_id INTEGER NOT NULL,
+        PRIMARY KEY (band, value, event_id)
+    ) WITHOUT ROWID;""",
+    """CREATE INDEX IF NOT EXISTS idx_step_bands_event ON step_bands(event_id);""",
+    """CREATE TRIGGER IF NOT EXISTS trg_step_signatures_del AFTER DELETE ON events
+        WHEN OLD.kind = 'agent_step' BEGIN
+        DELETE FROM step_bands WHERE event_id = OLD.id;
+        DELETE FROM step_signatures WHERE event_id = OLD.id;
+    END;""",
 ]
 
+# kinds dont les events reçoivent une signature MinHash à l'écriture
+SIGNED_KINDS = ("agent_step",)
+
+
+def step_text(data: Optional[dict]) -> str:
+    """Texte d'un step comparé pour les quasi-doublons : action, sinon contenu ou titre."""
+    data = data or {}
+    step = data.get("step")
+    if isinstance(step, dict):  # steps issus d'un master-plan
+        data = step
+    for key in ("action", "content", "title"):
+        v = data.get(key)
+        if isinstance(v, str) and v.strip():
+            return v
+    return ""
+
+def to_epoch(t) -> int:
+    """Epoch UTC (secondes) depuis un nombre, un datetime ou un horodatage ISO ("...Z" accepté)."""
+    if isinstance(t, (int, float)):
+        return int(t)
+    if isinstance(t, datetime):
+        if t.tzinfo is None:
+            t = t.replace(tzinfo=timezone.utc)
+        return int(t.timestamp())
+    return to_epoch(datetime.fromisoformat(str(t).replace("Z", "+00:00")))
+
 def sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 def sha256_text(text: str, encoding: str = "utf-8") -> str:
     return sha256_bytes(text.encode(encoding))
 
+# Fichiers dont le schéma (WAL + tables + migrations) a déjà été initialisé
+# dans ce processus : les ouvertures suivantes ne font plus que connect().
+_SCHEMA_READY: set[str] = set()
+_SCHEMA_LOCK = threading.Lock()
+
+
+def _is_lock_error(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+
+# Écritures déléguables au MemoryWriter : "module:qualname" -> fonction (db en 1er argument).
+_ROUTED: dict[str, Callable] = {}
+
+
+def routed_write(fn: Callable) -> Callable:
+    """Décore une écriture (méthode de MemoryDB ou fonction prenant la base en 1er argument).
+
+    Si la base passe par un MemoryWriter (voir writer.py), l'appel entier est
+    exécuté par le writer, dans sa transaction groupée ; sinon il s'exécute
+    directement. Les itérateurs passés en argument sont matérialisés en listes
+    (envoyés au writer). Les arguments et le résultat doivent être picklables.
+    """
+    name = f"{fn.__module__}:{fn.__qualname__}"
+    _ROUTED[name] = fn
+
+    @wraps(fn)
+    def wrapper(db: "MemoryDB", *args, **kwargs):
+        writer = db._writer_client()
+        if writer is None:
+            return fn(db, *args, **kwargs)
+        args = tuple(list(a) if isinstance(a, Iterator) else a for a in args)
+        return writer.call(name, args, kwargs)
+    return wrapper
+
 class MemoryDB:
-    def __init__(self, path: str | Path):
+    # Valeurs texte de data (1er niveau) à partir de laquelle elles partent dans `blobs`.
+    BLOB_THRESHOLD = 512
+    BUSY_TIMEOUT = 10.0
+    LOCK_RETRIES = 5
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        readonly: bool = False,
+        check_same_thread: bool = True,
+        blob_threshold: int | None = None,
+        blob_codec: str = "zlib",
+        busy_timeout: float | None = None,
+        lock_retries: int | None = None,
+        writer: str | None = None,
+    ):
+        """Ouvre la base.
+
+        - readonly=True : connexion en lecture seule (mode=ro), sans création
+          ni migration ; la base doit déjà exister.
+        - le schéma n'est initialisé qu'une fois par fichier et par processus.
+        - blob_threshold : taille (caractères) à partir de laquelle une valeur
+          texte de `data` est stockée dans `blobs` (0 = jamais) ;
+          blob_codec : "zlib" ou "zstd" (si zstandard est installé).
+        - busy_timeout : attente (s) d'un verrou tenu par un autre processus ;
+          lock_retries : nouvelles tentatives (backoff) si le verrou persiste.
+        - writer : adresse d'un MemoryWriter (voir writer.py) qui reçoit les
+          écritures (inserts, index, signatures, goals, vecteurs : tout ce qui
+          est décoré par routed_write) ; par défaut la variable d'environnement
+          NEURAVIA_MEMORY_WRITER ("auto" = socket de la base). La connexion
+          est ouverte à la première écriture ; si aucun writer ne répond, la
+          base écrit directement (busy_timeout + lock_retries).
+        """
         self.path = str(path)
+        self.readonly = readonly
+        self.blob_threshold = self.BLOB_THRESHOLD if blob_threshold is None else int(blob_threshold)
+        self.blob_codec = blob_codec if blob_codec != "zstd" or zstandard is not None else "zlib"
+        self.busy_timeout = self.BUSY_TIMEOUT if busy_timeout is None else float(busy_timeout)
+        self.lock_retries = self.LOCK_RETRIES if lock_retries is None else int(lock_retries)
+        self._batch_depth = 0
+        self._index_stem: Optional[bool] = None
+        self._ctx_cache: dict = {}
+        self._ctx_version: tuple[int, int] | None = None
+        self._writer = None
+        if writer is None:
+            writer = os.environ.get("NEURAVIA_MEMORY_WRITER") or None
+        self._writer_address = writer if writer and not readonly else None
+        if readonly:
+            uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout, check_same_thread=check_same_thread)
+            return
         Path(self.path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.path)
-        self.conn.execute("PRAGMA journal_mode=WAL;")
-        self._init_schema()
+        self.conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=check_same_thread)
+        key = str(Path(self.path).resolve())
+        if key in _SCHEMA_READY and Path(key).exists():
+            return
+        with _SCHEMA_LOCK:
+            # sans effet sur une base existante (voir retention.compact) ; avant toute table sinon
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+            self.conn.execute("PRAGMA journal_mode=WAL;")
+            self._init_schema()
+            _SCHEMA_READY.add(key)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
+        self._migrate_before_schema()
         for stmt in SCHEMA:
             cur.execute(stmt)
+        self._migrate_after_schema()
         self.conn.commit()
 
+    # ---------------- Migrations ----------------
+    def _columns(self, table: str) -> set[str]:
+        return {r[1] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+
+    def _migrate_before_schema(self) -> None:
+        """Migrations qui doivent passer avant les CREATE ... IF NOT EXISTS."""
+        # index_docs v0 (doc_id TEXT PRIMARY KEY) : pas d'id entier stable pour
+        # les postings (le rowid implicite peut être renuméroté par VACUUM) ;
+        # v1 (tokens TEXT) : tokens en texte, remplacés par les term_id empaquetés.
+        cols = self._columns("index_docs")
+        if cols and "terms" not in cols:
+            self.conn.execute("ALTER TABLE index_docs RENAME TO index_docs_v0")
+        # events sans ts_epoch : colonne ajoutée ici (les index du SCHEMA en dépendent),
+        # rétro-remplie depuis ts dans _migrate_after_schema.
+        cols = self._columns("events")
+        if cols and "ts_epoch" not in cols:
+            self.conn.execute("ALTER TABLE events ADD COLUMN ts_epoch INTEGER")
+        cols = self._columns("goals")
+        if cols and "near" not in cols:
+            self.conn.execute("ALTER TABLE goals ADD COLUMN near TEXT")
+
+    def _migrate_after_schema(self) -> None:
+        if self._columns("index_docs_v0"):
+            self.conn.execute(
+                "INSERT INTO index_docs(doc_id, text, terms) SELECT doc_id, text, x'' FROM index_docs_v0"
+            )
+            self.conn.execute("DROP TABLE index_docs_v0")
+            self.index_rebuild()
+        elif self._stat("tokenizer.version") != TOKENIZER_VERSION:
+            # tokenisation modifiée : on réindexe avec le même réglage de racinisation
+            self.index_rebuild()
+        if not self.get_meta("ts_epoch.version"):
+            self.conn.execute(
+                "UPDATE events SET ts_epoch = CAST(strftime('%s', ts) AS INTEGER) WHERE ts_epoch IS NULL"
+            )
+            self.set_meta("ts_epoch.version", 1)
+        if not self.get_meta("goal_context.version"):
+            self.rebuild_goal_context()
+            self.set_meta("goal_context.version", 1)
+        if not self.get_meta("goals.version"):
+            from .goals import sync_goals
+            sync_goals(self)
+            self.set_meta("goals.version", 1)
+        if self.get_meta("goals.version") == 1:
+            # v1 fusionnait sur la seule distance SimHash : on sépare les goals distincts
+            from .goals import split_loose_clusters
+            split_loose_clusters(self)
+            self.set_meta("goals.version", 2)
+        # counters créé sur une base déjà remplie : un seul COUNT(*) GROUP BY
+        if not self.get_meta("counters.version"):
+            self.rebuild_counters()
+            self.set_meta("counters.version", 1)
+
     def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
         try:
             self.conn.close()
         except Exception:
             pass
 
+    def _writer_client(self):
+        """Client du MemoryWriter (connecté à la 1re écriture) ; None = écriture directe."""
+        if self._writer is None and self._writer_address:
+            from multiprocessing import AuthenticationError
+            from .writer import WriterClient, writer_address
+            address = writer_address(self.path) if self._writer_address == "auto" else self._writer_address
+            self._writer_address = None
+            try:
+                self._writer = WriterClient(address, db_path=self.path)
+            except (OSError, EOFError, AuthenticationError) as e:
+                print(f"[mémoire] writer {address} injoignable ({e}) ; écriture directe.", file=sys.stderr)
+        return self._writer
+
+    @property
+    def delegates_writes(self) -> bool:
+        """Vrai si les écritures routed_write partent vers un MemoryWriter."""
+        return self._writer_client() is not None
+
+    @contextmanager
+    def direct_writes(self) -> Iterator["MemoryDB"]:
+        """Écritures directes le temps du bloc, writer ignoré.
+
+        Pour les opérations qui tiennent déjà le verrou d'écriture sur la
+        connexion locale (archivage de `memory compact`) : le writer
+        attendrait ce verrou sans fin.
+        """
+        saved = self._writer, self._writer_address
+        self._writer = self._writer_address = None
+        try:
+            yield self
+        finally:
+            self._writer, self._writer_address = saved
+
+    # ---------------- Meta (clé/valeur) ----------------
+    def get_meta(self, key: str, default: int = 0) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return int(row[0]) if row else default
+
+    @routed_write
+    def set_meta(self, key: str, value: int) -> None:
+        self.conn.execute(
+            "INSERT INTO meta(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, int(value)),
+        )
+        self._commit()
+
+    # ---------------- Compteurs ----------------
+    @routed_write
+    def rebuild_counters(self) -> None:
+        """Recalcule tous les compteurs depuis les tables (scan complet, rare)."""
+        with self.batch():
+            self.conn.execute("DELETE FROM counters")
+            for sql in (
+                "SELECT 'events', COUNT(*) FROM events",
+                "SELECT 'events.kind:' || kind, COUNT(*) FROM events GROUP BY kind",
+                "SELECT 'events.level:' || level, COUNT(*) FROM events GROUP BY level",
+                "SELECT 'actions', COUNT(*) FROM actions",
+                "SELECT 'actions.status:' || status, COUNT(*) FROM actions GROUP BY status",
+                "SELECT 'artifacts', COUNT(*) FROM artifacts",
+            ):
+                self.conn.execute(f"INSERT INTO counters(name, value) {sql}")
+
+    def counts(self) -> dict:
+        """Nombre de lignes par table, lu dans `counters` (O(1))."""
+        rows = dict(self.conn.execute(
+            "SELECT name, value FROM counters WHERE name IN ('events', 'actions', 'artifacts')"
+        ))
+        return {t: int(rows.get(t, 0)) for t in ("events", "actions", "artifacts")}
+
+    def counts_by(self, prefix: str) -> dict:
+        """Compteurs détaillés, ex. counts_by("events.kind") -> {"agent_step": 12, ...}."""
+        head = prefix + ":"
+        return {
+            name[len(head):]: int(value)
+            for name, value in self.conn.execute(
+                "SELECT name, value FROM counters WHERE name > ? AND name < ? AND value > 0 ORDER BY name",
+                (head, prefix + ";"),
+            )
+        }
+
+    # ---------------- Context pack par goal ----------------
+    @routed_write
+    def rebuild_goal_context(self) -> int:
+        """Recalcule goal_context pour tous les goals (migration, réparation)."""
+        with self.batch():
+            self.conn.execute("DELETE FROM goal_context")
+            cur = self.conn.execute(
+                f"""INSERT INTO goal_context(goal, steps, reviews, masterplan_id)
+                SELECT g.message, {_last_ids('agent_step', CONTEXT_STEPS, 'g.message')},
+                       {_last_ids('agent_review', CONTEXT_REVIEWS, 'g.message')}, {_masterplan_id('g.message')}
+                FROM (SELECT DISTINCT message FROM events WHERE kind IN {_CONTEXT_KINDS}) g"""
+            )
+        return cur.rowcount
+
+    def _data_version(self) -> tuple[int, int]:
+        """Change à chaque commit, d'une autre connexion (data_version) ou de celle-ci (total_changes)."""
+        return int(self.conn.execute("PRAGMA data_version").fetchone()[0]), self.conn.total_changes
+
+    def goal_context(self, goal: str, *, max_steps: int = 10, max_reviews: int = 5) -> dict:
+        """Derniers steps / reviews (du plus ancien au plus récent) et master-plan courant d'un goal.
+
+        Une lecture par clé dans goal_context + une lecture des events par id,
+        le tout mis en cache jusqu'au prochain commit sur la base (pour les
+        processus longs). Au-delà de CONTEXT_STEPS / CONTEXT_REVIEWS, repli
+        sur list_events().
+        """
+        if max_steps > CONTEXT_STEPS or max_reviews > CONTEXT_REVIEWS:
+            steps = self.list_events(kind="agent_step", goal=goal, limit=max_steps)
+            reviews = self.list_events(kind="agent_review", goal=goal, limit=max_reviews)
+            plans = self.list_events(kind="agent_masterplan", goal=goal, limit=1)
+            return {"steps": steps[::-1], "reviews": reviews[::-1], "masterplan": plans[0] if plans else None}
+        version = self._data_version()
+        if version != self._ctx_version:
+            self._ctx_cache.clear()
+            self._ctx_version = version
+        key = (goal, max_steps, max_reviews)
+        ctx = self._ctx_cache.get(key)
+        if ctx is None:
+            ctx = self._read_goal_context(goal, max_steps, max_reviews)
+            if len(self._ctx_cache) >= 256:
+                self._ctx_cache.clear()
+            self._ctx_cache[key] = ctx
+        return {"steps": list(ctx["steps"]), "reviews": list(ctx["reviews"]), "masterplan": ctx["masterplan"]}
+
+    def _read_goal_context(self, goal: str, max_steps: int, max_reviews: int) -> dict:
+        row = self.conn.execute(
+            "SELECT steps, reviews, masterplan_id FROM goal_context WHERE goal=?", (goal,)
+        ).fetchone()
+        if row is None:
+            return {"steps": [], "reviews": [], "masterplan": None}
+        step_ids = json.loads(row[0])[:max(0, max_steps)]
+        review_ids = json.loads(row[1])[:max(0, max_reviews)]
+        by_id = {e.id: e for e in self.get_events(step_ids + review_ids + ([row[2]] if row[2] else []))}
+        return {
+            "steps": [by_id[i] for i in reversed(step_ids) if i in by_id],
+            "reviews": [by_id[i] for i in reversed(review_ids) if i in by_id],
+            "masterplan": by_id.get(row[2]),
+        }
+
+    # ---------------- Signatures de steps (quasi-doublons) ----------------
+    @routed_write
+    def sync_step_signatures(self, *, batch_size: int = 1000) -> int:
+        """Signe (MinHash + bandes LSH) les agent_step créés depuis le dernier appel.
+
+        Appelé à chaque écriture d'un step ; le filigrane sur events.id
+        rattrape aussi les events écrits par d'autres processus.
+        """
+        marks = ",".join("?" * len(SIGNED_KINDS))
+        last = self.get_meta("steps.events_id")
+        added = 0
+        while True:
+            rows = self.conn.execute(
+                f"SELECT id, ts, kind, level, message, data FROM events WHERE id > ? AND kind IN ({marks}) "
+                "ORDER BY id LIMIT ?",
+                [last, *SIGNED_KINDS, batch_size],
+            ).fetchall()
+            if not rows:
+                break
+            sigs, band_rows = [], []
+            for r in rows:
+                sig = text_minhash(step_text(self._row_to_event(r).data))
+                if sig is not None:
+                    sigs.append((r[0], to_blob(sig)))
+                    band_rows += [(i, v, r[0]) for i, v in enumerate(minhash_bands(sig))]
+            with self.batch():
+                self.conn.executemany("INSERT OR REPLACE INTO step_signatures(event_id, minhash) VALUES (?, ?)", sigs)
+                self.conn.executemany("INSERT OR IGNORE INTO step_bands(band, value, event_id) VALUES (?, ?, ?)", band_rows)
+                last = rows[-1][0]
+                self.set_meta("steps.events_id", last)
+            added += len(sigs)
+        return added
+
+    # ---------------- Transactions ----------------
+    def _commit(self) -> None:
+        """Commit immédiat, sauf à l'intérieur d'un bloc batch()."""
+        if not self._batch_depth:
+            self._retry_locked(self.conn.commit, rollback=False)
+
+    def _retry_locked(self, fn, *, rollback: bool = True):
+        """Appelle fn() en réessayant (backoff exponentiel) sur "database is locked/busy".
+
+        Le busy_timeout de la connexion couvre l'attente normale ; ces
+        tentatives absorbent les pics où un autre écrivain garde le verrou plus
+        longtemps. Avec rollback=True, fn est une écriture complète (jusqu'au
+        commit) annulée puis rejouée ; à l'intérieur d'un batch() l'erreur
+        remonte telle quelle.
+        """
+        delay = 0.05
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return fn()
+            except sqlite3.OperationalError as e:
+                if attempt >= self.lock_retries or not _is_lock_error(e):
+                    raise
+                if self._batch_depth:
+                    raise
+                if rollback and self.conn.in_transaction:
+                    self.conn.rollback()
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    @contextmanager
+    def batch(self) -> Iterator["MemoryDB"]:
+        """Regroupe toutes les écritures du bloc dans une seule transaction.
+
+        Un seul commit (donc un seul fsync en WAL) à la sortie du bloc le plus
+        externe ; rollback complet si une exception s'échappe. Réentrant.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.conn.rollback()
+            raise
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            self._retry_locked(self.conn.commit, rollback=False)
+
+    def buffered(self, *, max_rows: int = 500, max_delay: float = 1.0) -> "EventWriteBuffer":
+        """Tampon d'écriture différée pour les events (voir EventWriteBuffer)."""
+        return EventWriteBuffer(self, max_rows=max_rows, max_delay=max_delay)
+
+    # ---------------- Blobs ----------------
+    def put_blob(self, text: str) -> str:
+        """Stocke un texte (compressé, dédupliqué) et renvoie son SHA-256."""
+        raw = text.encode("utf-8")
+        digest = sha256_bytes(raw)
+        if self.conn.execute("SELECT 1 FROM blobs WHERE sha256=?", (digest,)).fetchone():
+            return digest
+        if self.blob_codec == "zstd":
+            packed = zstandard.ZstdCompressor().compress(raw)
+        else:
+            packed = zlib.compress(raw, 6)
+        codec = self.blob_codec
+        if len(packed) >= len(raw):
+            packed, codec = raw, "raw"
+        self.conn.execute(
+            "INSERT INTO blobs(sha256, codec, size, data) VALUES (?, ?, ?, ?)",
+            (digest, codec, len(raw), packed),
+        )
+        return digest
+
+    def get_blob(self, digest: str) -> Optional[str]:
+        row = self.conn.execute("SELECT codec, data FROM blobs WHERE sha256=?", (digest,)).fetchone()
+        if not row:
+            return None
+        codec, packed = row
+        if codec == "zlib":
+            raw = zlib.decompress(packed)
+        elif codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("blob compressé en zstd : installer 'zstandard' pour le lire")
+            raw = zstandard.ZstdDecompressor().decompress(packed)
+        else:
+            raw = bytes(packed)
+        return raw.decode("utf-8")
+
+    def _externalize(self, data: Optional[dict]) -> Optional[dict]:
+        """Remplace les longues valeurs texte de data par {"$blob": sha256}."""
+        if not data or self.blob_threshold <= 0:
+            return data
+        out = None
+        for k, v in data.items():
+            if isinstance(v, str) and len(v) >= self.blob_threshold:
+                if out is None:
+                    out = dict(data)
+                out[k] = {"$blob": self.put_blob(v)}
+        return out if out is not None else data
+
+    def _resolve_blobs(self, data):
+        if not isinstance(data, dict):
+            return data
+        for k, v in data.items():
+            if isinstance(v, dict) and len(v) == 1 and "$blob" in v:
+                text = self.get_blob(v["$blob"])
+                data[k] = text if text is not None else ""
+        return data
+
+    @routed_write
+    def migrate_blobs(self, batch_size: int = 500) -> dict:
+        """Réécrit en place les events existants en externalisant leurs longs textes."""
+        stats = {"events": 0, "bytes_before": 0, "bytes_after": 0}
+        last = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, data FROM events WHERE id > ? ORDER BY id LIMIT ?", (last, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            with self.batch():
+                for eid, raw in rows:
+                    last = eid
+                    try:
+                        data = json.loads(raw) if raw else None
+                    except Exception:
+                        continue
+                    new = self._externalize(data) if isinstance(data, dict) else data
+                    if new is data:
+                        continue
+                    new_raw = json.dumps(new, ensure_ascii=False)
+                    self.conn.execute("UPDATE events SET data=? WHERE id=?", (new_raw, eid))
+                    stats["events"] += 1
+                    stats["bytes_before"] += len(raw.encode("utf-8"))
+                    stats["bytes_after"] += len(new_raw.encode("utf-8"))
+        stats["blobs"] = int(self.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0])
+        return stats
+
     # ---------------- Events ----------------
+    _INSERT_EVENT = "INSERT INTO events(ts, ts_epoch, kind, level, message, data) VALUES (?, ?, ?, ?, ?, ?)"
+
+    def _event_row(self, kind: str, level: str, message: str, data: Optional[dict] = None, ts: Optional[str] = None) -> tuple:
+        ts = ts or ISO()
+        return (ts, to_epoch(ts), kind, level, message, json.dumps(self._externalize(data) or {}, ensure_ascii=False))
+
     def add_event(self, kind: str, level: str, message: str, data: Optional[dict] = None) -> int:
-        cur = self.conn.cursor()
-        cur.execute(
-            "INSERT INTO events(ts, kind, level, message, data) VALUES (?, ?, ?, ?, ?)",
-            (ISO(), kind, level, message, json.dumps(data or {}, ensure_ascii=False)),
-        )
-        self.conn.commit()
-        return int(cur.lastrowid)
+        writer = self._writer_client()
+        if writer is not None:
+            return writer.add_event(kind, level, message, data)
+        after = self.sync_step_signatures if kind in SIGNED_KINDS else None
+        return self._insert(self._INSERT_EVENT, lambda: self._event_row(kind, level, message, data), after=after)
+
+    def add_events_many(self, events: Iterable[dict | tuple]) -> int:
+        """Insertion groupée (executemany, un seul commit).
 
-    def list_events(self, kind: Optional[str] = None, limit: int = 100) -> List[dict]:
+        Chaque élément est soit un dict {kind, level, message, data?, ts?},
+        soit un tuple (kind, level, message[, data]). Renvoie le nombre de lignes.
+        """
+        writer = self._writer_client()
+        if writer is not None:
+            return writer.add_events_many(events)
+        with self.batch():
+            rows = []
+            for e in events:
+                if isinstance(e, dict):
+                    rows.append(self._event_row(e["kind"], e["level"], e["message"], e.get("data"), e.get("ts")))
+                else:
+                    rows.append(self._event_row(*e))
+            if not rows:
+                return 0
+            self.conn.executemany(self._INSERT_EVENT, rows)
+            if any(r[2] in SIGNED_KINDS for r in rows):
+                self.sync_step_signatures()
+        return len(rows)
+
+    @staticmethod
+    def _event_filters(
+        kind: Optional[str],
+        goal: Optional[str | list[str] | tuple[str, ...]],
+        after_id: Optional[int],
+        before_id: Optional[int],
+    ) -> tuple[list[str], list]:
+        where: list[str] = []
+        params: list = []
+        if kind:
+            where.append("kind=?")
+            params.append(kind)
+        if isinstance(goal, (list, tuple)):
+            where.append(f"message IN ({','.join('?' * len(goal))})" if goal else "0")
+            params.extend(goal)
+        elif goal is not None:
+            where.append("message=?")
+            params.append(goal)
+        if after_id is not None:
+            where.append("id>?")
+            params.append(int(after_id))
+        if before_id is not None:
+            where.append("id<?")
+            params.append(int(before_id))
+        return where, params
+
+    def list_events(
+        self,
+        kind: Optional[str] = None,
+        limit: int = 100,
+        *,
+        goal: Optional[str | list[str]] = None,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+    ) -> List["EventRow"]:
+        """Derniers events (du plus récent au plus ancien).
+
+        - goal : ne garde que les events dont message == goal, ou message IN goal
+          pour une liste de variantes (index kind/message/id quand kind est aussi fourni) ;
+        - after_id / before_id : bornes strictes sur l'id (curseurs de pagination).
+        """
+        where, params = self._event_filters(kind, goal, after_id, before_id)
+        sql = "SELECT id, ts, kind, level, message, data FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
         cur = self.conn.cursor()
+        cur.execute(sql, params)
+        return [self._row_to_event(r) for r in cur.fetchall()]
+
+    def iter_events(
+        self,
+        kind: Optional[str] = None,
+        goal: Optional[str] = None,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        batch_size: int = 500,
+        *,
+        descending: bool = False,
+    ) -> Iterator["EventRow"]:
+        """Parcourt les events paquet par paquet (pagination par clé sur id).
+
+        Chaque paquet est une requête indexée `id > dernier` (ou `id < dernier`
+        en ordre décroissant) : mémoire constante quelle que soit la taille de
+        l'historique, et aucun OFFSET à re-parcourir.
+        """
+        batch_size = max(1, int(batch_size))
+        order = "DESC" if descending else "ASC"
+        while True:
+            where, params = self._event_filters(kind, goal, after_id, before_id)
+            sql = "SELECT id, ts, kind, level, message, data FROM events"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += f" ORDER BY id {order} LIMIT ?"
+            rows = self.conn.execute(sql, params + [batch_size]).fetchall()
+            for r in rows:
+                yield self._row_to_event(r)
+            if len(rows) < batch_size:
+                return
+            if descending:
+                before_id = rows[-1][0]
+            else:
+                after_id = rows[-1][0]
+
+    def events_between(self, t0, t1, kind: Optional[str] = None, *, limit: Optional[int] = None) -> List["EventRow"]:
+        """Events avec t0 <= ts < t1 (epoch, datetime ou ISO), du plus ancien au plus récent."""
+        sql = "SELECT id, ts, kind, level, message, data FROM events WHERE ts_epoch >= ? AND ts_epoch < ?"
+        params: list = [to_epoch(t0), to_epoch(t1)]
         if kind:
-            cur.execute("SELECT id, ts, kind, level, message, data FROM events WHERE kind=? ORDER BY id DESC LIMIT ?", (kind, limit))
-        else:
-            cur.execute("SELECT id, ts, kind, level, message, data FROM events ORDER BY id DESC LIMIT ?", (limit,))
-        rows = cur.fetchall()
-        out = []
-        for r in rows:
-            d = {"id": r[0], "ts": r[1], "kind": r[2], "level": r[3], "message": r[4]}
-            try:
-                d["data"] = json.loads(r[5]) if r[5] else None
-            except Exception:
-                d["data"] = None
-            out.append(d)
+            sql += " AND kind=?"
+            params.append(kind)
+        sql += " ORDER BY ts_epoch, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [self._row_to_event(r) for r in self.conn.execute(sql, params)]
+
+    def events_histogram(self, bucket_seconds: int, kind: Optional[str] = None, *, t0=None, t1=None) -> list[tuple[int, int]]:
+        """Nombre d'events par tranche de bucket_seconds, agrégé en SQL.
+
+        Renvoie [(début de tranche en epoch, nombre), ...] trié ; tranches vides omises.
+        """
+        bucket = max(1, int(bucket_seconds))
+        where = ["ts_epoch IS NOT NULL"]
+        params: list = []
+        if kind:
+            where.append("kind=?")
+            params.append(kind)
+        if t0 is not None:
+            where.append("ts_epoch >= ?")
+            params.append(to_epoch(t0))
+        if t1 is not None:
+            where.append("ts_epoch < ?")
+            params.append(to_epoch(t1))
+        sql = (
+            f"SELECT (ts_epoch / {bucket}) * {bucket} AS b, COUNT(*) FROM events "
+            f"WHERE {' AND '.join(where)} GROUP BY b ORDER BY b"
+        )
+        return [(int(b), int(n)) for b, n in self.conn.execute(sql, params)]
+
+    def get_events(self, ids: Iterable[int]) -> List["EventRow"]:
+        """Events par id (clé primaire), triés par id croissant ; ids absents ignorés."""
+        ids = [int(i) for i in ids]
+        out: List[EventRow] = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            out.extend(
+                self._row_to_event(r)
+                for r in self.conn.execute(
+                    f"SELECT id, ts, kind, level, message, data FROM events WHERE id IN ({marks})", chunk
+                )
+            )
+        out.sort(key=lambda e: e["id"])
         return out
 
+    def _row_to_event(self, r: tuple) -> "EventRow":
+        return EventRow(*r, resolver=self._resolve_blobs)
+
     # ---------------- Actions ----------------
     def add_action(self, name: str, status: str, input: Optional[dict] = None, output: Optional[dict] = None) -> int:
-        cur = self.conn.cursor()
-        cur.execute(
-            "INSERT INTO actions(ts, name, status, input, output) VALUES (?, ?, ?, ?, ?)",
-            (ISO(), name, status, json.dumps(input or {}, ensure_ascii=False), json.dumps(output or {}, ensure_ascii=False)),
-        )
-        self.conn.commit()
-        return int(cur.lastrowid)
+        writer = self._writer_client()
+        if writer is not None:
+            return writer.add_action(name, status, input, output)
+        row = (ISO(), name, status, json.dumps(input or {}, ensure_ascii=False), json.dumps(output or {}, ensure_ascii=False))
+        return self._insert("INSERT INTO actions(ts, name, status, input, output) VALUES (?, ?, ?, ?, ?)", lambda: row)
+
+    def _insert(self, sql: str, make_row, *, after=None) -> int:
+        """INSERT + commit, rejoué en bloc si la base reste verrouillée (hors batch()).
+
+        make_row est rappelé à chaque tentative : _event_row() peut écrire des
+        blobs, annulés avec le reste par le rollback. after() (optionnel) est
+        appelé dans la même transaction, avant le commit.
+        """
+        def run() -> int:
+            cur = self.conn.execute(sql, make_row())
+            if after is not None:
+                after()
+            if not self._batch_depth:
+                self.conn.commit()
+            return int(cur.lastrowid)
+        return run() if self._batch_depth else self._retry_locked(run)
 
     # ---------------- Artifacts ----------------
     def add_artifact(self, path: str, meta: Optional[dict] = None, *, content_bytes: bytes | None = None) -> int:
+        writer = self._writer_client()
+        if writer is not None:
+            return writer.add_artifact(path, meta, content_bytes=content_bytes)
         digest = sha256_bytes(content_bytes) if content_bytes is not None else sha256_text(path)
-        cur = self.conn.cursor()
-        cur.execute(
-            "INSERT INTO artifacts(ts, path, sha256, meta) VALUES (?, ?, ?, ?)",
-            (ISO(), path, digest, json.dumps(meta or {}, ensure_ascii=False)),
-        )
-        self.conn.commit()
-        return int(cur.lastrowid)
+        row = (ISO(), path, digest, json.dumps(meta or {}, ensure_ascii=False))
+        return self._insert("INSERT INTO artifacts(ts, path, sha256, meta) VALUES (?, ?, ?, ?)", lambda: row)
+
+    # ---------------- Index (BM25 sur index inversé) ----------------
+    BM25_K1 = 1.2
+    BM25_B = 0.75
 
-    # ---------------- Index (simple) ----------------
     @staticmethod
     def _tokenize(text: str) -> list[str]:
-        import re
-        return [t for t in re.findall(r"[a-zA-Z0-9]+", text.lower()) if t]
+        """Tokenisation de base (accents repliés, sans racinisation)."""
+        return tokenize(text)
+
+    def _index_tokens(self, text: str) -> list[str]:
+        """Tokenisation de l'index : celle enregistrée dans index_stats (racinisation ou non)."""
+        return tokenize(text, stem=self._index_stem_setting())
+
+    def index_configure(self, *, stem: bool) -> bool:
+        """Active/désactive la racinisation française de l'index ; réindexe si le réglage change."""
+        if bool(self._stat("tokenizer.stem")) == bool(stem) and self._stat("tokenizer.version") == TOKENIZER_VERSION:
+            return False
+        self._index_stem = bool(stem)
+        self._index_retokenize(bool(stem))
+        return True
+
+    @routed_write
+    def _index_retokenize(self, stem: bool) -> int:
+        self._index_stem = stem
+        return self.index_rebuild()
+
+    def index_doc_terms(self, doc_id: str) -> Optional["array"]:
+        """term_id distincts (triés) d'un document, None s'il n'est pas indexé."""
+        row = self.conn.execute("SELECT terms FROM index_docs WHERE doc_id=?", (doc_id,)).fetchone()
+        return _unpack_ids(row[0]) if row else None
+
+    def _stat(self, key: str) -> int:
+        row = self.conn.execute("SELECT value FROM index_stats WHERE key=?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _stat_add(self, key: str, delta: int) -> None:
+        self.conn.execute(
+            "INSERT INTO index_stats(key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            (key, delta),
+        )
+
+    def _term_ids(self, terms: Iterable[str], *, create: bool = False) -> dict[str, tuple[int, int]]:
+        """term -> (term_id, df). Avec create=True, les termes absents sont ajoutés (df=0)."""
+        terms = list(terms)
+        if create:
+            self.conn.executemany(
+                "INSERT INTO index_terms(term, df) VALUES (?, 0) ON CONFLICT(term) DO NOTHING",
+                ((t,) for t in terms),
+            )
+        out: dict[str, tuple[int, int]] = {}
+        for i in range(0, len(terms), 500):
+            chunk = terms[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for term_id, term, df in self.conn.execute(
+                f"SELECT term_id, term, df FROM index_terms WHERE term IN ({marks})", chunk
+            ):
+                out[term] = (int(term_id), int(df))
+        return out
+
+    def _index_unpost(self, doc: int, terms: bytes, length: int) -> None:
+        """Retire les postings de doc à partir de ses term_id (aucune recherche de terme)."""
+        ids = _unpack_ids(terms)
+        self.conn.executemany("DELETE FROM index_postings WHERE term_id=? AND doc=?", ((tid, doc) for tid in ids))
+        self.conn.executemany("UPDATE index_terms SET df = df - 1 WHERE term_id=?", ((tid,) for tid in ids))
+        self._stat_add("doc_count", -1)
+        self._stat_add("total_length", -length)
 
     def index_add_document(self, doc_id: str, text: str) -> None:
-        tokens = self._tokenize(text)
-        tok_str = " ".join(tokens)
-        cur = self.conn.cursor()
-        cur.execute(
-            "INSERT OR REPLACE INTO index_docs(doc_id, text, tokens) VALUES (?, ?, ?)",
-            (doc_id, text, tok_str),
+        self.index_add_documents([(doc_id, text)])
+
+    @routed_write
+    def index_add_documents(
+        self, items: Iterable[tuple[str, str]], *, batch_size: int = 1000, processes: int | None = None
+    ) -> int:
+        """Indexation groupée de (doc_id, texte), dans une seule transaction.
+
+        Tokenisation par lots (dans un pool de `processes` processus pour les
+        gros corpus), puis écritures executemany : documents, postings,
+        df agrégés par terme et statistiques mis à jour une fois par lot.
+        Un doc_id déjà indexé est remplacé ; en double dans `items`, le
+        dernier texte l'emporte. Renvoie le nombre de documents traités.
+        """
+        tok = partial(tokenize, stem=self._index_stem_setting())
+        pool = ProcessPoolExecutor(processes) if processes and processes > 1 else None
+        n = 0
+        try:
+            with self.batch():
+                for chunk in _chunks(items, batch_size):
+                    docs = dict(chunk)
+                    texts = list(docs.values())
+                    if pool is not None:
+                        tokens = list(pool.map(tok, texts, chunksize=max(1, len(texts) // (4 * processes))))
+                    else:
+                        tokens = [tok(t) for t in texts]
+                    self._index_write(list(docs), texts, tokens)
+                    n += len(docs)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return n
+
+    def _index_stem_setting(self) -> bool:
+        if self._index_stem is None:
+            self._index_stem = bool(self._stat("tokenizer.stem"))
+        return self._index_stem
+
+    def _index_write(self, doc_ids: list[str], texts: list[str], tokens: list[list[str]]) -> None:
+        """Écrit un lot de documents tokenisés (appelé dans un batch())."""
+        conn = self.conn
+        marks = ",".join("?" * len(doc_ids))
+        old = conn.execute(f"SELECT id, terms, length FROM index_docs WHERE doc_id IN ({marks})", doc_ids).fetchall()
+        df_delta: Counter = Counter()
+        for doc, terms, _ in old:
+            ids = _unpack_ids(terms)
+            conn.executemany("DELETE FROM index_postings WHERE term_id=? AND doc=?", ((tid, doc) for tid in ids))
+            df_delta.update({tid: -1 for tid in ids})
+        conn.executemany(
+            "INSERT INTO index_docs(doc_id, text, terms, length) VALUES (?, ?, x'', ?) "
+            "ON CONFLICT(doc_id) DO UPDATE SET text = excluded.text, length = excluded.length",
+            ((d, t, len(tk)) for d, t, tk in zip(doc_ids, texts, tokens)),
         )
-        self.conn.commit()
+        doc_rows = dict(conn.execute(f"SELECT doc_id, id FROM index_docs WHERE doc_id IN ({marks})", doc_ids))
+        tfs = [Counter(tk) for tk in tokens]
+        term_ids = self._term_ids(set().union(*tfs), create=True)
+        postings, packed = [], []
+        for doc_id, tf in zip(doc_ids, tfs):
+            doc = doc_rows[doc_id]
+            ids = [term_ids[t][0] for t in tf]
+            postings.extend((term_ids[t][0], doc, c) for t, c in tf.items())
+            packed.append((_pack_ids(ids), doc))
+            df_delta.update(ids)
+        conn.executemany("INSERT INTO index_postings(term_id, doc, tf) VALUES (?, ?, ?)", postings)
+        conn.executemany("UPDATE index_docs SET terms=? WHERE id=?", packed)
+        conn.executemany(
+            "UPDATE index_terms SET df = df + ? WHERE term_id=?", ((d, tid) for tid, d in df_delta.items() if d)
+        )
+        self._stat_add("doc_count", len(doc_ids) - len(old))
+        self._stat_add("total_length", sum(len(tk) for tk in tokens) - sum(r[2] for r in old))
+
+    @routed_write
+    def index_remove_document(self, doc_id: str) -> bool:
+        with self.batch():
+            row = self.conn.execute("SELECT id, terms, length FROM index_docs WHERE doc_id=?", (doc_id,)).fetchone()
+            if not row:
+                return False
+            self._index_unpost(int(row[0]), row[1], row[2])
+            self.conn.execute("DELETE FROM index_docs WHERE id=?", (row[0],))
+        return True
+
+    @routed_write
+    def index_rebuild(self, *, batch_size: int = 1000) -> int:
+        """Reconstruit termes, postings et statistiques depuis index_docs."""
+        stem = self._index_stem_setting()
+        with self.batch():
+            self.conn.execute("DELETE FROM index_postings")
+            self.conn.execute("DELETE FROM index_terms")
+            self.conn.execute("DELETE FROM index_stats")
+            self._stat_add("tokenizer.version", TOKENIZER_VERSION)
+            self._stat_add("tokenizer.stem", int(stem))
+            # les docs existants sont réécrits par lots : on repart de stats vides
+            docs = self.conn.execute("SELECT doc_id, text FROM index_docs ORDER BY id").fetchall()
+            self.conn.execute("DELETE FROM index_docs")
+            n = self.index_add_documents(docs, batch_size=batch_size)
+        return n
 
     def index_search(self, query: str, top_k: int = 5) -> list[tuple[str, float]]:
-        q_tokens = set(self._tokenize(query))
-        cur = self.conn.cursor()
-        cur.execute("SELECT doc_id, tokens FROM index_docs")
-        scores: list[tuple[str, float]] = []
-        for doc_id, tok_str in cur.fetchall():
-            d_tokens = set(tok_str.split()) if tok_str else set()
-            if not q_tokens and not d_tokens:
-                score = 0.0
-            else:
-                inter = len(q_tokens & d_tokens)
-                union = len(q_tokens | d_tokens) or 1
-                score = inter / union
-            if score > 0:
-                scores.append((doc_id, score))
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:max(1, top_k)]
+        """Top-k BM25 : ne lit que les postings des termes de la requête."""
+        n_docs = self._stat("doc_count")
+        if n_docs <= 0:
+            return []
+        avgdl = (self._stat("total_length") / n_docs) or 1.0
+        k1, b = self.BM25_K1, self.BM25_B
+
+        scores: dict[int, float] = {}
+        for term_id, df in self._term_ids(set(self._index_tokens(query))).values():
+            if df <= 0:
+                continue
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc, tf, dl in self.conn.execute(
+                "SELECT p.doc, p.tf, d.length FROM index_postings p JOIN index_docs d ON d.id = p.doc "
+                "WHERE p.term_id=?",
+                (term_id,),
+            ):
+                norm = tf + k1 * (1.0 - b + b * dl / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1.0) / norm
+
+        best = heapq.nlargest(max(1, top_k), scores.items(), key=lambda x: x[1])
+        if not best:
+            return []
+        marks = ",".join("?" * len(best))
+        names = dict(self.conn.execute(
+            f"SELECT id, doc_id FROM index_docs WHERE id IN ({marks})", [d for d, _ in best]
+        ))
+        return [(names[d], score) for d, score in best]
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while chunk := list(islice(it, max(1, size))):
+        yield chunk
+
+def _pack_ids(ids: Iterable[int]) -> bytes:
+    """term_id distincts triés, empaquetés en uint32 (array('I'))."""
+    return array("I", sorted(set(ids))).tobytes()
+
+def _unpack_ids(blob: bytes) -> array:
+    out = array("I")
+    out.frombytes(blob or b"")
+    return out
+
+_UNDECODED = object()
+
+class EventRow(Mapping):
+    """Ligne de la table events, compacte (__slots__) et à décodage paresseux.
+
+    `data` n'est désérialisé (json.loads) qu'au premier accès, puis mis en
+    cache : filtrer ou afficher sur id/message ne coûte aucun décodage.
+    Se lit comme un dict : e["message"], e.get("data"), dict(e), e.id.
+    """
+    __slots__ = ("id", "ts", "kind", "level", "message", "_raw", "_data", "_resolver")
+    _KEYS = ("id", "ts", "kind", "level", "message", "data")
+
+    def __init__(self, id: int, ts: str, kind: str, level: str, message: str, raw: Optional[str], *, resolver=None) -> None:
+        self.id = id
+        self.ts = ts
+        self.kind = kind
+        self.level = level
+        self.message = message
+        self._raw = raw
+        self._data = _UNDECODED
+        self._resolver = resolver
+
+    @property
+    def data(self) -> Optional[dict]:
+        if self._data is _UNDECODED:
+            raw = self._raw
+            try:
+                self._data = json.loads(raw) if raw else None
+            except Exception:
+                self._data = None
+            # textes externalisés dans `blobs` : relus de façon transparente
+            if self._resolver is not None and raw and '"$blob"' in raw:
+                self._data = self._resolver(self._data)
+            self._raw = None
+            self._resolver = None
+        return self._data
+
+    def __getitem__(self, key: str):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"EventRow(id={self.id!r}, kind={self.kind!r}, message={self.message!r})"
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self._KEYS}
+
+class EventWriteBuffer:
+    """Write-behind pour les events : accumule en mémoire, écrit par paquets.
+
+    Le paquet est vidé (executemany + un seul commit) dès que max_rows lignes
+    sont en attente, ou qu'un ajout survient plus de max_delay secondes après
+    le dernier flush. flush()/close() (ou la sortie du `with`) vident le reste.
+    L'horodatage de chaque event est pris au moment de l'ajout.
+    """
+    def __init__(self, db: MemoryDB, *, max_rows: int = 500, max_delay: float = 1.0) -> None:
+        self.db = db
+        self.max_rows = max(1, int(max_rows))
+        self.max_delay = float(max_delay)
+        self._pending: list[dict] = []
+        self._last_flush = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add_event(self, kind: str, level: str, message: str, data: Optional[dict] = None) -> None:
+        self._pending.append({"ts": ISO(), "kind": kind, "level": level, "message": message, "data": data})
+        if len(self._pending) >= self.max_rows or time.monotonic() - self._last_flush >= self.max_delay:
+            self.flush()
+
+    def flush(self) -> int:
+        n = self.db.add_events_many(self._pending)
+        self._pending = []
+        self._last_flush = time.monotonic()
+        return n
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "EventWriteBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
 
 def persist_run(db: "MemoryDB", objective: str, status: str, logs: list[str]) -> int:
     return db.add_event(kind="run", level="info", message=f"objective={objective}", data={"status": status, "lines": len(logs)})
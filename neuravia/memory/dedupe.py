@@ -0,0 +1,85 @@
+from __future__ import annotations
+from typing import Optional, Sequence
+
+from .db import MemoryDB, EventRow, step_text
+from .minhash import bands, from_blob, similarity, text_minhash
+
+# Similarité de Jaccard (estimée par MinHash) à partir de laquelle deux steps sont des quasi-doublons.
+STEP_SIMILARITY = 0.6
+
+
+def find_near_duplicates(
+    db: MemoryDB,
+    text: str,
+    *,
+    goal: Optional[str | Sequence[str]] = None,
+    threshold: float = STEP_SIMILARITY,
+    limit: int = 5,
+) -> list[tuple[EventRow, float]]:
+    """agent_step déjà mémorisés proches de `text`, du plus au moins similaire.
+
+    Candidats via les bandes LSH (step_bands), puis similarité estimée sur
+    les signatures complètes. `goal` (texte ou liste de variantes) restreint
+    la recherche aux steps de ces goals.
+    """
+    if not db.readonly:
+        db.sync_step_signatures()
+    sig = text_minhash(text)
+    if sig is None:
+        return []
+    keys = bands(sig)
+    marks = " OR ".join("(band=? AND value=?)" for _ in keys)
+    params: list = [x for i, v in enumerate(keys) for x in (i, v)]
+    sql = (f"SELECT s.event_id, s.minhash FROM step_signatures s WHERE s.event_id IN "
+           f"(SELECT event_id FROM step_bands WHERE {marks})")
+    if goal is not None:
+        goals = [goal] if isinstance(goal, str) else list(goal)
+        sql += f" AND s.event_id IN (SELECT id FROM events WHERE kind='agent_step' AND message IN ({','.join('?' * len(goals))}))"
+        params += goals
+    scored = []
+    for event_id, blob in db.conn.execute(sql, params):
+        score = similarity(sig, from_blob(blob))
+        if score >= threshold:
+            scored.append((event_id, score))
+    scored.sort(key=lambda x: (-x[1], -x[0]))
+    scored = scored[:limit]
+    if not scored:
+        return []
+    marks = ",".join("?" * len(scored))
+    events = {r[0]: db._row_to_event(r) for r in db.conn.execute(
+        f"SELECT id, ts, kind, level, message, data FROM events WHERE id IN ({marks})", [i for i, _ in scored]
+    )}
+    return [(events[i], score) for i, score in scored if i in events]
+
+
+def collapse_near_duplicates(db: MemoryDB, events: Sequence, *, threshold: float = STEP_SIMILARITY) -> list:
+    """Retire les quasi-doublons d'une liste de steps en gardant, par groupe, le plus récent.
+
+    L'ordre d'origine est conservé. Les signatures sont lues dans
+    step_signatures (à défaut, calculées depuis le texte du step).
+    """
+    if not db.readonly:
+        db.sync_step_signatures()
+    ids = [e["id"] for e in events]
+    stored: dict[int, bytes] = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        stored.update(db.conn.execute(
+            f"SELECT event_id, minhash FROM step_signatures WHERE event_id IN ({','.join('?' * len(chunk))})", chunk
+        ))
+    buckets: dict[tuple[int, int], list] = {}
+    keep: set[int] = set()
+    for e in sorted(events, key=lambda e: e["id"], reverse=True):
+        blob = stored.get(e["id"])
+        sig = from_blob(blob) if blob is not None else text_minhash(step_text(e.get("data")))
+        if sig is None:
+            keep.add(e["id"])
+            continue
+        keys = list(enumerate(bands(sig)))
+        seen = {id(s): s for k in keys for s in buckets.get(k, ())}
+        if any(similarity(sig, s) >= threshold for s in seen.values()):
+            continue
+        keep.add(e["id"])
+        for k in keys:
+            buckets.setdefault(k, []).append(sig)
+    return [e for e in events if e["id"] in keep]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import re
+import sqlite3
+
+from .db import MemoryDB, _chunks
+
+# unicode61 + remove_diacritics 2 : "étape", "Etape" et "ETAPE" donnent le même terme.
+DEFAULT_TOKENIZER = "unicode61 remove_diacritics 2"
+
+_QUERY_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def has_fts5() -> bool:
+    try:
+        con = sqlite3.connect(":memory:")
+        try:
+            con.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        finally:
+            con.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def _match_expr(query: str) -> str:
+    """Requête utilisateur -> expression MATCH sûre (termes entre guillemets, OR)."""
+    terms = _QUERY_TERM.findall(query)
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+class FTS5Index:
+    """Index plein texte SQLite FTS5 stocké dans la même base que MemoryDB.
+
+    - tokenizer avec repli des accents (contenu français)
+    - classement bm25() et extraits surlignés via snippet(), calculés par SQLite
+    - doc_id -> rowid FTS via la table fts_docs (suppression/remplacement indexés)
+    """
+    def __init__(self, db: MemoryDB, *, tokenizer: str = DEFAULT_TOKENIZER) -> None:
+        self.db = db
+        if db._columns("fts_docs"):
+            return  # tables déjà créées : aucune écriture (lecteurs d'une base servie par un writer)
+        try:
+            db.conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS index_fts USING fts5(text, tokenize = '{tokenizer}')"
+            )
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"FTS5 indisponible dans ce SQLite ({sqlite3.sqlite_version}): {e}") from e
+        db.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fts_docs (id INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE)"
+        )
+        db._commit()
+
+    def add(self, doc_id: str, text: str) -> None:
+        self.add_many([(doc_id, text)])
+
+    def add_many(self, items, *, batch_size: int = 1000) -> int:
+        """Ajout/remplacement groupé de (doc_id, texte), executemany dans une transaction."""
+        conn = self.db.conn
+        n = 0
+        with self.db.batch():
+            for chunk in _chunks(items, batch_size):
+                docs = dict(chunk)
+                marks = ",".join("?" * len(docs))
+                conn.executemany(
+                    "DELETE FROM index_fts WHERE rowid=?",
+                    conn.execute(f"SELECT id FROM fts_docs WHERE doc_id IN ({marks})", list(docs)).fetchall(),
+                )
+                conn.executemany(
+                    "INSERT INTO fts_docs(doc_id) VALUES (?) ON CONFLICT(doc_id) DO NOTHING", ((d,) for d in docs)
+                )
+                rowids = dict(conn.execute(f"SELECT doc_id, id FROM fts_docs WHERE doc_id IN ({marks})", list(docs)))
+                conn.executemany(
+                    "INSERT INTO index_fts(rowid, text) VALUES (?, ?)", ((rowids[d], t) for d, t in docs.items())
+                )
+                n += len(docs)
+        return n
+
+    def remove(self, doc_id: str) -> bool:
+        conn = self.db.conn
+        with self.db.batch():
+            row = conn.execute("SELECT id FROM fts_docs WHERE doc_id=?", (doc_id,)).fetchone()
+            if not row:
+                return False
+            conn.execute("DELETE FROM index_fts WHERE rowid=?", (row[0],))
+            conn.execute("DELETE FROM fts_docs WHERE id=?", (row[0],))
+        return True
+
+    def search(self, query: str, top_k: int = 5) -> list[tuple[str, float]]:
+        return [(h["doc_id"], h["score"]) for h in self.search_snippets(query, top_k=top_k, width=0)]
+
+    def search_snippets(
+        self, query: str, top_k: int = 5, *, width: int = 12, mark: tuple[str, str] = ("[", "]")
+    ) -> list[dict]:
+        """Top-k bm25 avec extrait surligné (width = nb de tokens ; 0 = pas d'extrait)."""
+        expr = _match_expr(query)
+        if not expr:
+            return []
+        snippet = "snippet(index_fts, 0, ?, ?, '…', ?)" if width > 0 else "''"
+        params: list = [mark[0], mark[1], int(width)] if width > 0 else []
+        rows = self.db.conn.execute(
+            f"SELECT d.doc_id, -bm25(index_fts) AS score, {snippet} "
+            "FROM index_fts JOIN fts_docs d ON d.id = index_fts.rowid "
+            "WHERE index_fts MATCH ? ORDER BY bm25(index_fts) LIMIT ?",
+            params + [expr, max(1, top_k)],
+        ).fetchall()
+        return [{"doc_id": doc_id, "score": float(score), "snippet": snip or ""} for doc_id, score, snip in rows]
@@ -0,0 +1,203 @@
+from __future__ import annotations
+import hashlib
+from typing import Optional
+
+from .db import MemoryDB, ISO, routed_write
+from .simhash import STOPWORDS, bands, from_signed, hamming, text_simhash, to_signed
+from .tokens import tokenize
+
+# Distance de Hamming maximale (sur 64 bits) pour qu'un goal existant soit candidat.
+CLUSTER_DISTANCE = 6
+# Similarité de Jaccard minimale (mots racinisés hors mots vides) pour fusionner un
+# candidat : sur des textes courts, SimHash rapproche des goals qui ne diffèrent que
+# d'un mot de contenu ("... des utilisateurs" / "... des stocks").
+CLUSTER_JACCARD = 0.9
+# kinds dont le message est un goal
+GOAL_KINDS = ("agent_step", "agent_review", "agent_masterplan")
+
+
+def normalize_goal(text: str) -> str:
+    """Forme canonique : minuscules, sans accents ni ponctuation, espaces réduits."""
+    return " ".join(tokenize(text or ""))
+
+
+def goal_id(text: str) -> str:
+    """Identifiant stable d'un goal (hash de la forme canonique)."""
+    return hashlib.sha1(normalize_goal(text).encode("utf-8")).hexdigest()[:16]
+
+
+def goal_terms(text: str) -> frozenset[str]:
+    """Mots racinisés hors mots vides : "les logs" et "le log" donnent le même ensemble."""
+    return frozenset(t for t in tokenize(text or "", stem=True) if t not in STOPWORDS)
+
+
+def _jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _row(r) -> dict:
+    return {"id": r[0], "text": r[1], "norm": r[2], "project": r[3], "cluster": r[4], "ts": r[5], "near": r[6]}
+
+
+_COLS = "id, text, norm, project, cluster, ts, near"
+
+
+def get_goal(db: MemoryDB, text_or_id: str) -> Optional[dict]:
+    """Goal par alias (texte brut), par forme canonique ou par id."""
+    row = db.conn.execute(
+        f"SELECT {_COLS} FROM goals WHERE id = (SELECT goal_id FROM goal_aliases WHERE alias=?)", (text_or_id,)
+    ).fetchone()
+    if row is None:
+        row = db.conn.execute(
+            f"SELECT {_COLS} FROM goals WHERE id IN (?, ?)", (goal_id(text_or_id), text_or_id)
+        ).fetchone()
+    return _row(row) if row else None
+
+
+def _nearest_cluster(db: MemoryDB, text: str, h: int, exclude: str) -> tuple[Optional[str], Optional[str]]:
+    """(cluster à rejoindre, cluster proche non fusionné).
+
+    Candidats via les bandes LSH, à CLUSTER_DISTANCE au plus ; on ne fusionne
+    qu'avec un candidat dont les mots coïncident presque (CLUSTER_JACCARD),
+    sinon le plus proche est seulement noté.
+    """
+    marks = " OR ".join("(band=? AND value=?)" for _ in range(len(bands(h))))
+    params = [x for i, v in enumerate(bands(h)) for x in (i, v)]
+    terms = goal_terms(text)
+    best: tuple[float, int, str] | None = None
+    near: tuple[int, str] | None = None
+    for norm, sig, cluster in db.conn.execute(
+        f"SELECT g.norm, g.simhash, g.cluster FROM goals g WHERE g.id IN "
+        f"(SELECT goal_id FROM goal_bands WHERE {marks}) AND g.id != ?",
+        params + [exclude],
+    ):
+        d = hamming(h, from_signed(sig))
+        if d > CLUSTER_DISTANCE:
+            continue
+        j = _jaccard(terms, goal_terms(norm))
+        if j >= CLUSTER_JACCARD:
+            if best is None or (-j, d) < (-best[0], best[1]):
+                best = (j, d, cluster)
+        elif near is None or d < near[0]:
+            near = (d, cluster)
+    if best is not None:
+        return best[2], None
+    return None, near[1] if near else None
+
+
+@routed_write
+def register_goal(db: MemoryDB, text: str, *, project: Optional[str] = None) -> dict:
+    """Enregistre (idempotent) un goal et son alias brut ; renvoie le goal.
+
+    Une nouvelle forme canonique rejoint le cluster du goal existant le plus
+    proche (SimHash) si leurs mots coïncident presque, sinon elle fonde son
+    propre cluster et le cluster proche est noté dans `near`. `project`
+    n'écrase un projet existant que s'il est fourni.
+    """
+    gid = goal_id(text)
+    with db.batch():
+        if db.conn.execute("SELECT 1 FROM goals WHERE id=?", (gid,)).fetchone() is None:
+            h = text_simhash(text)
+            cluster, near = _nearest_cluster(db, text, h, gid)
+            cluster = cluster or gid
+            if project is None:
+                row = db.conn.execute("SELECT project FROM goals WHERE id=?", (cluster,)).fetchone()
+                project = row[0] if row else None
+            db.conn.execute(
+                "INSERT INTO goals(id, text, norm, simhash, project, cluster, ts, near) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (gid, text.strip(), normalize_goal(text), to_signed(h), project, cluster, ISO(), near),
+            )
+            db.conn.executemany(
+                "INSERT OR IGNORE INTO goal_bands(band, value, goal_id) VALUES (?, ?, ?)",
+                ((i, v, gid) for i, v in enumerate(bands(h))),
+            )
+        elif project is not None:
+            db.conn.execute("UPDATE goals SET project=? WHERE id=?", (project, gid))
+        db.conn.execute("INSERT OR IGNORE INTO goal_aliases(alias, goal_id) VALUES (?, ?)", (text, gid))
+    return get_goal(db, gid)
+
+
+@routed_write
+def sync_goals(db: MemoryDB) -> int:
+    """Enregistre les goals présents dans les events mais pas encore dans `goals` (migration, écrivains externes)."""
+    marks = ",".join("?" * len(GOAL_KINDS))
+    missing = [m for (m,) in db.conn.execute(
+        f"SELECT DISTINCT e.message FROM events e LEFT JOIN goal_aliases a ON a.alias = e.message "
+        f"WHERE e.kind IN ({marks}) AND a.alias IS NULL",
+        GOAL_KINDS,
+    )]
+    with db.batch():
+        for text in missing:
+            register_goal(db, text)
+    return len(missing)
+
+
+def split_loose_clusters(db: MemoryDB) -> int:
+    """Sort de leur cluster les goals trop différents de sa racine (fusions SimHash seules) ; renvoie leur nombre."""
+    loose = [
+        (gid, cluster)
+        for gid, norm, cluster, root in db.conn.execute(
+            "SELECT g.id, g.norm, g.cluster, r.norm FROM goals g JOIN goals r ON r.id = g.cluster WHERE g.id != g.cluster"
+        )
+        if _jaccard(goal_terms(norm), goal_terms(root)) < CLUSTER_JACCARD
+    ]
+    with db.batch():
+        db.conn.executemany("UPDATE goals SET cluster=id, near=? WHERE id=?", ((c, g) for g, c in loose))
+    return len(loose)
+
+
+def goal_variants(db: MemoryDB, text: str) -> list[str]:
+    """Textes bruts (messages d'events) du même cluster que `text`, `text` compris."""
+    goal = get_goal(db, text)
+    if goal is None:
+        return [text]
+    variants = [a for (a,) in db.conn.execute(
+        "SELECT a.alias FROM goals g JOIN goal_aliases a ON a.goal_id = g.id WHERE g.cluster=? ORDER BY a.alias",
+        (goal["cluster"],),
+    )]
+    return variants if text in variants else [text] + variants
+
+
+@routed_write
+def set_project(db: MemoryDB, text_or_id: str, project: Optional[str]) -> int:
+    """Rattache tout le cluster d'un goal à `project` ; renvoie le nombre de goals modifiés."""
+    goal = get_goal(db, text_or_id)
+    if goal is None:
+        return 0
+    cur = db.conn.execute("UPDATE goals SET project=? WHERE cluster=?", (project, goal["cluster"]))
+    db._commit()
+    return cur.rowcount
+
+
+def list_goals(db: MemoryDB, *, project: Optional[str] = None, limit: int = 100) -> list[dict]:
+    """Goals canoniques (un par cluster) avec nombre de runs, filtrés par projet (index)."""
+    sql = (
+        f"SELECT {_COLS} FROM goals WHERE id = cluster"
+        + (" AND project=?" if project is not None else "")
+        + " ORDER BY ts DESC LIMIT ?"
+    )
+    params: list = ([project] if project is not None else []) + [int(limit)]
+    goals = [_row(r) for r in db.conn.execute(sql, params)]
+    for g in goals:
+        g["variants"] = goal_variants(db, g["text"])
+        g["runs"] = _count_runs(db, g["variants"])
+    return goals
+
+
+def _count_runs(db: MemoryDB, variants: list[str]) -> int:
+    """Un run se termine par une revue : COUNT indexé (kind, message)."""
+    marks = ",".join("?" * len(variants))
+    return int(db.conn.execute(
+        f"SELECT COUNT(*) FROM events WHERE kind='agent_review' AND message IN ({marks})", variants
+    ).fetchone()[0])
+
+
+def list_projects(db: MemoryDB) -> list[dict]:
+    """Projets connus avec leur nombre de goals (clusters)."""
+    return [
+        {"project": p, "goals": int(n)}
+        for p, n in db.conn.execute(
+            "SELECT project, COUNT(*) FROM goals WHERE project IS NOT NULL AND id = cluster "
+            "GROUP BY project ORDER BY project"
+        )
+    ]
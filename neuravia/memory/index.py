@@ -1,16 +1,155 @@
 from __future__ import annotations
-from .db import MemoryDB
+from typing import TYPE_CHECKING
+
+from .db import MemoryDB, routed_write
+from .retrieval import event_text
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ..config import Memory
+
+ENGINES = ["simple", "fts5"]
+# events indexés par sync_events() (doc_id "event:<id>")
+INDEXED_KINDS = ("agent_step", "agent_review", "agent_masterplan")
+
 
 class TextIndexerSimple:
     """Façade simple au-dessus de MemoryDB pour l'index texte.
-    - Tokenisation basique alphanumérique
-    - Similarité Jaccard
+    - engine="simple" : tokenisation alphanumérique (accents repliés), index inversé + BM25 (MemoryDB) ;
+      stem=True/False active/désactive la racinisation française (None = réglage de l'index existant)
+    - engine="fts5"   : table virtuelle SQLite FTS5 (accents repliés, bm25(), snippet())
+    Avec events=True, les events INDEXED_KINDS créés depuis la dernière
+    recherche sont indexés avant chaque search() (voir sync_events()).
     """
-    def __init__(self, db: MemoryDB) -> None:
+    def __init__(self, db: MemoryDB, engine: str = "simple", *, stem: bool | None = None, events: bool = False) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Moteur d'index inconnu: {engine!r} (attendu: {', '.join(ENGINES)})")
         self.db = db
+        self.engine = engine
+        self.events = events
+        self._fts = None
+        if engine == "fts5":
+            from .fts import FTS5Index
+            self._fts = FTS5Index(db)
+        elif stem is not None:
+            db.index_configure(stem=stem)
 
     def add(self, doc_id: str, text: str) -> None:
-        self.db.index_add_document(doc_id, text)
+        self.add_many([(doc_id, text)])
+
+    def add_many(self, items, *, batch_size: int = 1000, processes: int | None = None) -> int:
+        """Indexation groupée de (doc_id, texte) ; processes : pool de tokenisation (moteur simple)."""
+        return _add_many(self.db, self.engine, items, batch_size=batch_size, processes=processes)
+
+    def remove(self, doc_id: str) -> bool:
+        return _remove(self.db, self.engine, doc_id)
+
+    def sync_events(self, *, kinds=INDEXED_KINDS, batch_size: int = 1000) -> int:
+        """Indexe les events créés depuis le dernier appel (filigrane sur events.id, par moteur)."""
+        return sync_event_index(self.db, self.engine, kinds=list(kinds), batch_size=batch_size)
 
     def search(self, query: str, top_k: int = 5):
+        if self.events:
+            self.sync_events()
+        if self._fts is not None:
+            return self._fts.search(query, top_k=top_k)
         return self.db.index_search(query, top_k=top_k)
+
+    def search_snippets(self, query: str, top_k: int = 5, *, width: int = 12) -> list[dict]:
+        """Résultats avec extrait surligné ([terme]) autour des termes de la requête."""
+        if self.events:
+            self.sync_events()
+        if self._fts is not None:
+            return self._fts.search_snippets(query, top_k=top_k, width=width)
+        hits = self.db.index_search(query, top_k=top_k)
+        if not hits:
+            return []
+        marks = ",".join("?" * len(hits))
+        texts = dict(self.db.conn.execute(
+            f"SELECT doc_id, text FROM index_docs WHERE doc_id IN ({marks})", [d for d, _ in hits]
+        ))
+        terms = set(self.db._index_tokens(query))
+        return [
+            {"doc_id": d, "score": score, "snippet": _highlight(texts.get(d, ""), terms, width, self.db._index_tokens)}
+            for d, score in hits
+        ]
+
+
+def _highlight(text: str, terms: set[str], width: int, tokenize=MemoryDB._tokenize) -> str:
+    """Extrait de `width` mots centré sur le premier terme trouvé, termes entre crochets."""
+    words = text.split()
+    hit = [i for i, w in enumerate(words) if set(tokenize(w)) & terms]
+    start = max(0, (hit[0] if hit else 0) - width // 2)
+    out = []
+    for w in words[start:start + max(1, width)]:
+        out.append(f"[{w}]" if set(tokenize(w)) & terms else w)
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + width < len(words) else ""
+    return prefix + " ".join(out) + suffix
+
+
+# Écritures de l'index par moteur : fonctions de module (routed_write), exécutées
+# par le MemoryWriter quand la base en utilise un.
+def _engine(db: MemoryDB, engine: str):
+    if engine == "fts5":
+        from .fts import FTS5Index
+        return FTS5Index(db)
+    return None
+
+
+@routed_write
+def _add_many(db: MemoryDB, engine: str, items, *, batch_size: int = 1000, processes: int | None = None) -> int:
+    fts = _engine(db, engine)
+    if fts is not None:
+        return fts.add_many(items, batch_size=batch_size)
+    return db.index_add_documents(items, batch_size=batch_size, processes=processes)
+
+
+@routed_write
+def _remove(db: MemoryDB, engine: str, doc_id: str) -> bool:
+    fts = _engine(db, engine)
+    return fts.remove(doc_id) if fts is not None else db.index_remove_document(doc_id)
+
+
+@routed_write
+def sync_event_index(db: MemoryDB, engine: str = "simple", *, kinds=INDEXED_KINDS, batch_size: int = 1000) -> int:
+    """Indexe (moteur `engine`) les events créés depuis le dernier appel (filigrane index.<engine>.events_id)."""
+    key = f"index.{engine}.events_id"
+    kinds = list(kinds)
+    marks = ",".join("?" * len(kinds))
+    last = db.get_meta(key)
+    added = 0
+    while True:
+        rows = db.conn.execute(
+            f"SELECT id, ts, kind, level, message, data FROM events WHERE id > ? AND kind IN ({marks}) "
+            "ORDER BY id LIMIT ?",
+            [last, *kinds, batch_size],
+        ).fetchall()
+        if not rows:
+            break
+        events = [db._row_to_event(r) for r in rows]
+        with db.batch():
+            added += _add_many(db, engine, [(f"event:{e.id}", event_text(e)) for e in events])
+            last = events[-1].id
+            db.set_meta(key, last)
+    return added
+
+
+def open_indexer(db: MemoryDB, memory: "Memory") -> TextIndexerSimple | None:
+    """Index texte selon la config ([memory] index_*), None si désactivé."""
+    if not memory.index_enabled:
+        return None
+    return TextIndexerSimple(db, engine=memory.index_engine, stem=memory.index_stemming, events=memory.index_events)
+
+
+@routed_write
+def forget_events(db: MemoryDB, event_ids) -> int:
+    """Retire les documents "event:<id>" des deux moteurs (events supprimés ou archivés)."""
+    doc_ids = [f"event:{i}" for i in event_ids]
+    n = 0
+    with db.batch():
+        if db._columns("fts_docs"):
+            from .fts import FTS5Index
+            fts = FTS5Index(db)
+            n += sum(fts.remove(d) for d in doc_ids)
+        n += sum(db.index_remove_document(d) for d in doc_ids)
+    return n
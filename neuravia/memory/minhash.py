@@ -0,0 +1,65 @@
+from __future__ import annotations
+import hashlib
+import random
+import struct
+from array import array
+from typing import Iterable
+
+from .simhash import STOPWORDS
+from .tokens import tokenize
+
+# 60 permutations en 20 bandes de 3 lignes : deux textes de similarité de
+# Jaccard 0.6 partagent une bande avec une probabilité > 0.99 (0.42 à 0.3).
+NUM_PERM = 60
+BANDS = 20
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_MAX = (1 << 61) - 1
+
+_rnd = random.Random(0x6E657572)  # graine fixe : signatures stables d'un process à l'autre
+_PERMS = [(_rnd.randrange(1, _PRIME), _rnd.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def _hash61(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little") & _MAX
+
+
+def text_shingles(text: str) -> set[str]:
+    """Ensemble des tokens repliés et racinisés, hors mots vides."""
+    return {t for t in tokenize(text, stem=True) if t not in STOPWORDS}
+
+
+def minhash(features: Iterable[str]) -> array | None:
+    """Signature MinHash (NUM_PERM valeurs) d'un ensemble ; None s'il est vide."""
+    hashes = [_hash61(f) for f in set(features)]
+    if not hashes:
+        return None
+    return array("Q", (min((a * x + b) % _PRIME for x in hashes) for a, b in _PERMS))
+
+
+def text_minhash(text: str) -> array | None:
+    return minhash(text_shingles(text))
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimation de la similarité de Jaccard : part des minima égaux."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def bands(sig: array) -> list[int]:
+    """Clés LSH (INTEGER SQLite signé) des BANDS bandes de ROWS valeurs."""
+    out = []
+    for i in range(BANDS):
+        chunk = struct.pack(f"<{ROWS}Q", *sig[i * ROWS:(i + 1) * ROWS])
+        out.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True))
+    return out
+
+
+def to_blob(sig: array) -> bytes:
+    return sig.tobytes()
+
+
+def from_blob(blob: bytes) -> array:
+    out = array("Q")
+    out.frombytes(blob)
+    return out
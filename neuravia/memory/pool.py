@@ -0,0 +1,51 @@
+from __future__ import annotations
+import threading
+from pathlib import Path
+
+from .db import MemoryDB
+
+
+class MemoryDBPool:
+    """Connexions MemoryDB partagées, une par thread et par mode (lecture / écriture).
+
+    Pensé pour les processus longs (dashboard web) : au lieu d'ouvrir une base
+    (connect + PRAGMA + schéma) à chaque requête, chaque thread réutilise sa
+    connexion. Les connexions en lecture seule (mode=ro) servent les GET ; le
+    schéma est garanti par une première ouverture en écriture.
+
+    Les MemoryDB renvoyées par get() appartiennent au pool : ne pas les fermer,
+    utiliser close_all() à l'arrêt.
+    """
+    def __init__(self, path: str | Path) -> None:
+        self.path = str(path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened: list[MemoryDB] = []
+        self._schema_ready = False
+
+    def ensure_schema(self) -> None:
+        with self._lock:
+            if not self._schema_ready:
+                MemoryDB(self.path).close()
+                self._schema_ready = True
+
+    def get(self, *, readonly: bool = False) -> MemoryDB:
+        attr = "ro" if readonly else "rw"
+        db = getattr(self._local, attr, None)
+        if db is None:
+            self.ensure_schema()
+            # check_same_thread=False uniquement pour permettre close_all() depuis
+            # le thread d'arrêt ; chaque connexion n'est utilisée que par son thread.
+            db = MemoryDB(self.path, readonly=readonly, check_same_thread=False)
+            setattr(self._local, attr, db)
+            with self._lock:
+                self._opened.append(db)
+        return db
+
+    def close_all(self) -> None:
+        with self._lock:
+            opened, self._opened = self._opened, []
+            # les threads qui reviendraient rouvriront une connexion neuve
+            self._local = threading.local()
+        for db in opened:
+            db.close()
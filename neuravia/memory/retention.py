@@ -0,0 +1,200 @@
+from __future__ import annotations
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Mapping, Optional
+
+from .db import MemoryDB, EventRow, to_epoch
+from .index import forget_events
+
+DEFAULT_ARCHIVE_DIR = "data/archive"
+
+_ARCHIVE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS arch.events (
+        id INTEGER PRIMARY KEY,
+        ts TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        level TEXT NOT NULL,
+        message TEXT NOT NULL,
+        data TEXT,
+        ts_epoch INTEGER
+    );""",
+    """CREATE INDEX IF NOT EXISTS arch.idx_events_ts_epoch ON events(ts_epoch);""",
+    """CREATE INDEX IF NOT EXISTS arch.idx_events_kind_ts_epoch ON events(kind, ts_epoch);""",
+]
+
+
+def archive_path(archive_dir: str | Path, month: str) -> Path:
+    """Fichier d'archive mensuel : <archive_dir>/events-YYYY-MM.db."""
+    return Path(archive_dir) / f"events-{month}.db"
+
+
+def _month_bounds(month: str) -> tuple[int, int]:
+    y, m = (int(x) for x in month.split("-"))
+    start = datetime(y, m, 1, tzinfo=timezone.utc)
+    end = datetime(y + (m == 12), m % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def _expired_where(ttl_days: Mapping[str, float], now: float) -> tuple[str, list]:
+    """Clause WHERE des events expirés ; "*" = TTL par défaut des kinds non listés.
+
+    Un TTL <= 0 (ou absent) signifie "conserver indéfiniment".
+    """
+    explicit = [k for k in ttl_days if k != "*"]
+    clauses, params = [], []
+    for kind in explicit:
+        days = ttl_days[kind]
+        if days and days > 0:
+            clauses.append("(kind=? AND ts_epoch < ?)")
+            params += [kind, int(now - days * 86400)]
+    days = ttl_days.get("*")
+    if days and days > 0:
+        marks = ",".join("?" * len(explicit))
+        clauses.append(f"(kind NOT IN ({marks}) AND ts_epoch < ?)" if explicit else "(ts_epoch < ?)")
+        params += [*explicit, int(now - days * 86400)]
+    return " OR ".join(clauses), params
+
+
+def _inline(db: MemoryDB, raw: Optional[str]) -> Optional[str]:
+    """Réintègre les textes externalisés : une archive ne dépend pas de `blobs`."""
+    if not raw or '"$blob"' not in raw:
+        return raw
+    try:
+        data = json.loads(raw)
+    except Exception:
+        return raw
+    return json.dumps(db._resolve_blobs(data), ensure_ascii=False)
+
+
+def apply_retention(
+    db: MemoryDB,
+    ttl_days: Mapping[str, float],
+    *,
+    archive_dir: str | Path = DEFAULT_ARCHIVE_DIR,
+    now: float | None = None,
+    batch_size: int = 1000,
+) -> dict:
+    """Déplace les events expirés vers des archives SQLite mensuelles.
+
+    Par mois : ATTACH de l'archive, copie (INSERT OR REPLACE, id conservé,
+    blobs réintégrés) puis suppression de la base principale, par lots.
+    La copie précède la suppression : après une interruption, relancer
+    archive à nouveau les mêmes lignes sans doublon. Les documents d'index
+    "event:<id>" sont retirés avec leurs events, puis les blobs qui ne sont
+    plus référencés sont supprimés. Tout passe par la connexion locale, même
+    si la base utilise un MemoryWriter (voir MemoryDB.direct_writes).
+    """
+    now = time.time() if now is None else now
+    where, params = _expired_where(ttl_days, now)
+    stats = {"events": 0, "archives": [], "blobs": 0}
+    if not where:
+        return stats
+    db.conn.commit()  # ATTACH est interdit dans une transaction
+    months = [m for (m,) in db.conn.execute(
+        f"SELECT DISTINCT strftime('%Y-%m', ts_epoch, 'unixepoch') FROM events WHERE {where} ORDER BY 1", params
+    )]
+    with db.direct_writes():  # forget_events sous le verrou tenu par cette connexion
+        for month in months:
+            path = archive_path(archive_dir, month)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            lo, hi = _month_bounds(month)
+            db.conn.execute("ATTACH DATABASE ? AS arch", (str(path),))
+            try:
+                for stmt in _ARCHIVE_SCHEMA:
+                    db.conn.execute(stmt)
+                db.conn.commit()
+                while True:
+                    rows = db.conn.execute(
+                        "SELECT id, ts, kind, level, message, data, ts_epoch FROM events "
+                        f"WHERE ts_epoch >= ? AND ts_epoch < ? AND ({where}) ORDER BY id LIMIT ?",
+                        [lo, hi, *params, batch_size],
+                    ).fetchall()
+                    if not rows:
+                        break
+                    with db.batch():
+                        db.conn.executemany(
+                            "INSERT OR REPLACE INTO arch.events(id, ts, kind, level, message, data, ts_epoch) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            ((i, ts, k, lv, msg, _inline(db, raw), ep) for i, ts, k, lv, msg, raw, ep in rows),
+                        )
+                        db.conn.executemany("DELETE FROM events WHERE id=?", ((r[0],) for r in rows))
+                        forget_events(db, [r[0] for r in rows])
+                    stats["events"] += len(rows)
+            finally:
+                db.conn.execute("DETACH DATABASE arch")
+            stats["archives"].append(str(path))
+    stats["blobs"] = gc_blobs(db)
+    return stats
+
+
+def gc_blobs(db: MemoryDB) -> int:
+    """Supprime les blobs qui ne sont plus référencés par aucun event."""
+    cur = db.conn.execute(
+        """DELETE FROM blobs WHERE sha256 NOT IN (
+            SELECT json_extract(j.value, '$."$blob"') FROM events e, json_each(e.data) j
+            WHERE e.data LIKE '%"$blob"%' AND j.type = 'object'
+              AND json_extract(j.value, '$."$blob"') IS NOT NULL
+        )"""
+    )
+    db._commit()
+    return cur.rowcount
+
+
+def _db_bytes(db: MemoryDB) -> int:
+    base = Path(db.path)
+    return sum(p.stat().st_size for p in (base, Path(f"{base}-wal")) if p.exists())
+
+
+def compact(db: MemoryDB, *, analyze: bool = True) -> dict:
+    """VACUUM incrémental (+ ANALYZE) ; renvoie la taille disque avant/après.
+
+    Une base créée avant auto_vacuum=INCREMENTAL est convertie par un VACUUM
+    complet (une seule fois) ; ensuite seules les pages libres sont rendues.
+    """
+    db.conn.commit()
+    before = _db_bytes(db)
+    if int(db.conn.execute("PRAGMA auto_vacuum").fetchone()[0]) != 2:
+        db.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        db.conn.execute("VACUUM")
+    else:
+        db.conn.execute("PRAGMA incremental_vacuum")
+    if analyze:
+        db.conn.execute("ANALYZE")
+    db.conn.commit()
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    after = _db_bytes(db)
+    return {"bytes_before": before, "bytes_after": after, "reclaimed": max(0, before - after)}
+
+
+def historical_events(
+    db: MemoryDB, t0, t1, kind: Optional[str] = None, *, archive_dir: str | Path = DEFAULT_ARCHIVE_DIR
+) -> list[EventRow]:
+    """events_between() étendu aux archives mensuelles (attachées le temps de la requête)."""
+    t0, t1 = to_epoch(t0), to_epoch(t1)
+    rows: list[tuple] = []
+    db.conn.commit()
+    month = datetime.fromtimestamp(t0, timezone.utc).strftime("%Y-%m")
+    while True:
+        lo, hi = _month_bounds(month)
+        if lo >= t1:
+            break
+        path = archive_path(archive_dir, month)
+        if path.exists():
+            db.conn.execute("ATTACH DATABASE ? AS arch", (str(path),))
+            try:
+                sql = ("SELECT id, ts, kind, level, message, data, ts_epoch FROM arch.events "
+                       "WHERE ts_epoch >= ? AND ts_epoch < ?")
+                args: list = [t0, t1]
+                if kind:
+                    sql += " AND kind=?"
+                    args.append(kind)
+                rows += db.conn.execute(sql, args).fetchall()
+            finally:
+                db.conn.execute("DETACH DATABASE arch")
+        month = datetime.fromtimestamp(hi, timezone.utc).strftime("%Y-%m")
+    archived = [EventRow(*r[:6]) for r in sorted(rows, key=lambda r: (r[6], r[0]))]
+    seen = {e.id for e in archived}
+    live = [e for e in db.events_between(t0, t1, kind=kind) if e.id not in seen]
+    return sorted(archived + live, key=lambda e: (to_epoch(e.ts), e.id))
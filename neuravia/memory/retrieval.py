@@ -0,0 +1,107 @@
+from __future__ import annotations
+from typing import Iterable, List
+
+from .db import MemoryDB, routed_write
+
+# "goal"   : uniquement les events du même goal (requête indexée kind/message/id)
+# "vector" : + voisins sémantiques, recherche exacte dans le VectorStore
+# "ann"    : + voisins sémantiques, recherche approximative IVF
+RETRIEVAL_MODES = ["goal", "vector", "ann"]
+SEMANTIC_KINDS = ("agent_step", "agent_review")
+_WATERMARK_KEY = "vectors.events_id"
+
+
+def event_text(e: dict) -> str:
+    """Texte représentatif d'un event mémoire (goal + champs utiles de data)."""
+    data = e.get("data") or {}
+    parts = [e.get("message") or ""]
+    for key in ("title", "action", "content", "summary"):
+        v = data.get(key)
+        if isinstance(v, str):
+            parts.append(v)
+    improvements = data.get("improvements")
+    if isinstance(improvements, list):
+        parts.extend(str(i) for i in improvements)
+    # master-plan : étapes (titre, action, résultat attendu) + notes
+    steps = data.get("steps")
+    if isinstance(steps, list):
+        for s in steps:
+            if isinstance(s, dict):
+                parts.extend(str(s[k]) for k in ("title", "action", "expected_result") if s.get(k))
+    if isinstance(data.get("notes"), str):
+        parts.append(data["notes"])
+    return "\n".join(p for p in parts if p)
+
+
+def sync_event_vectors(db: MemoryDB, store, *, kinds: Iterable[str] = SEMANTIC_KINDS, batch_size: int = 1000) -> int:
+    """Vectorise les events créés depuis le dernier appel (filigrane sur events.id)."""
+    kinds = list(kinds)
+    marks = ",".join("?" * len(kinds))
+    last = db.get_meta(_WATERMARK_KEY)
+    added = 0
+    while True:
+        rows = db.conn.execute(
+            f"SELECT id, ts, kind, level, message, data FROM events WHERE id > ? AND kind IN ({marks}) "
+            "ORDER BY id LIMIT ?",
+            [last, *kinds, batch_size],
+        ).fetchall()
+        if not rows:
+            break
+        events = [db._row_to_event(r) for r in rows]
+        added += store.add_many((f"event:{e['id']}", event_text(e)) for e in events)
+        last = events[-1]["id"]
+        db.set_meta(_WATERMARK_KEY, last)
+    return added
+
+
+@routed_write
+def sync_semantic_index(db: MemoryDB) -> int:
+    """Vectorise les nouveaux events dans le VectorStore par défaut de la base (<db>.vectors.npy)."""
+    from .vectors import open_store
+    return sync_event_vectors(db, open_store(db))
+
+
+def semantic_events(db: MemoryDB, query: str, *, kinds: Iterable[str], top_k: int, mode: str = "vector") -> List[dict]:
+    """Events sémantiquement proches de `query` (du plus ancien au plus récent).
+
+    Lève RuntimeError si NumPy n'est pas installé.
+    """
+    from .vectors import _require_numpy, open_store
+    _require_numpy()
+    kinds = set(kinds)
+    sync_semantic_index(db)
+    # store et index gardés par base : ni DDL ni remappage du fichier à chaque appel
+    store = open_store(db)
+    if mode == "ann":
+        from .ann import open_ivf
+        index = open_ivf(store)
+    else:
+        index = store
+    # on sur-échantillonne : le store mélange steps et reviews
+    hits = index.search(query, top_k=max(1, top_k) * len(SEMANTIC_KINDS))
+    ids = [int(ref.split(":", 1)[1]) for ref, _ in hits if ref.startswith("event:")]
+    events = [e for e in db.get_events(ids) if e["kind"] in kinds]
+    rank = {i: n for n, i in enumerate(ids)}
+    events.sort(key=lambda e: rank[e["id"]])
+    events = events[:top_k]
+    events.sort(key=lambda e: e["id"])
+    return events
+
+
+def with_neighbours(db: MemoryDB, goal: str, events: List[dict], *, kind: str, limit: int, mode: str) -> List[dict]:
+    """Complète `events` (ceux du goal) par des voisins sémantiques jusqu'à `limit`.
+
+    En mode "goal" (ou si le goal a déjà assez d'historique), rien ne change.
+    Sans NumPy, on garde le résultat du goal et on le signale.
+    """
+    room = limit - len(events)
+    if mode == "goal" or room <= 0:
+        return events
+    try:
+        neighbours = semantic_events(db, goal, kinds=[kind], top_k=limit, mode=mode)
+    except RuntimeError as e:
+        print(f"[mémoire] retrieval '{mode}' indisponible ({e}) ; repli sur le goal exact.")
+        return events
+    seen = {e["id"] for e in events}
+    extra = [e for e in neighbours if e["id"] not in seen][:room]
+    return sorted(events + extra, key=lambda e: e["id"])
@@ -0,0 +1,67 @@
+from __future__ import annotations
+import hashlib
+from typing import Iterable
+
+from .tokens import tokenize
+
+BITS = 64
+# 8 bandes de 8 bits : deux empreintes à distance de Hamming <= 7 partagent
+# forcément au moins une bande (principe des tiroirs) -> candidates LSH.
+BANDS = 8
+_BAND_BITS = BITS // BANDS
+_MASK = (1 << BITS) - 1
+
+# mots vides (français/anglais) ignorés pour comparer des formulations courtes
+STOPWORDS = frozenset(
+    "a au aux avec ce ces cette d dans de des du en et l la le les ma mes mon ou par pour sa ses son sur un une"
+    " an and for in of on the to with".split()
+)
+
+
+def _hash64(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(features: Iterable[tuple[str, float]]) -> int:
+    """Empreinte SimHash 64 bits (non signée) de features pondérées."""
+    acc = [0.0] * BITS
+    for feat, weight in features:
+        h = _hash64(feat)
+        for i in range(BITS):
+            acc[i] += weight if (h >> i) & 1 else -weight
+    out = 0
+    for i, v in enumerate(acc):
+        if v > 0:
+            out |= 1 << i
+    return out
+
+
+def text_features(text: str, *, bigrams: bool = True) -> list[tuple[str, float]]:
+    """Tokens repliés et racinisés (hors mots vides), + bigrammes de poids 0.5."""
+    toks = [t for t in tokenize(text, stem=True) if t not in STOPWORDS]
+    feats = [(t, 1.0) for t in toks]
+    if bigrams:
+        feats += [(f"{a} {b}", 0.5) for a, b in zip(toks, toks[1:])]
+    return feats
+
+
+def text_simhash(text: str) -> int:
+    return simhash(text_features(text))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count("1")
+
+
+def bands(h: int) -> list[int]:
+    """Valeurs des BANDS bandes de l'empreinte (clés de la table LSH)."""
+    return [(h >> (i * _BAND_BITS)) & ((1 << _BAND_BITS) - 1) for i in range(BANDS)]
+
+
+def to_signed(h: int) -> int:
+    """Empreinte non signée -> INTEGER SQLite (64 bits signé)."""
+    return h - (1 << BITS) if h >= 1 << (BITS - 1) else h
+
+
+def from_signed(v: int) -> int:
+    return v & _MASK
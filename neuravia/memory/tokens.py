@@ -0,0 +1,54 @@
+from __future__ import annotations
+import re
+import unicodedata
+from functools import lru_cache
+
+# À incrémenter quand la tokenisation change : l'index BM25 est alors reconstruit à l'ouverture.
+TOKENIZER_VERSION = 2
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_COMBINING_RE = re.compile(r"[\u0300-\u036f]+")
+# ligatures que NFKD ne décompose pas
+_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+
+# Suffixes retirés par le raciniseur léger (du plus long au plus court).
+_FR_SUFFIXES = (
+    "issements", "issement", "atrices", "ements", "ateurs", "ations",
+    "atrice", "ateur", "ation", "ement", "euses", "euse", "ites", "ite",
+    "ives", "ive", "ifs", "if", "er", "ir", "ez", "e",
+)
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents ("Étape déjà" -> "etape deja")."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return _COMBINING_RE.sub("", unicodedata.normalize("NFKD", text.translate(_LIGATURES)))
+
+
+@lru_cache(maxsize=65536)
+def stem_fr(word: str) -> str:
+    """Racinisation légère du français (pluriels, féminins, infinitifs, suffixes courants).
+
+    Volontairement conservatrice : on ne coupe que si la racine garde au
+    moins 3 caractères, et on ne traite que des mots déjà repliés (fold()).
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("aux") and len(word) > 5:
+        return word[:-3] + "al"
+    if word[-1] in "sx":
+        word = word[:-1]
+    for suffix in _FR_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str, *, stem: bool = False) -> list[str]:
+    """Tokens alphanumériques repliés (accents, ligatures), racinisés si stem=True."""
+    tokens = _WORD_RE.findall(fold(text))
+    if stem:
+        return [stem_fr(t) for t in tokens]
+    return tokens
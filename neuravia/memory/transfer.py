@@ -0,0 +1,223 @@
+from __future__ import annotations
+import gzip
+import json
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from .db import MemoryDB, routed_write
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover - dépendance optionnelle (pip install neuravia[parquet])
+    pa = pq = None
+
+FORMATS = ["jsonl", "parquet"]
+MANIFEST = "manifest.json"
+EXPORT_VERSION = 1
+
+# Colonnes exportées par table (id = curseur keyset, non réimporté).
+TABLES: dict[str, list[str]] = {
+    "events": ["id", "ts", "kind", "level", "message", "data"],
+    "actions": ["id", "ts", "name", "status", "input", "output"],
+    "artifacts": ["id", "ts", "path", "sha256", "meta"],
+    "index_docs": ["id", "doc_id", "text"],
+}
+# Colonnes JSON : objets dans le JSONL, texte JSON dans le Parquet.
+_JSON_COLUMNS = {"data", "input", "output", "meta"}
+
+Progress = Optional[Callable[[str, int], None]]
+
+
+def has_pyarrow() -> bool:
+    return pq is not None
+
+
+def _require_pyarrow() -> None:
+    if pq is None:
+        raise RuntimeError("pyarrow requis pour le format parquet (pip install 'neuravia[parquet]').")
+
+
+def _table_path(directory: Path, table: str, fmt: str) -> Path:
+    return directory / (f"{table}.jsonl.gz" if fmt == "jsonl" else f"{table}.parquet")
+
+
+def iter_table(db: MemoryDB, table: str, *, batch_size: int = 1000) -> Iterator[list[dict]]:
+    """Lots de lignes d'une table, par curseur keyset sur id (mémoire bornée).
+
+    Les colonnes JSON sont décodées ; les textes externalisés dans `blobs`
+    sont réintégrés, l'export ne dépend donc pas de la table `blobs`.
+    """
+    cols = TABLES[table]
+    last = 0
+    while True:
+        rows = db.conn.execute(
+            f"SELECT {', '.join(cols)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (last, batch_size)
+        ).fetchall()
+        if not rows:
+            return
+        out = []
+        for r in rows:
+            item = dict(zip(cols, r))
+            for c in _JSON_COLUMNS.intersection(item):
+                try:
+                    item[c] = json.loads(item[c]) if item[c] else None
+                except Exception:
+                    item[c] = None
+            if table == "events":
+                item["data"] = db._resolve_blobs(item["data"])
+            out.append(item)
+        last = rows[-1][0]
+        yield out
+
+
+def export_memory(
+    db: MemoryDB,
+    directory: str | Path,
+    *,
+    fmt: str = "jsonl",
+    tables: Optional[list[str]] = None,
+    batch_size: int = 1000,
+    progress: Progress = None,
+) -> dict[str, int]:
+    """Exporte les tables dans `directory` (un fichier par table + manifest.json)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu: {fmt!r} (attendu: {', '.join(FORMATS)})")
+    if fmt == "parquet":
+        _require_pyarrow()
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    counts: dict[str, int] = {}
+    for table in tables or list(TABLES):
+        path = _table_path(directory, table, fmt)
+        batches = iter_table(db, table, batch_size=batch_size)
+        if fmt == "jsonl":
+            counts[table] = _write_jsonl(path, table, batches, progress)
+        else:
+            counts[table] = _write_parquet(path, table, batches, progress)
+    manifest = {"version": EXPORT_VERSION, "format": fmt, "tables": counts}
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return counts
+
+
+def _write_jsonl(path: Path, table: str, batches, progress: Progress) -> int:
+    n = 0
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+        for batch in batches:
+            for item in batch:
+                f.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+            n += len(batch)
+            if progress:
+                progress(table, n)
+    return n
+
+
+def _parquet_schema(table: str):
+    return pa.schema([(c, pa.int64() if c == "id" else pa.string()) for c in TABLES[table]])
+
+
+def _write_parquet(path: Path, table: str, batches, progress: Progress) -> int:
+    n = 0
+    schema = _parquet_schema(table)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for batch in batches:
+            columns = {
+                c: [json.dumps(item[c], ensure_ascii=False) if c in _JSON_COLUMNS else item[c] for item in batch]
+                for c in TABLES[table]
+            }
+            writer.write_table(pa.table(columns, schema=schema))  # un row group par lot
+            n += len(batch)
+            if progress:
+                progress(table, n)
+    return n
+
+
+def _read_jsonl(path: Path, batch_size: int) -> Iterator[list[dict]]:
+    batch: list[dict] = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _read_parquet(path: Path, batch_size: int) -> Iterator[list[dict]]:
+    _require_pyarrow()
+    for rb in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        batch = rb.to_pylist()
+        for item in batch:
+            for c in _JSON_COLUMNS.intersection(item):
+                item[c] = json.loads(item[c]) if item[c] else None
+        yield batch
+
+
+def _dump(value) -> str:
+    return json.dumps(value or {}, ensure_ascii=False)
+
+
+@routed_write
+def _import_batch(db: MemoryDB, table: str, batch: list[dict]) -> None:
+    if table == "events":
+        db.add_events_many(
+            {"kind": e["kind"], "level": e["level"], "message": e["message"], "data": e.get("data"), "ts": e["ts"]}
+            for e in batch
+        )
+        return
+    with db.batch():
+        if table == "actions":
+            db.conn.executemany(
+                "INSERT INTO actions(ts, name, status, input, output) VALUES (?, ?, ?, ?, ?)",
+                ((a["ts"], a["name"], a["status"], _dump(a.get("input")), _dump(a.get("output"))) for a in batch),
+            )
+        elif table == "artifacts":
+            db.conn.executemany(
+                "INSERT INTO artifacts(ts, path, sha256, meta) VALUES (?, ?, ?, ?)",
+                ((a["ts"], a["path"], a["sha256"], _dump(a.get("meta"))) for a in batch),
+            )
+        else:
+            # "event:<id>" désigne un event de la base source : les events importés
+            # ont de nouveaux id, le filigrane de sync_event_index les réindexera.
+            docs = [(d["doc_id"], d["text"]) for d in batch if not d["doc_id"].startswith("event:")]
+            if docs:
+                db.index_add_documents(docs, batch_size=len(docs))
+
+
+def import_memory(
+    db: MemoryDB,
+    directory: str | Path,
+    *,
+    tables: Optional[list[str]] = None,
+    batch_size: int = 1000,
+    progress: Progress = None,
+) -> dict[str, int]:
+    """Importe un export (format lu dans manifest.json), une transaction par lot.
+
+    Les lignes sont ajoutées avec de nouveaux id (horodatages d'origine
+    conservés) ; les documents d'index existants sont remplacés, sauf ceux
+    des events ("event:<id>"), réindexés sous leur nouvel id par
+    sync_event_index().
+    """
+    directory = Path(directory)
+    manifest = json.loads((directory / MANIFEST).read_text(encoding="utf-8"))
+    if manifest.get("version") != EXPORT_VERSION:
+        raise ValueError(f"Version d'export non supportée: {manifest.get('version')!r}")
+    fmt = manifest["format"]
+    reader = _read_jsonl if fmt == "jsonl" else _read_parquet
+    counts: dict[str, int] = {}
+    for table in tables or list(manifest["tables"]):
+        if table not in TABLES:
+            raise ValueError(f"Table inconnue dans l'export: {table!r}")
+        path = _table_path(directory, table, fmt)
+        n = 0
+        for batch in reader(path, batch_size):
+            _import_batch(db, table, batch)
+            n += len(batch)
+            if progress:
+                progress(table, n)
+        counts[table] = n
+    return counts
@@ -0,0 +1,221 @@
+from __future__ import annotations
+import hashlib
+import struct
+import weakref
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from .db import MemoryDB
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - dépendance optionnelle (pip install neuravia[vectors])
+    np = None
+
+DEFAULT_DIM = 256
+# En-tête .npy de taille fixe : la forme (rows, dim) peut être réécrite en place à chaque ajout.
+_HEADER_LEN = 128
+_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def has_numpy() -> bool:
+    return np is not None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy requis pour la mémoire vectorielle (pip install 'neuravia[vectors]').")
+
+
+class HashingEmbedder:
+    """Embedder hors-ligne, sans modèle : feature hashing signé.
+
+    Chaque token (et bigramme de tokens) est projeté sur une coordonnée
+    pseudo-aléatoire avec un signe pseudo-aléatoire (projection aléatoire
+    creuse), puis le vecteur est normalisé L2. Deux textes qui partagent
+    du vocabulaire ont donc une similarité cosinus élevée.
+    """
+    def __init__(self, dim: int = DEFAULT_DIM, *, bigrams: bool = True) -> None:
+        self.dim = int(dim)
+        self.bigrams = bigrams
+
+    def _features(self, text: str) -> list[tuple[str, float]]:
+        tokens = MemoryDB._tokenize(text)
+        feats = [(t, 1.0) for t in tokens]
+        if self.bigrams:
+            feats += [(f"{a} {b}", 0.5) for a, b in zip(tokens, tokens[1:])]
+        return feats
+
+    def embed(self, text: str):
+        _require_numpy()
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat, weight in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += weight if (h >> 63) & 1 else -weight
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def embed_many(self, texts: Iterable[str]):
+        _require_numpy()
+        rows = [self.embed(t) for t in texts]
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack(rows)
+
+
+# VectorStore ouverts, par base et par fichier (voir open_store)
+_STORES: "weakref.WeakKeyDictionary[MemoryDB, dict[Path, VectorStore]]" = weakref.WeakKeyDictionary()
+
+
+def _header(rows: int, dim: int) -> bytes:
+    body = repr({"descr": "<f4", "fortran_order": False, "shape": (rows, dim)}).encode("latin1")
+    pad = _HEADER_LEN - len(_MAGIC) - 2 - len(body) - 1
+    return _MAGIC + struct.pack("<H", _HEADER_LEN - len(_MAGIC) - 2) + body + b" " * pad + b"\n"
+
+
+def _read_shape(path: Path) -> tuple[int, int]:
+    with path.open("rb") as f:
+        np.lib.format.read_magic(f)
+        shape, _, _ = np.lib.format.read_array_header_1_0(f)
+    return int(shape[0]), int(shape[1])
+
+
+class VectorStore:
+    """Stockage vectoriel float32 pour la mémoire sémantique (Phase 13).
+
+    - matrice contiguë (rows, dim) dans un .npy mappé en mémoire à côté de
+      memory.db (par défaut <db>.vectors.npy), ajouts en fin de fichier sans
+      réécriture (seul l'en-tête de taille fixe est mis à jour) ;
+    - correspondance ligne -> ref (ex: "event:42") dans la table SQLite `vectors` ;
+    - recherche cosinus top-k vectorisée (produit matriciel + argpartition).
+
+    Le fichier est écrit avant la table : des lignes orphelines après un crash
+    sont ignorées à la lecture et écrasées au prochain ajout.
+    """
+    def __init__(self, db: MemoryDB, path: str | Path | None = None, *, embedder: HashingEmbedder | None = None) -> None:
+        _require_numpy()
+        self.db = db
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.path = Path(path) if path else Path(db.path).with_suffix(".vectors.npy")
+        if not db._columns("vectors"):
+            db.conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors (row INTEGER PRIMARY KEY, ref TEXT NOT NULL UNIQUE)"
+            )
+            db._commit()
+        if self.path.exists():
+            _, dim = _read_shape(self.path)
+            if dim != self.dim:
+                raise ValueError(f"{self.path}: dimension {dim} != {self.dim} de l'embedder")
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_bytes(_header(0, self.dim))
+        self._mmap = None
+        self._mmap_rows = -1
+
+    def __len__(self) -> int:
+        row = self.db.conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()
+        return int(row[0])
+
+    def has(self, ref: str) -> bool:
+        return self.db.conn.execute("SELECT 1 FROM vectors WHERE ref=?", (ref,)).fetchone() is not None
+
+    def add(self, ref: str, text: str) -> int:
+        """Ajoute (ref, texte) ; renvoie la ligne, existante si ref est déjà présent."""
+        self.add_many([(ref, text)])
+        return int(self.db.conn.execute("SELECT row FROM vectors WHERE ref=?", (ref,)).fetchone()[0])
+
+    def add_many(self, items: Iterable[tuple[str, str]]) -> int:
+        """Ajout groupé de (ref, texte) ; les refs déjà présentes sont ignorées."""
+        seen: set[str] = set()
+        todo: list[tuple[str, str]] = []
+        for ref, text in items:
+            if ref not in seen and not self.has(ref):
+                seen.add(ref)
+                todo.append((ref, text))
+        if not todo:
+            return 0
+        return self.add_vectors([r for r, _ in todo], self.embedder.embed_many(t for _, t in todo))
+
+    def add_vectors(self, refs: Sequence[str], vectors) -> int:
+        """Ajoute des vecteurs déjà calculés (normalisés L2) ; les refs déjà présentes sont ignorées.
+
+        Le verrou d'écriture SQLite (BEGIN IMMEDIATE) est pris avant de lire la
+        première ligne libre et gardé jusqu'à l'insertion des refs : deux
+        processus qui ajoutent en même temps n'écrivent pas les mêmes lignes.
+        """
+        mat = np.ascontiguousarray(vectors, dtype="<f4").reshape(len(refs), self.dim)
+        db = self.db
+        if not db.conn.in_transaction:
+            db._retry_locked(lambda: db.conn.execute("BEGIN IMMEDIATE"), rollback=False)
+        with db.batch():
+            keep = [i for i, ref in enumerate(refs) if not self.has(ref)]  # ajoutées entre-temps par un autre processus
+            if not keep:
+                return 0
+            refs, mat = [refs[i] for i in keep], mat[keep]
+            start = len(self)
+            with self.path.open("r+b") as f:
+                # tronque d'éventuelles lignes orphelines puis ajoute à la suite
+                f.truncate(_HEADER_LEN + start * self.dim * 4)
+                f.seek(0, 2)
+                f.write(mat.tobytes())
+                f.seek(0)
+                f.write(_header(start + len(refs), self.dim))
+            db.conn.executemany(
+                "INSERT INTO vectors(row, ref) VALUES (?, ?)",
+                ((start + i, ref) for i, ref in enumerate(refs)),
+            )
+        self._mmap = None
+        return len(refs)
+
+    def matrix(self):
+        """Vue mémoire (rows, dim) des vecteurs référencés (mmap, lecture seule)."""
+        n = len(self)
+        if self._mmap is None or self._mmap_rows != n:
+            if n == 0:
+                self._mmap = np.zeros((0, self.dim), dtype=np.float32)
+            else:
+                self._mmap = np.load(self.path, mmap_mode="r")[:n]
+            self._mmap_rows = n
+        return self._mmap
+
+    def refs(self, rows: Sequence[int]) -> dict[int, str]:
+        rows = [int(r) for r in rows]
+        if not rows:
+            return {}
+        marks = ",".join("?" * len(rows))
+        return dict(self.db.conn.execute(f"SELECT row, ref FROM vectors WHERE row IN ({marks})", rows))
+
+    def query_vector(self, query):
+        if isinstance(query, str):
+            return self.embedder.embed(query)
+        return np.asarray(query, dtype=np.float32).reshape(self.dim)
+
+    def search(self, query, top_k: int = 5) -> list[tuple[str, float]]:
+        """Top-k cosinus exact sur toute la matrice (query : texte ou vecteur)."""
+        mat = self.matrix()
+        if not len(mat):
+            return []
+        scores = mat @ self.query_vector(query)
+        k = min(max(1, top_k), len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        names = self.refs(top)
+        return [(names[int(r)], float(scores[r])) for r in top]
+
+
+def open_store(db: MemoryDB, path: str | Path | None = None) -> VectorStore:
+    """VectorStore (embedder par défaut) de `db`, ouvert une fois par base et par fichier.
+
+    Évite de revérifier la table et de remapper le fichier à chaque recherche ;
+    la vue mémoire est rechargée d'elle-même quand d'autres écrivains ajoutent
+    des lignes.
+    """
+    _require_numpy()
+    path = Path(path) if path else Path(db.path).with_suffix(".vectors.npy")
+    stores = _STORES.setdefault(db, {})
+    if path not in stores:
+        stores[path] = VectorStore(db, path)
+    return stores[path]
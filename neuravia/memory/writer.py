@@ -0,0 +1,270 @@
+from __future__ import annotations
+import hashlib
+import importlib
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from .db import MemoryDB, _ROUTED
+
+# Nombre maximal d'opérations regroupées dans une même transaction (group commit).
+MAX_BATCH = 500
+
+
+def writer_address(db_path: str | Path) -> str:
+    """Adresse par défaut du writer d'une base : socket Unix à côté du fichier, pipe nommé sous Windows."""
+    path = Path(db_path).resolve()
+    if sys.platform == "win32":
+        return r"\\.\pipe\neuravia-memory-" + hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:16]
+    return str(path.with_suffix(".writer.sock"))
+
+
+def _key_path(db_path: str | Path) -> Path:
+    return Path(db_path).resolve().with_suffix(".writer.key")
+
+
+def read_authkey(db_path: str | Path) -> bytes:
+    """Clé d'authentification du writer, lisible par les seuls processus ayant accès à la base."""
+    return _key_path(db_path).read_bytes()
+
+
+class MemoryWriter:
+    """Écrivain unique d'une memory.db (serveur multiprocessing.connection).
+
+    - les clients (WriterClient, ou MemoryDB(writer=...)) envoient leurs
+      écritures sur un socket Unix (pipe nommé sous Windows) authentifié par
+      une clé aléatoire <db>.writer.key : insertions d'events / actions /
+      artifacts, et toute fonction décorée par db.routed_write (goals, index
+      texte, signatures de steps, vecteurs / IVF, filigranes meta) ;
+    - un thread par client relaie les demandes vers une file unique ;
+    - un seul thread écrit dans SQLite : il vide la file par lots de
+      MAX_BATCH opérations, une transaction (un fsync) par lot, puis répond
+      à chaque client avec l'id inséré.
+
+    Peut tourner dans un thread du processus hôte (start()) ou comme
+    processus dédié (`neuravia memory writer`, serve_forever()).
+
+    Restent des écritures directes : la création du schéma à la première
+    ouverture d'une base par un processus, et la maintenance hors ligne
+    (`memory compact` : archivage par ATTACH, VACUUM), qui ne peut pas
+    tourner dans la transaction du writer.
+    """
+    def __init__(self, db_path: str | Path, address: str | None = None, *, max_batch: int = MAX_BATCH, **db_kwargs) -> None:
+        self.db_path = str(db_path)
+        self.address = address or writer_address(db_path)
+        self.max_batch = int(max_batch)
+        self._db_kwargs = {**db_kwargs, "writer": ""}
+        self._queue: "queue.Queue[tuple | None]" = queue.Queue()
+        self._listener: Listener | None = None
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self.stats = {"ops": 0, "commits": 0}
+
+    # ---------------- cycle de vie ----------------
+    def start(self) -> "MemoryWriter":
+        """Démarre le serveur dans des threads d'arrière-plan ; renvoie self."""
+        MemoryDB(self.db_path, **self._db_kwargs).close()  # schéma prêt avant la 1re connexion
+        key = _key_path(self.db_path)
+        authkey = os.urandom(32)
+        key.write_bytes(authkey)
+        os.chmod(key, 0o600)
+        if not self.address.startswith("\\\\") and Path(self.address).exists():
+            Path(self.address).unlink()  # socket d'un writer précédent (arrêté ou planté)
+        self._listener = Listener(self.address, authkey=authkey)
+        for target in (self._write_loop, self._accept_loop):
+            t = threading.Thread(target=target, name=f"memory-writer-{target.__name__}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            self._stop.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._stop.is_set() and self._listener is None:
+            return
+        self._stop.set()
+        self._queue.put(None)
+        if self._listener is not None:
+            try:
+                # débloque accept() avant de fermer le listener
+                Client(self.address, authkey=read_authkey(self.db_path)).close()
+            except Exception:
+                pass
+            self._listener.close()
+            self._listener = None
+        for t in self._threads:
+            t.join(timeout=5)
+        for p in (_key_path(self.db_path), Path(self.address)):
+            if not str(p).startswith("\\\\") and p.exists():
+                p.unlink()
+
+    def __enter__(self) -> "MemoryWriter":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ---------------- threads ----------------
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn = self._listener.accept()
+            except Exception:
+                if self._stop.is_set():
+                    return
+                continue  # client non authentifié : on l'ignore
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def _serve_client(self, conn) -> None:
+        with conn:
+            while not self._stop.is_set():
+                try:
+                    op, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                fut: Future = Future()
+                self._queue.put((op, args, fut))
+                try:
+                    conn.send(("ok", fut.result()))
+                except Exception as e:
+                    try:
+                        conn.send(("err", f"{type(e).__name__}: {e}"))
+                    except OSError:
+                        return
+
+    def _write_loop(self) -> None:
+        db = MemoryDB(self.db_path, **self._db_kwargs)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                items = [item]
+                while len(items) < self.max_batch:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is None:
+                        self._queue.put(None)
+                        break
+                    items.append(nxt)
+                self._apply(db, items)
+        finally:
+            db.close()
+
+    def _apply(self, db: MemoryDB, items: list[tuple]) -> None:
+        """Applique un lot dans une transaction ; chaque opération dans son SAVEPOINT.
+
+        Une opération qui échoue est annulée entièrement (blobs, lignes déjà
+        insérées) sans toucher aux autres opérations du lot.
+        """
+        results: list[tuple] = []
+        try:
+            with db.batch():
+                if not db.conn.in_transaction:
+                    db.conn.execute("BEGIN IMMEDIATE")
+                for op, args, fut in items:
+                    db.conn.execute("SAVEPOINT op")
+                    try:
+                        value = _OPS[op](db, *args)
+                    except Exception as e:  # erreur propre à l'opération : annulée, le lot continue
+                        db.conn.execute("ROLLBACK TO op")
+                        db._index_stem = None  # réglage en cache éventuellement annulé
+                        results.append((fut, None, e))
+                    else:
+                        results.append((fut, value, None))
+                    db.conn.execute("RELEASE op")
+        except Exception as e:  # commit impossible : tout le lot échoue
+            for _, _, fut in items:
+                fut.set_exception(e)
+            return
+        self.stats["ops"] += len(items)
+        self.stats["commits"] += 1
+        for fut, value, err in results:
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(value)
+
+
+def _routed(name: str) -> Callable:
+    """Fonction routed_write enregistrée sous `name` (module importé au besoin)."""
+    module = name.partition(":")[0]
+    if name not in _ROUTED and module.startswith("neuravia."):
+        importlib.import_module(module)
+    fn = _ROUTED.get(name)
+    if fn is None:
+        raise ValueError(f"écriture non déléguable : {name}")
+    return fn
+
+
+_OPS = {
+    "call": lambda db, name, args, kwargs: _routed(name)(db, *args, **kwargs),
+    "event": lambda db, *a: db.add_event(*a),
+    "events": lambda db, events: db.add_events_many(events),
+    "action": lambda db, *a: db.add_action(*a),
+    "artifact": lambda db, path, meta, content: db.add_artifact(path, meta, content_bytes=content),
+    "ping": lambda db: "pong",
+}
+
+
+class WriterClient:
+    """Client d'un MemoryWriter ; mêmes signatures d'écriture que MemoryDB.
+
+    Une connexion par client, utilisable depuis un seul thread à la fois
+    (les appels sont sérialisés par un verrou).
+    """
+    def __init__(self, address: str, *, db_path: str | Path | None = None, authkey: bytes | None = None) -> None:
+        if authkey is None:
+            if db_path is None:
+                raise ValueError("WriterClient: authkey ou db_path requis")
+            authkey = read_authkey(db_path)
+        self.address = address
+        self._conn = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+
+    def _call(self, op: str, *args):
+        with self._lock:
+            self._conn.send((op, args))
+            status, value = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"memory writer: {value}")
+        return value
+
+    def call(self, name: str, args: tuple = (), kwargs: dict | None = None):
+        """Exécute dans le writer la fonction routed_write `name` (voir db.routed_write)."""
+        return self._call("call", name, tuple(args), dict(kwargs or {}))
+
+    def ping(self) -> bool:
+        return self._call("ping") == "pong"
+
+    def add_event(self, kind: str, level: str, message: str, data: Optional[dict] = None) -> int:
+        return int(self._call("event", kind, level, message, data))
+
+    def add_events_many(self, events: Iterable[dict | tuple]) -> int:
+        return int(self._call("events", list(events)))
+
+    def add_action(self, name: str, status: str, input: Optional[dict] = None, output: Optional[dict] = None) -> int:
+        return int(self._call("action", name, status, input, output))
+
+    def add_artifact(self, path: str, meta: Optional[dict] = None, *, content_bytes: bytes | None = None) -> int:
+        return int(self._call("artifact", path, meta, content_bytes))
+
+    def close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
@@ -9,29 +9,43 @@ from pathlib import Path
 from textwrap import dedent
 from typing import List, Dict, Any
 
-from neuravia.llm.base import LLMRequest
-from neuravia.llm.ollama import OllamaCLI
+from neuravia.config import load_settings
+from neuravia.llm.base import LLM, LLMRequest
+from neuravia.llm.budget import DEFAULT_NUM_CTX, Block, TokenBudget, fit_prompt
+from neuravia.llm.cache import CachedLLM, cached_from_settings
+from neuravia.llm.ollama import BACKENDS, OllamaCLI, ollama_from_settings
 from neuravia.memory.db import MemoryDB
+from neuravia.memory.dedupe import collapse_near_duplicates
+from neuravia.memory.goals import goal_variants, register_goal
+from neuravia.memory.retrieval import RETRIEVAL_MODES, with_neighbours
 
 DEFAULT_DB_PATH = Path("data/memory.db")
+# Tokens laissés au master-plan JSON renvoyé par le modèle.
+META_RESERVE = 1024
 
 
-def _load_full_history(db: MemoryDB, goal: str, max_steps: int = 1000, max_reviews: int = 200):
+def _load_full_history(
+    db: MemoryDB,
+    goal: str,
+    max_steps: int = 1000,
+    max_reviews: int = 200,
+    retrieval: str = "goal",
+):
     """
     Charge tout l'historique (steps + reviews) pour un goal donné.
-    On reste filtré sur message == goal pour ne pas mélanger les objectifs.
+    On reste filtré sur le goal (et ses reformulations, cf. table goals) pour ne
+    pas mélanger les objectifs, sauf retrieval="vector"/"ann" qui complète avec
+    des goals sémantiquement proches.
     """
-    all_steps = [
-        e for e in db.list_events(kind="agent_step", limit=max_steps)
-        if e.get("message") == goal
-    ]
-    all_reviews = [
-        e for e in db.list_events(kind="agent_review", limit=max_reviews)
-        if e.get("message") == goal
-    ]
-
-    all_steps.sort(key=lambda e: e["id"])
-    all_reviews.sort(key=lambda e: e["id"])
+    variants = goal_variants(db, goal)
+    all_steps = db.list_events(kind="agent_step", goal=variants, limit=max_steps)
+    all_reviews = db.list_events(kind="agent_review", goal=variants, limit=max_reviews)
+
+    all_steps.reverse()
+    all_reviews.reverse()
+
+    all_steps = with_neighbours(db, goal, all_steps, kind="agent_step", limit=max_steps, mode=retrieval)
+    all_reviews = with_neighbours(db, goal, all_reviews, kind="agent_review", limit=max_reviews, mode=retrieval)
     return all_steps, all_reviews
 
 
@@ -75,18 +89,20 @@ def _build_history_blocks(steps, reviews) -> tuple[str, str]:
     return history_block, reviews_block
 
 
-def _build_meta_prompt(goal: str, steps, reviews, target_steps: int) -> str:
+def _build_meta_prompt(goal: str, steps, reviews, target_steps: int, budget: TokenBudget | None = None) -> str:
     """
     Prompt du méta-agent : à partir de tout l'historique, produire un master-plan JSON.
+    Avec un budget, les steps et revues les plus anciens sont retirés en premier.
     """
     history_block, reviews_block = _build_history_blocks(steps, reviews)
 
-    prompt = f"""
+    def render(goal_text: str, history_block: str, reviews_block: str) -> str:
+        prompt = f"""
 Tu es un architecte d'IA senior chargé de synthétiser un plan global à partir de nombreuses tentatives
 d'un agent précédent.
 
 OBJECTIF GLOBAL :
-{goal}
+{goal_text}
 
 Tu disposes de l'historique suivant :
 
@@ -132,7 +148,13 @@ Rappels importants :
 - Pas de Markdown, pas de commentaires, pas d'explications hors du JSON.
 - Les index d'étapes doivent commencer à 1 et être croissants.
 """
-    return dedent(prompt).strip()
+        return dedent(prompt).strip()
+
+    return fit_prompt(render, [
+        Block("goal_text", goal, priority=100, quota=0.1),
+        Block("history_block", history_block, priority=50, keep="tail"),
+        Block("reviews_block", reviews_block, priority=40, quota=0.3, keep="tail"),
+    ], budget)
 
 
 def _extract_json_block(text: str) -> str | None:
@@ -215,13 +237,26 @@ def run_meta_agent(
     model: str,
     target_steps: int,
     db_path: Path = DEFAULT_DB_PATH,
+    *,
+    retrieval: str = "goal",
+    project: str | None = None,
+    dedupe: bool = True,
+    num_ctx: int = DEFAULT_NUM_CTX,
+    llm: LLM | None = None,
+    temperature: float = LLMRequest.temperature,
 ) -> None:
     """
     Agent "méta" : lit toute la mémoire pour un goal donné et produit un master-plan global.
+
+    Avec dedupe=True, les steps quasi-dupliqués (MinHash) sont fusionnés avant
+    d'être mis dans le prompt : le plus récent de chaque groupe est gardé.
+    `llm` remplace le modèle Ollama (backend http, tests) ; temperature=0
+    rend la réponse reproductible (et réutilisable par le cache LLM).
     """
     db = MemoryDB(str(db_path))
+    register_goal(db, goal, project=project)
 
-    steps, reviews = _load_full_history(db, goal)
+    steps, reviews = _load_full_history(db, goal, retrieval=retrieval)
     if not steps and not reviews:
         print("Aucun historique trouvé pour ce goal dans la mémoire.")
         return
@@ -229,12 +264,18 @@ def run_meta_agent(
     print("=== PHASE 12 : SYNTHÈSE GLOBALE ===")
     print(f"Goal : {goal}")
     print(f"- Steps trouvés : {len(steps)}")
+    if dedupe and steps:
+        found = len(steps)
+        steps = collapse_near_duplicates(db, steps)
+        print(f"- Quasi-doublons fusionnés : {found - len(steps)}")
     print(f"- Reviews trouvées : {len(reviews)}")
     print("Génération du master-plan...\n")
 
-    llm = OllamaCLI(model)
-    prompt = _build_meta_prompt(goal, steps, reviews, target_steps=target_steps)
-    raw = llm.generate(LLMRequest(prompt=prompt))
+    if llm is None:
+        llm = OllamaCLI(model)
+    reserve = min(META_RESERVE, num_ctx // 2)
+    prompt = _build_meta_prompt(goal, steps, reviews, target_steps=target_steps, budget=TokenBudget(num_ctx, reserve=reserve))
+    raw = llm.generate(LLMRequest(prompt=prompt, max_tokens=reserve, temperature=temperature))
 
     try:
         plan = _parse_master_plan(raw)
@@ -286,14 +327,73 @@ def main(argv: list[str] | None = None) -> int:
         help="Chemin de la base SQLite de mémoire persistante.",
     )
 
+    parser.add_argument(
+        "--retrieval",
+        choices=RETRIEVAL_MODES,
+        default="goal",
+        help="Historique chargé : goal exact, + voisins sémantiques (vector: exact, ann: index IVF).",
+    )
+    parser.add_argument(
+        "--project",
+        default=None,
+        help="Projet auquel rattacher ce goal (regroupement des runs).",
+    )
+    parser.add_argument(
+        "--num-ctx",
+        type=int,
+        default=None,
+        help="Fenêtre de contexte du modèle en tokens (défaut : [llm] num_ctx de la config).",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=None,
+        help="Backend Ollama : cli (ollama run) ou http (API REST keep-alive) ; défaut : [llm] backend.",
+    )
+    parser.add_argument(
+        "--temperature",
+        type=float,
+        default=None,
+        help="Temperature de l'appel LLM (défaut : [llm] temperature ; 0 = réponse réutilisable par le cache).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignorer le cache disque des réponses LLM ([llm] cache_enabled).",
+    )
+    parser.add_argument("--config", default="config", help="Dossier de configuration (section [llm]).")
+    parser.add_argument("--profile", default="safe", help="Profil de configuration.")
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="Ne pas fusionner les steps quasi-dupliqués de l'historique avant le prompt.",
+    )
+
     args = parser.parse_args(argv)
+    cfg = load_settings(args.config, args.profile).llm
+    num_ctx = args.num_ctx or cfg.num_ctx
+    llm = cached_from_settings(
+        ollama_from_settings(args.model, cfg, backend=args.backend, num_ctx=num_ctx),
+        cfg,
+        db_path=args.memory_db,
+        bypass=args.no_cache,
+    )
 
     run_meta_agent(
         goal=args.goal,
         model=args.model,
         target_steps=args.target_steps,
         db_path=args.memory_db,
+        retrieval=args.retrieval,
+        project=args.project,
+        dedupe=not args.no_dedupe,
+        num_ctx=num_ctx,
+        llm=llm,
+        temperature=cfg.temperature if args.temperature is None else args.temperature,
     )
+    if isinstance(llm, CachedLLM):
+        print("=== CACHE LLM ===", llm.info())
+        llm.close()
     return 0
 
 
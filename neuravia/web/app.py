@@ -1,5 +1,6 @@
 from __future__ import annotations
-import json, mimetypes, asyncio
+import json, mimetypes, asyncio, time
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional, List, Dict, Any, AsyncIterator
 from fastapi import FastAPI, Request, Query, HTTPException
@@ -7,6 +8,8 @@ from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse, JSO
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from ..memory.db import MemoryDB
+from ..memory.goals import get_goal, list_goals, list_projects, goal_variants
+from ..memory.pool import MemoryDBPool
 
 def _norm(p: Path) -> Path:
     return p.resolve()
@@ -19,7 +22,16 @@ def _is_under(target: Path, root: Path) -> bool:
         return False
 
 def create_app(db_path: str, sandbox_path: str, log_dir: str, *, profile: str = "safe", kill_switch_path: str | None = None) -> FastAPI:
-    app = FastAPI(title="Neuravia Dashboard", docs_url=None, redoc_url=None)
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # schéma initialisé une fois au démarrage, connexions fermées à l'arrêt
+        app.state.db_pool.ensure_schema()
+        try:
+            yield
+        finally:
+            app.state.db_pool.close_all()
+
+    app = FastAPI(title="Neuravia Dashboard", docs_url=None, redoc_url=None, lifespan=lifespan)
 
     static_dir = Path(__file__).parent / "static"
     tmpl_dir = Path(__file__).parent / "templates"
@@ -27,13 +39,15 @@ def create_app(db_path: str, sandbox_path: str, log_dir: str, *, profile: str =
     templates = Jinja2Templates(directory=str(tmpl_dir))
 
     app.state.db_path = db_path
+    app.state.db_pool = MemoryDBPool(db_path)
     app.state.sandbox = _norm(Path(sandbox_path))
     app.state.log_dir = _norm(Path(log_dir))
     app.state.profile = profile
     app.state.kill_switch_path = kill_switch_path
 
-    def _with_db() -> MemoryDB:
-        return MemoryDB(app.state.db_path)
+    def _with_db(readonly: bool = True) -> MemoryDB:
+        """Connexion du pool pour le thread courant (ne pas la fermer)."""
+        return app.state.db_pool.get(readonly=readonly)
 
     @app.get("/api/health")
     def health() -> dict:
@@ -50,42 +64,88 @@ def create_app(db_path: str, sandbox_path: str, log_dir: str, *, profile: str =
 
     @app.get("/api/stats")
     def stats() -> dict:
+        return _with_db().counts()
+
+    @app.get("/api/stats/kinds")
+    def stats_kinds() -> dict:
         db = _with_db()
-        try:
-            cur = db.conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM events")
-            ev = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM actions")
-            ac = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM artifacts")
-            ar = cur.fetchone()[0]
-            return {"events": ev, "actions": ac, "artifacts": ar}
-        finally:
-            db.close()
+        return {
+            "events_by_kind": db.counts_by("events.kind"),
+            "events_by_level": db.counts_by("events.level"),
+            "actions_by_status": db.counts_by("actions.status"),
+        }
+
+    @app.get("/api/activity")
+    def activity(
+        bucket: str = Query(default="minute", pattern="^(minute|hour)$"),
+        kind: str | None = None,
+        since: int | None = Query(default=None, description="epoch UTC de début (défaut : 60 tranches)"),
+    ) -> dict:
+        seconds = 60 if bucket == "minute" else 3600
+        t0 = since if since is not None else int(time.time()) // seconds * seconds - 59 * seconds
+        hist = _with_db().events_histogram(seconds, kind=kind, t0=t0)
+        return {"bucket": bucket, "seconds": seconds, "since": t0, "series": [{"t": t, "n": n} for t, n in hist]}
+
+    @app.get("/api/projects")
+    def projects() -> list[dict]:
+        return list_projects(_with_db())
+
+    @app.get("/api/goals")
+    def goals(project: str | None = None, limit: int = 100) -> list[dict]:
+        return list_goals(_with_db(), project=project, limit=max(1, min(500, limit)))
+
+    @app.get("/api/goals/{goal_id}")
+    def goal(goal_id: str, limit: int = 50) -> dict:
+        db = _with_db()
+        g = get_goal(db, goal_id)
+        if g is None:
+            raise HTTPException(status_code=404, detail="Goal inconnu")
+        g["variants"] = goal_variants(db, g["text"])
+        g["events"] = [e.to_dict() for e in db.list_events(goal=g["variants"], limit=max(1, min(500, limit)))]
+        return g
 
     @app.get("/api/events")
     def list_events(limit: int = 50) -> list[dict]:
-        db = _with_db()
-        try:
-            return db.list_events(limit=max(1, min(500, limit)))
-        finally:
-            db.close()
+        return [e.to_dict() for e in _with_db().list_events(limit=max(1, min(500, limit)))]
+
+    @app.get("/api/events/page")
+    def events_page(
+        cursor: int | None = Query(default=None, description="id du dernier event de la page précédente"),
+        limit: int = 50,
+        kind: str | None = None,
+        goal: str | None = None,
+        order: str = Query(default="desc", pattern="^(asc|desc)$"),
+    ) -> dict:
+        """Pagination par curseur (clé id) : coût constant quelle que soit la page."""
+        limit = max(1, min(500, limit))
+        desc = order == "desc"
+        it = _with_db().iter_events(
+            kind=kind,
+            goal=goal,
+            after_id=None if desc else cursor,
+            before_id=cursor if desc else None,
+            batch_size=limit,
+            descending=desc,
+        )
+        items = [e.to_dict() for _, e in zip(range(limit), it)]
+        next_cursor = items[-1]["id"] if len(items) == limit else None
+        return {"items": items, "next_cursor": next_cursor}
 
     async def _sse_generator(last_id: int | None, once: bool = False):
         poll_interval = 1.0
         _last = last_id or 0
         while True:
             db = _with_db()
-            try:
-                cur = db.conn.cursor()
-                cur.execute("SELECT id, ts, kind, level, message, data FROM events WHERE id>? ORDER BY id ASC LIMIT 100", (_last,))
-                rows = cur.fetchall()
-            finally:
-                db.close()
+            cur = db.conn.cursor()
+            cur.execute("SELECT id, ts, kind, level, message, data FROM events WHERE id>? ORDER BY id ASC LIMIT 100", (_last,))
+            rows = cur.fetchall()
             if rows:
                 for r in rows:
                     _last = int(r[0])
-                    payload = {"id": r[0], "ts": r[1], "kind": r[2], "level": r[3], "message": r[4], "data": r[5]}
+                    data = r[5]
+                    if data and '"$blob"' in data:
+                        data = json.dumps(db._row_to_event(r).data, ensure_ascii=False)
+                    payload = {"id": r[0], "ts": r[1], "kind": r[2], "level": r[3], "message": r[4], "data": data}
                     chunk = f"id: {_last}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
                     yield chunk
                 if once:
@@ -110,21 +170,12 @@ def create_app(db_path: str, sandbox_path: str, log_dir: str, *, profile: str =
     @app.get("/", response_class=HTMLResponse)
     def home(request: Request):
         db = _with_db()
-        try:
-            cur = db.conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM events")
-            ev = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM actions")
-            ac = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM artifacts")
-            ar = cur.fetchone()[0]
-            latest = db.list_events(limit=10)
-        finally:
-            db.close()
+        stats = db.counts()
+        latest = db.list_events(limit=10)
         return templates.TemplateResponse(
             request,
             "index.html",
-            {"stats": {"events": ev, "actions": ac, "artifacts": ar}, "latest": latest, "title": "Neuravia Dashboard", "profile": app.state.profile},
+            {"stats": stats, "latest": latest, "title": "Neuravia Dashboard", "profile": app.state.profile},
         )
 
     # -------- FICHIERS (sandbox) --------
@@ -0,0 +1,116 @@
+"""Latence par appel des backends Ollama (neuravia.llm.ollama).
+
+Compare OllamaCLI (un processus 'ollama run' par appel) et OllamaHTTP
+(API REST, connexion keep-alive). Sans --host, OllamaHTTP est mesuré contre
+le faux serveur local (OllamaStub) : seul le coût de transport est mesuré.
+Avec --fake-cli, OllamaCLI lance un faux 'ollama' (script Python) qui, comme
+le vrai client, ouvre une connexion vers ce serveur à chaque appel.
+
+Usage :
+    python scripts/bench_llm.py --calls 50
+    python scripts/bench_llm.py --calls 50 --fake-cli       (POSIX)
+
+Repères (--calls 50 --fake-cli, serveur factice, Linux ; sans modèle, donc
+sans temps de chargement ni d'inférence) :
+
+    backend                  médiane     p95
+    http (keep-alive)        0.43 ms    0.63 ms   (1 connexion TCP pour 50 appels)
+    cli (faux ollama run)     138 ms     145 ms   (dont ~76 ms de démarrage de Python)
+    python scripts/bench_llm.py --calls 20 --model llama3.1:8b --host http://127.0.0.1:11434 --cli
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from neuravia.llm.base import LLM, LLMRequest  # noqa: E402
+from neuravia.llm.ollama import OllamaCLI, OllamaHTTP, has_ollama  # noqa: E402
+from neuravia.llm.ollama_stub import OllamaStub  # noqa: E402
+
+
+def _bench(label: str, llm: LLM, calls: int, stream: bool) -> None:
+    req = LLMRequest(prompt="Réponds en un mot : ok ?", temperature=0.0, max_tokens=8)
+    times = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        if stream:
+            "".join(llm.stream(req))
+        else:
+            llm.generate(req)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"{label:<24} {calls:>5} appels  médiane {statistics.median(times) * 1000:9.2f} ms"
+          f"  p95 {p95 * 1000:9.2f} ms  total {sum(times):8.3f}s")
+
+
+_FAKE_OLLAMA = """#!{python}
+import json, os, sys, urllib.request
+body = json.dumps({{"model": sys.argv[2], "prompt": sys.argv[3], "stream": False}}).encode("utf-8")
+req = urllib.request.Request(os.environ["OLLAMA_HOST"] + "/api/generate", data=body,
+                             headers={{"Content-Type": "application/json"}})
+print(json.loads(urllib.request.urlopen(req).read())["response"])
+"""
+
+
+def _bench_fake_cli(model: str, host: str, calls: int, stream: bool) -> None:
+    """OllamaCLI avec un faux binaire 'ollama' sur PATH (processus + connexion par appel)."""
+    if os.name == "nt":
+        print("--fake-cli : script à shebang, non supporté sous Windows.", file=sys.stderr)
+        return
+    saved = {k: os.environ.get(k) for k in ("PATH", "OLLAMA_HOST")}
+    with tempfile.TemporaryDirectory() as tmp:
+        fake = Path(tmp) / "ollama"
+        fake.write_text(_FAKE_OLLAMA.format(python=sys.executable), encoding="utf-8")
+        fake.chmod(0o755)
+        os.environ["PATH"] = f"{tmp}{os.pathsep}{saved['PATH'] or ''}"
+        os.environ["OLLAMA_HOST"] = host
+        try:
+            _bench("cli (faux ollama run)", OllamaCLI(model), calls, stream)
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Latence des backends Ollama (cli vs http)")
+    ap.add_argument("--calls", type=int, default=50)
+    ap.add_argument("--model", default="llama3.1:8b")
+    ap.add_argument("--host", default=None, help="serveur Ollama réel ; défaut : faux serveur local")
+    ap.add_argument("--cli", action="store_true", help="mesure aussi 'ollama run' (binaire requis)")
+    ap.add_argument("--fake-cli", action="store_true", help="mesure OllamaCLI avec un faux 'ollama' branché sur le serveur")
+    ap.add_argument("--stream", action="store_true", help="mesure la sortie en flux")
+    args = ap.parse_args(argv)
+
+    stub = None if args.host else OllamaStub().start()
+    try:
+        http = OllamaHTTP(args.model, host=args.host or stub.url)
+        _bench("http (keep-alive)", http, args.calls, args.stream)
+        http.close()
+        if stub is not None:
+            print(f"{'':<24} connexions TCP ouvertes : {stub.connections}")
+        if args.fake_cli:
+            _bench_fake_cli(args.model, args.host or stub.url, args.calls, args.stream)
+    finally:
+        if stub is not None:
+            stub.stop()
+    if args.cli:
+        if not has_ollama():
+            print("ollama introuvable sur PATH : backend cli ignoré.", file=sys.stderr)
+        else:
+            _bench("cli (ollama run)", OllamaCLI(args.model), args.calls, args.stream)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
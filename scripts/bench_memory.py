@@ -0,0 +1,229 @@
+"""Micro-benchmarks de la mémoire SQLite (neuravia.memory).
+
+Usage :
+    python scripts/bench_memory.py writes --rows 2000
+    python scripts/bench_memory.py index --docs 100000   (ou 1000000)
+    python scripts/bench_memory.py ann --vectors 200000      (NumPy requis)
+    python scripts/bench_memory.py decode --rows 100000
+
+Repères `index` (corpus synthétique : vocabulaire de 20 000 mots, 30 mots par
+document ; Linux, SSD, un cœur) :
+
+    docs        BM25 (postings)   Jaccard (scan)   index_add_documents
+    20 000          25 ms/req        210 ms/req
+    100 000        127 ms/req        833 ms/req        2 881 docs/s
+    1 000 000     1041 ms/req       6879 ms/req        2 570 docs/s
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from neuravia.memory.db import MemoryDB, _unpack_ids  # noqa: E402
+
+
+def _timed(label: str, n: int, fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<28} {n:>9} lignes  {dt:8.3f}s  {n / dt if dt else 0:12.0f} lignes/s")
+    return dt
+
+
+def bench_writes(args) -> None:
+    rows = int(args.rows)
+    payload = {"step": 1, "content": "x" * 200}
+    with tempfile.TemporaryDirectory() as tmp:
+        def per_row():
+            db = MemoryDB(Path(tmp) / "per_row.db")
+            try:
+                for i in range(rows):
+                    db.add_event("bench", "info", f"goal {i % 10}", payload)
+            finally:
+                db.close()
+
+        def batch():
+            db = MemoryDB(Path(tmp) / "batch.db")
+            try:
+                with db.batch():
+                    for i in range(rows):
+                        db.add_event("bench", "info", f"goal {i % 10}", payload)
+            finally:
+                db.close()
+
+        def many():
+            db = MemoryDB(Path(tmp) / "many.db")
+            try:
+                db.add_events_many(("bench", "info", f"goal {i % 10}", payload) for i in range(rows))
+            finally:
+                db.close()
+
+        def buffered():
+            db = MemoryDB(Path(tmp) / "buffered.db")
+            try:
+                with db.buffered(max_rows=500) as buf:
+                    for i in range(rows):
+                        buf.add_event("bench", "info", f"goal {i % 10}", payload)
+            finally:
+                db.close()
+
+        base = _timed("add_event (commit/ligne)", rows, per_row)
+        for label, fn in (("batch()", batch), ("add_events_many()", many), ("buffered(500)", buffered)):
+            dt = _timed(label, rows, fn)
+            print(f"{'':<28} x{base / dt if dt else 0:.1f} vs commit/ligne")
+
+
+def _corpus(n_docs: int, *, vocab: int = 20000, length: int = 30, seed: int = 0):
+    """Documents synthétiques (distribution de Zipf sur le vocabulaire)."""
+    rnd = random.Random(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    cum, acc = [], 0.0
+    for i in range(vocab):
+        acc += 1.0 / (i + 1)
+        cum.append(acc)
+    for i in range(n_docs):
+        yield f"doc{i}", " ".join(rnd.choices(words, cum_weights=cum, k=length))
+
+
+def _jaccard_scan(db: MemoryDB, query: str, top_k: int) -> list[tuple[str, float]]:
+    """Ancien algorithme (scan complet + Jaccard) comme référence."""
+    q = {tid for tid, _ in db._term_ids(set(db._tokenize(query))).values()}
+    scores = []
+    for doc_id, terms in db.conn.execute("SELECT doc_id, terms FROM index_docs"):
+        d = set(_unpack_ids(terms))
+        score = len(q & d) / (len(q | d) or 1)
+        if score > 0:
+            scores.append((doc_id, score))
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores[:top_k]
+
+
+def bench_index(args) -> None:
+    n_docs = int(args.docs)
+    queries = ["w10 w500", "w1500 w7000 w30", "w19999", "w3 w4 w5"]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MemoryDB(Path(tmp) / "index.db")
+        try:
+            one = MemoryDB(Path(tmp) / "index_one.db")
+            try:
+                def build_one():
+                    with one.batch():
+                        for doc_id, text in _corpus(n_docs):
+                            one.index_add_document(doc_id, text)
+                _timed("index (doc par doc)", n_docs, build_one)
+            finally:
+                one.close()
+            _timed("index (index_add_documents)", n_docs, lambda: db.index_add_documents(_corpus(n_docs)))
+
+            for label, fn in (("BM25 (postings)", db.index_search), ("Jaccard (scan complet)", lambda q, top_k: _jaccard_scan(db, q, top_k))):
+                t0 = time.perf_counter()
+                for _ in range(args.repeat):
+                    for q in queries:
+                        fn(q, top_k=10)
+                dt = (time.perf_counter() - t0) / (args.repeat * len(queries))
+                print(f"{label:<28} {dt * 1000:10.2f} ms/requête")
+        finally:
+            db.close()
+
+
+def bench_ann(args) -> None:
+    import numpy as np
+    from neuravia.memory.ann import IVFIndex
+    from neuravia.memory.vectors import VectorStore
+
+    n = int(args.vectors)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MemoryDB(Path(tmp) / "ann.db")
+        try:
+            store = VectorStore(db)
+            rng = np.random.default_rng(0)
+            centers = rng.normal(size=(256, store.dim))
+            x = centers[rng.integers(0, len(centers), size=n)] + 0.5 * rng.normal(size=(n, store.dim))
+            x = (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+            _timed("ajout vecteurs", n, lambda: store.add_vectors([f"v{i}" for i in range(n)], x))
+            ivf = IVFIndex(store)
+            _timed("entraînement IVF", n, lambda: ivf.train())
+
+            queries = x[rng.choice(n, size=args.queries, replace=False)]
+            t0 = time.perf_counter()
+            exact = [{r for r, _ in store.search(q, top_k=10)} for q in queries]
+            dt_exact = (time.perf_counter() - t0) / len(queries)
+            print(f"{'exact (brute force)':<28} {dt_exact * 1000:10.2f} ms/requête")
+            for nprobe in (1, 4, 8, 16):
+                t0 = time.perf_counter()
+                approx = [{r for r, _ in ivf.search(q, top_k=10, nprobe=nprobe)} for q in queries]
+                dt = (time.perf_counter() - t0) / len(queries)
+                recall = sum(len(a & e) for a, e in zip(approx, exact)) / (10 * len(queries))
+                print(f"{f'IVF nprobe={nprobe}':<28} {dt * 1000:10.2f} ms/requête  recall@10={recall:.3f}")
+        finally:
+            db.close()
+
+
+def bench_decode(args) -> None:
+    rows = int(args.rows)
+    payload = {"step": 1, "title": "Titre", "content": "x" * 300, "raw": "y" * 600}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MemoryDB(Path(tmp) / "decode.db")
+        try:
+            db.add_events_many(("agent_step", "info", f"goal {i % 100}", payload) for i in range(rows))
+            sql = "SELECT id, ts, kind, level, message, data FROM events ORDER BY id DESC LIMIT ?"
+
+            def eager():
+                # ancien format : dict + json.loads systématique
+                out = []
+                for r in db.conn.execute(sql, (rows,)):
+                    out.append({"id": r[0], "ts": r[1], "kind": r[2], "level": r[3], "message": r[4], "data": json.loads(r[5])})
+                return [e for e in out if e.get("message") == "goal 7"]
+
+            def lazy():
+                return [e for e in db.list_events(limit=rows) if e.get("message") == "goal 7"]
+
+            for label, fn in (("dict + json.loads", eager), ("EventRow (paresseux)", lazy)):
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                fn()
+                dt = time.perf_counter() - t0
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{label:<28} {rows:>9} lignes  {dt:8.3f}s  pic {peak / 1e6:8.1f} Mo")
+        finally:
+            db.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser("bench_memory", description="Benchmarks mémoire Neuravia")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("writes", help="Débit d'écriture : commit par ligne vs écritures groupées")
+    p.add_argument("--rows", type=int, default=2000)
+    p.set_defaults(func=bench_writes)
+
+    p = sub.add_parser("index", help="Recherche texte : BM25 sur index inversé vs scan Jaccard")
+    p.add_argument("--docs", type=int, default=100000)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_index)
+
+    p = sub.add_parser("ann", help="Recherche vectorielle : IVF approximatif vs recherche exacte")
+    p.add_argument("--vectors", type=int, default=200000)
+    p.add_argument("--queries", type=int, default=50)
+    p.set_defaults(func=bench_ann)
+
+    p = sub.add_parser("decode", help="Scan d'events : décodage JSON immédiat vs EventRow paresseux")
+    p.add_argument("--rows", type=int, default=100000)
+    p.set_defaults(func=bench_decode)
+
+    args = ap.parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+from neuravia.llm.base import LLM
+from neuravia.memory.db import MemoryDB
+from neuravia.agent.runner import _iter_plan_steps, run_agent
+
+
+class _ScriptedLLM(LLM):
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.prompts = []
+
+    def generate(self, req):
+        self.prompts.append(req.prompt)
+        return self.outputs.pop(0)
+
+
+REVIEW = json.dumps({"summary": "plan correct", "improvements": ["ajouter des tests"]})
+
+
+def test_iter_plan_steps_incremental():
+    text = 'Voici : {"steps": [{"action": "a"}, {"action": oops}, {"action": "c"}, {"action": "tronq'
+    assert list(_iter_plan_steps(text)) == [{"action": "a"}, None, {"action": "c"}]
+    assert list(_iter_plan_steps('[{"action": "x"}]')) == [{"action": "x"}]
+    assert list(_iter_plan_steps("pas de json")) == []
+
+
+def test_run_agent_batch_mode_with_fallback(tmp_path: Path, capsys):
+    db_path = tmp_path / "mem.db"
+    plan = ('{"steps": [{"title": "Cadrer", "action": "Définir le périmètre du projet", "expected_result": "périmètre"},'
+            ' {"title": "Vide", "action": ""},'
+            ' {"title": "Tester", "action": "Écrire des tests unitaires pour le module de paiement"}]}')
+    llm = _ScriptedLLM([plan, "TITRE: Déployer\nACTION: Déployer l'application en préproduction\nRÉSULTAT ATTENDU: ok", REVIEW])
+    run_agent("Lancer le produit", "dummy", 3, db_path, plan_mode="batch", llm=llm)
+    assert len(llm.prompts) == 3 and '"steps"' in llm.prompts[0] and "ÉTAPE 2 sur 3" in llm.prompts[1]
+
+    db = MemoryDB(db_path)
+    try:
+        steps = list(reversed(db.list_events(kind="agent_step", goal="Lancer le produit")))
+        assert [s["data"]["step"] for s in steps] == [1, 2, 3]
+        assert [s["data"]["title"] for s in steps] == ["Cadrer", "Déployer", "Tester"]
+        review = db.list_events(kind="agent_review")[0]["data"]
+        assert review["summary"] == "plan correct"
+        assert review["timing"]["plan_mode"] == "batch" and review["timing"]["llm_calls"] == 3
+    finally:
+        db.close()
+    assert "TEMPS (mode batch)" in capsys.readouterr().out
+
+
+def test_run_agent_step_mode(tmp_path: Path):
+    db_path = tmp_path / "mem.db"
+    outputs = [f"TITRE: T{i}\nACTION: action numéro {w}\nRÉSULTAT ATTENDU: r" for i, w in enumerate(("alpha", "beta"))]
+    llm = _ScriptedLLM(outputs + [REVIEW])
+    run_agent("Objectif simple", "dummy", 2, db_path, llm=llm)
+    db = MemoryDB(db_path)
+    try:
+        assert db.list_events(kind="agent_review")[0]["data"]["timing"]["llm_calls"] == 3
+    finally:
+        db.close()
+
+
+def test_repeat_run_at_temperature_zero_hits_llm_cache(tmp_path: Path):
+    from neuravia.llm.cache import CachedLLM
+    from neuravia.llm.dummy import DummyLLM
+    llm = CachedLLM(DummyLLM(), tmp_path / "llm_cache.db")  # max_temperature=0.0 par défaut
+    try:
+        run_agent("Objectif répété", "dummy", 2, tmp_path / "a.db", llm=llm)
+        assert llm.info()["entries"] == 0 and llm.stats.bypassed > 0  # temperature 0.2 : jamais en cache
+        run_agent("Objectif répété", "dummy", 2, tmp_path / "b.db", llm=llm, temperature=0.0)
+        first = llm.info()
+        assert first["entries"] > 0
+        run_agent("Objectif répété", "dummy", 2, tmp_path / "c.db", llm=llm, temperature=0.0)
+        second = llm.info()  # même run : toutes les réponses viennent du cache
+        assert second["misses"] == first["misses"] and second["hits"] >= first["hits"] + first["entries"]
+    finally:
+        llm.close()
@@ -9,6 +9,7 @@ def test_safe_defaults():
     assert s.modules.filesystem is True
     assert s.llm.local_enabled is True
     assert s.llm.remote_enabled is False
+    assert s.llm.temperature == 0.2 and s.llm.cache_max_temperature == 0.0
 
 def test_danger_allows_network():
     s = load_settings(config=str(Path("config")), profile="danger")
@@ -0,0 +1,60 @@
+from neuravia.llm.budget import OMITTED, Block, TokenBudget, estimate_tokens, fit_prompt, truncate
+from neuravia.agent.runner import _build_step_prompt
+from neuravia.meta_agent import _build_meta_prompt
+
+
+def _lines(n: int, word: str = "étape") -> str:
+    return "\n".join(f"- {word} {i} : configurer le module numéro {i}" for i in range(n))
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("un chat") == 2
+    assert estimate_tokens("anticonstitutionnellement !") == 8
+    assert estimate_tokens(_lines(100)) > estimate_tokens(_lines(10))
+
+
+def test_truncate_keeps_whole_lines():
+    text = _lines(50)
+    head = truncate(text, 60)
+    assert head.startswith("- étape 0 ") and head.endswith("lignes omises)") and estimate_tokens(head) <= 60
+    tail = truncate(text, 60, keep="tail")
+    assert tail.startswith("(... ") and tail.endswith("numéro 49") and estimate_tokens(tail) <= 60
+    assert truncate("court", 10) == "court"
+    assert truncate(text, 2) == ""
+
+
+def test_fit_shrinks_low_priority_first():
+    budget = TokenBudget(1000, reserve=200, margin=0.0)
+    texts = budget.fit([
+        Block("goal", "objectif", priority=100),
+        Block("run", _lines(30, "run"), priority=70, keep="tail"),
+        Block("mem", _lines(200, "mem"), priority=40, keep="tail"),
+        Block("reviews", _lines(50, "revue"), priority=30, quota=0.1),
+    ], fixed=100)
+    sizes = {k: estimate_tokens(v) for k, v in texts.items()}
+    assert sum(sizes.values()) <= budget.available - 100
+    assert texts["goal"] == "objectif" and texts["run"] == _lines(30, "run")
+    assert sizes["reviews"] <= 70
+
+
+def test_fit_prompt_marks_omitted_blocks():
+    render = lambda a, b: f"A:{a}\nB:{b}"
+    out = fit_prompt(render, [Block("a", "garde", priority=10), Block("b", _lines(500), priority=0)], TokenBudget(10, reserve=0, margin=0))
+    assert out.startswith("A:garde") and OMITTED in out
+    assert fit_prompt(render, [Block("a", "x"), Block("b", "y")], None) == "A:x\nB:y"
+
+
+def test_prompts_stay_within_num_ctx():
+    mem = [{"data": {"step": i, "content": f"ancienne action détaillée numéro {i} " * 5}} for i in range(300)]
+    reviews = [{"data": {"summary": f"revue {i} : manque de tests et de suivi " * 3}} for i in range(100)]
+    budget = TokenBudget(2048, reserve=256)
+    prompt = _build_step_prompt("Objectif X", 2, 5, ["étape une"], mem, reviews, None, budget=budget)
+    assert estimate_tokens(prompt) <= budget.available
+    assert "Objectif X" in prompt and "- Étape 1: étape une" in prompt and "numéro 299" in prompt
+    assert "lignes omises" in prompt
+
+    steps = [{"data": {"step": i, "title": "T", "action": f"action {i} " * 20}} for i in range(1000)]
+    budget = TokenBudget(4096, reserve=1024)
+    prompt = _build_meta_prompt("Objectif X", steps, reviews, 8, budget=budget)
+    assert estimate_tokens(prompt) <= budget.available and "[step 999]" in prompt
@@ -0,0 +1,127 @@
+import time
+from neuravia.config import LLM as LLMSettings
+from neuravia.llm.base import LLM, LLMRequest
+from neuravia.llm.cache import CachedLLM, cache_key, cached_from_settings
+from neuravia.llm.dummy import DummyLLM
+
+
+class _CountingLLM(LLM):
+    model = "m1"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, req: LLMRequest) -> str:
+        self.calls += 1
+        return f"réponse {self.calls} à {req.prompt}"
+
+    def stream(self, req: LLMRequest):
+        self.calls += 1
+        for w in f"mot un deux trois quatre pour {req.prompt}".split(" "):
+            yield w + " "
+
+
+def test_hit_miss_and_key(tmp_path):
+    inner = _CountingLLM()
+    llm = CachedLLM(inner, tmp_path / "c.db", max_temperature=1.0)
+    req = LLMRequest(prompt="p", temperature=0.0, max_tokens=32)
+    assert llm.generate(req) == "réponse 1 à p"
+    assert llm.generate(req) == "réponse 1 à p" and inner.calls == 1
+    # temperature / max_tokens / modèle font partie de la clé
+    assert llm.generate(LLMRequest(prompt="p", temperature=0.2, max_tokens=32)) == "réponse 2 à p"
+    assert llm.generate(LLMRequest(prompt="p", temperature=0.0, max_tokens=64)) == "réponse 3 à p"
+    assert cache_key("m1", req) != cache_key("m2", req)
+    info = llm.info()
+    assert (info["hits"], info["misses"], info["entries"]) == (1, 3, 3)
+    llm.close()
+    # persistant : une nouvelle instance relit la base
+    again = CachedLLM(_CountingLLM(), tmp_path / "c.db")
+    assert again.generate(req) == "réponse 1 à p" and again.inner.calls == 0
+
+
+def test_bypass_and_max_temperature(tmp_path):
+    inner = _CountingLLM()
+    llm = CachedLLM(inner, tmp_path / "c.db", max_temperature=0.5)
+    hot = LLMRequest(prompt="p", temperature=0.9)
+    llm.generate(hot), llm.generate(hot)
+    assert inner.calls == 2 and llm.info()["entries"] == 0
+    llm.bypass = True
+    cold = LLMRequest(prompt="p", temperature=0.0)
+    llm.generate(cold), llm.generate(cold)
+    assert inner.calls == 4 and llm.stats.bypassed == 4
+
+
+def test_lru_eviction_and_ttl(tmp_path):
+    inner = _CountingLLM()
+    llm = CachedLLM(inner, tmp_path / "c.db", max_entries=2)
+    a, b, c = (LLMRequest(prompt=x, temperature=0.0) for x in "abc")
+    llm.generate(a), llm.generate(b)
+    time.sleep(0.01)
+    llm.generate(a)  # a relu : b devient le moins récent
+    llm.generate(c)
+    assert llm.info()["entries"] == 2 and llm.stats.evicted == 1
+    calls = inner.calls
+    llm.generate(a), llm.generate(c)
+    assert inner.calls == calls
+    llm.generate(b)
+    assert inner.calls == calls + 1
+
+    small = CachedLLM(_CountingLLM(), tmp_path / "s.db", max_bytes=40)
+    for x in "abcd":
+        small.generate(LLMRequest(prompt=x, temperature=0.0))
+    assert small.info()["bytes"] <= 40
+
+    short = CachedLLM(_CountingLLM(), tmp_path / "t.db", ttl_s=0.01)
+    short.generate(a)
+    time.sleep(0.02)
+    short.generate(a)
+    assert short.inner.calls == 2
+
+
+def test_stream_cached_complete_and_partial(tmp_path):
+    inner = _CountingLLM()
+    llm = CachedLLM(inner, tmp_path / "c.db")
+    req = LLMRequest(prompt="x", temperature=0.0)
+    full = "".join(llm.stream(req))
+    assert "".join(llm.stream(req)) == full and inner.calls == 1
+
+    # flux abandonné : entrée partielle, resservie aux flux mais pas à generate()
+    other = LLMRequest(prompt="y", temperature=0.0)
+    s = llm.stream(other)
+    head = next(s) + next(s)
+    s.close()
+    s = llm.stream(other)
+    assert next(s) == head and inner.calls == 2
+    # l'appelant en redemande : seule la suite est transmise
+    assert head + "".join(s) == "mot un deux trois quatre pour y " and inner.calls == 3
+    assert llm.generate(other) == "mot un deux trois quatre pour y " and inner.calls == 3
+
+
+def test_partial_entries_only_at_temperature_zero(tmp_path):
+    inner = _CountingLLM()
+    llm = CachedLLM(inner, tmp_path / "c.db", max_temperature=1.0)
+    # temperature > 0 : un début de flux n'est ni gardé ni prolongé par un autre tirage
+    warm = LLMRequest(prompt="z", temperature=0.7)
+    s = llm.stream(warm)
+    next(s), s.close()
+    assert llm.info()["entries"] == 0
+    assert "".join(llm.stream(warm)) == "mot un deux trois quatre pour z " and inner.calls == 2
+    assert "".join(llm.stream(warm)) == "mot un deux trois quatre pour z " and inner.calls == 2
+
+    # un début plus court ne remplace pas un début plus long
+    cold = LLMRequest(prompt="w", temperature=0.0)
+    s = llm.stream(cold)
+    long_head = next(s) + next(s) + next(s)
+    s.close()
+    llm._put(cache_key(llm.model, cold), "mot ", complete=False)
+    s = llm.stream(cold)
+    assert next(s) == long_head
+    s.close()
+
+
+def test_cached_from_settings(tmp_path):
+    dummy = DummyLLM()
+    assert cached_from_settings(dummy, LLMSettings(), db_path=tmp_path / "memory.db") is dummy
+    llm = cached_from_settings(dummy, LLMSettings(cache_enabled=True, cache_max_mb=1), db_path=tmp_path / "memory.db")
+    assert isinstance(llm, CachedLLM) and llm.path == str(tmp_path / "llm_cache.db")
+    assert llm.max_bytes == 1024 * 1024 and llm.model == "DummyLLM"
@@ -0,0 +1,70 @@
+import socket
+import pytest
+from neuravia.llm.base import LLMRequest
+from neuravia.llm.ollama import OllamaCLI, OllamaHTTP, make_ollama
+from neuravia.llm.ollama_stub import OllamaStub
+
+
+@pytest.fixture()
+def stub():
+    with OllamaStub(lambda p: f"Réponse longue à : {p}") as s:
+        yield s
+
+
+def test_generate_passes_options_and_reuses_connection(stub, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # kill-switch relatif
+    llm = OllamaHTTP("m1", host=stub.url, num_ctx=2048, keep_alive="10m")
+    try:
+        assert llm.available()
+        for i in range(5):
+            assert llm.generate(LLMRequest(prompt=f"p{i}", max_tokens=64, temperature=0.0)) == f"Réponse longue à : p{i}"
+        req = stub.requests[-1]
+        assert req["path"] == "/api/generate" and req["stream"] is False and req["keep_alive"] == "10m"
+        assert req["options"] == {"temperature": 0.0, "num_predict": 64, "num_ctx": 2048}
+        llm.generate(LLMRequest(prompt="x", num_ctx=8192, keep_alive="0"))
+        assert stub.requests[-1]["options"]["num_ctx"] == 8192 and stub.requests[-1]["keep_alive"] == "0"
+        assert stub.connections == 1  # une seule connexion keep-alive
+    finally:
+        llm.close()
+
+
+def test_stream_and_chat(stub, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    llm = OllamaHTTP("m1", host=stub.url, chat=True)
+    try:
+        chunks = list(llm.stream(LLMRequest(prompt="bonjour le monde")))
+        assert len(chunks) > 3 and "".join(chunks) == "Réponse longue à : bonjour le monde"
+        assert stub.requests[-1]["path"] == "/api/chat" and stub.requests[-1]["messages"][0]["content"] == "bonjour le monde"
+        assert llm.generate(LLMRequest(prompt="ok")) == "Réponse longue à : ok"
+        assert stub.connections == 1
+
+        # abandon en cours de flux : connexion fermée puis rouverte au prochain appel
+        stream = llm.stream(LLMRequest(prompt="a b c d e f"))
+        next(stream)
+        stream.close()
+        assert llm.generate(LLMRequest(prompt="encore")) == "Réponse longue à : encore"
+        assert stub.connections == 2
+    finally:
+        llm.close()
+
+
+def test_reconnects_after_dropped_connection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    s = OllamaStub().start()
+    llm = OllamaHTTP("m", host=s.url)
+    url = s.url
+    try:
+        assert llm.generate(LLMRequest(prompt="un")).startswith("écho")
+        llm._conn.sock.shutdown(socket.SHUT_RDWR)  # connexion gardée coupée
+        assert llm.generate(LLMRequest(prompt="deux")).startswith("écho")
+    finally:
+        llm.close()
+        s.stop()
+    assert not OllamaHTTP("m", host=url, timeout=1).available()
+
+
+def test_make_ollama():
+    assert isinstance(make_ollama("m"), OllamaCLI)
+    assert isinstance(make_ollama("m", "http", host="127.0.0.1:1"), OllamaHTTP)
+    with pytest.raises(ValueError):
+        make_ollama("m", "grpc")
@@ -0,0 +1,106 @@
+import os, sys, threading, time
+from pathlib import Path
+import pytest
+from neuravia.llm.base import LLM, LLMRequest
+from neuravia.llm.dummy import DummyLLM
+from neuravia.llm.ollama import OllamaCLI
+from neuravia.agent.runner import _generate_step, _step_complete, _stream_text
+from neuravia.memory.db import MemoryDB
+
+
+class _ChunkLLM(LLM):
+    """Renvoie un texte caractère par caractère en comptant ce qui a été consommé."""
+    def __init__(self, text):
+        self.text = text
+        self.sent = 0
+
+    def generate(self, req):
+        return self.text
+
+    def stream(self, req):
+        for ch in self.text:
+            self.sent += 1
+            yield ch
+
+
+def test_dummy_and_default_stream():
+    req = LLMRequest(prompt="Construire un plan")
+    chunks = list(DummyLLM().stream(req))
+    assert len(chunks) > 3 and "".join(chunks) == DummyLLM().generate(req)
+    assert list(LLM.stream(_ChunkLLM("abc"), req)) == ["abc"]  # implémentation par défaut
+
+
+def test_step_complete_and_early_stop(capsys):
+    assert not _step_complete("TITRE: a\nACTION: b\nRÉSULTAT ATTENDU: c")
+    assert _step_complete("**TITRE:** a\n**ACTION:** b\n**Résultat attendu :** c\n")
+    text = "TITRE: Cadrer\nACTION: définir le périmètre\nRÉSULTAT ATTENDU: périmètre validé\nBlabla inutile " * 3
+    llm = _ChunkLLM(text)
+    out = _stream_text(llm, LLMRequest(prompt="p"), done=_step_complete)
+    assert out.endswith("périmètre validé\n") and llm.sent == len(out) < len(text)
+    assert out in capsys.readouterr().out
+
+
+def test_generate_step_streaming(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        llm = _ChunkLLM("TITRE: T\nACTION: rédiger la charte du projet\nRÉSULTAT ATTENDU: charte\nsuite ignorée")
+        parsed = _generate_step(llm, db, "PROMPT", ["g"], stream=True)
+        assert parsed["action"] == "rédiger la charte du projet" and "suite" not in parsed["raw"]
+    finally:
+        db.close()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="faux binaire ollama en script shell")
+def test_ollama_cli_stream_and_early_close(tmp_path: Path, monkeypatch):
+    fake = tmp_path / "ollama"
+    fake.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        "for w in ['Bonjour ', 'le ', 'monde ', 'é', 'tendu']:\n"
+        "    sys.stdout.write(w); sys.stdout.flush(); time.sleep(0.05)\n"
+        "time.sleep(30)\n",
+        encoding="utf-8",
+    )
+    fake.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.chdir(tmp_path)
+    t0 = time.perf_counter()
+    stream = OllamaCLI("m").stream(LLMRequest(prompt="p"))
+    got = ""
+    for chunk in stream:
+        got += chunk
+        if "étendu" in got:
+            break
+    stream.close()  # tue le processus (sinon 30 s d'attente)
+    assert got == "Bonjour le monde étendu" and time.perf_counter() - t0 < 10
+
+
+@pytest.mark.skipif(os.name == "nt", reason="faux binaire ollama en script shell")
+def test_ollama_cli_stream_with_verbose_stderr(tmp_path: Path, monkeypatch):
+    fake = tmp_path / "ollama"
+    fake.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "sys.stderr.write('progression ' * 100000); sys.stderr.flush()\n"  # > tampon d'un pipe
+        "sys.stdout.write('fin'); sys.stdout.flush()\n"
+        "sys.exit(int(sys.argv[-1] == 'échec'))\n",
+        encoding="utf-8",
+    )
+    fake.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.chdir(tmp_path)
+    out: dict = {}
+
+    def consume(prompt: str) -> None:
+        try:
+            out[prompt] = "".join(OllamaCLI("m").stream(LLMRequest(prompt=prompt)))
+        except RuntimeError as e:
+            out[prompt] = e
+
+    for prompt in ("ok", "échec"):
+        t = threading.Thread(target=consume, args=(prompt,), daemon=True)
+        t.start()
+        t.join(10)
+        assert not t.is_alive(), "flux bloqué par stderr"
+    assert out["ok"] == "fin"
+    assert isinstance(out["échec"], RuntimeError) and "progression" in str(out["échec"])
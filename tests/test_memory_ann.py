@@ -0,0 +1,78 @@
+from pathlib import Path
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from neuravia.agent.runner import _load_context
+from neuravia.memory.ann import IVFIndex
+from neuravia.memory.db import MemoryDB
+from neuravia.memory.vectors import VectorStore
+
+def _clustered(n: int, dim: int, centers: int = 16, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    c = rng.normal(size=(centers, dim))
+    x = c[rng.integers(0, centers, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+def test_ivf_recall_and_incremental_insert(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        store = VectorStore(db)
+        x = _clustered(3000, store.dim)
+        store.add_vectors([f"v{i}" for i in range(2000)], x[:2000])
+        ivf = IVFIndex(store, nprobe=6)
+        ivf.train(nlist=32)
+        assert (tmp_path / "mem.ivf.npy").exists()
+
+        # insertion incrémentale après entraînement
+        store.add_vectors([f"v{i}" for i in range(2000, 3000)], x[2000:])
+        assert ivf.sync() == 1000
+
+        hits = 0
+        for i in range(0, 3000, 150):
+            exact = {r for r, _ in store.search(x[i], top_k=10)}
+            approx = {r for r, _ in ivf.search(x[i], top_k=10)}
+            hits += len(exact & approx)
+        assert hits / (20 * 10) >= 0.8
+        assert ivf.search(x[2500], top_k=1)[0][0] == "v2500"
+    finally:
+        db.close()
+
+def test_load_context_semantic_neighbours(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        db.add_event("agent_step", "info", "déployer un serveur web nginx", {"step": 1, "content": "installer nginx et configurer le serveur web"})
+        db.add_event("agent_step", "info", "écrire un roman", {"step": 1, "content": "choisir les personnages"})
+
+        steps, _ = _load_context(db, "mettre en place un serveur web", max_steps=1)
+        assert steps == []
+        steps, _ = _load_context(db, "mettre en place un serveur web", max_steps=1, retrieval="vector")
+        assert [e["message"] for e in steps] == ["déployer un serveur web nginx"]
+        steps, _ = _load_context(db, "mettre en place un serveur web", max_steps=1, retrieval="ann")
+        assert [e["message"] for e in steps] == ["déployer un serveur web nginx"]
+    finally:
+        db.close()
+
+def test_open_ivf_is_cached_and_retrains_on_growth(tmp_path: Path):
+    from neuravia.memory.ann import MIN_TRAIN_ROWS, open_ivf
+    from neuravia.memory.vectors import open_store
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        store = open_store(db)
+        assert open_store(db) is store and open_ivf(store) is open_ivf(store)
+        ivf = open_ivf(store)
+        x = _clustered(3 * MIN_TRAIN_ROWS, store.dim)
+        store.add_vectors([f"v{i}" for i in range(MIN_TRAIN_ROWS)], x[:MIN_TRAIN_ROWS])
+        assert ivf.search(x[0], top_k=1)[0][0] == "v0"
+        assert ivf.trained_rows == MIN_TRAIN_ROWS and len(ivf.centroids()) == 32
+
+        # moins du double : pas de réentraînement, affectation incrémentale
+        store.add_vectors([f"v{i}" for i in range(MIN_TRAIN_ROWS, 2 * MIN_TRAIN_ROWS - 1)], x[MIN_TRAIN_ROWS:2 * MIN_TRAIN_ROWS - 1])
+        ivf.search(x[1], top_k=1)
+        assert ivf.trained_rows == MIN_TRAIN_ROWS
+        # corpus doublé : nlist recalculé sur la nouvelle taille
+        store.add_vectors([f"v{i}" for i in range(2 * MIN_TRAIN_ROWS - 1, 3 * MIN_TRAIN_ROWS)], x[2 * MIN_TRAIN_ROWS - 1:])
+        assert ivf.search(x[3000], top_k=1)[0][0] == "v3000"
+        assert ivf.trained_rows == 3 * MIN_TRAIN_ROWS and len(ivf.centroids()) == int((3 * MIN_TRAIN_ROWS) ** 0.5)
+    finally:
+        db.close()
@@ -0,0 +1,57 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from neuravia.memory.db import MemoryDB, sha256_text
+
+def test_large_fields_are_deduplicated_blobs(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        text = "Installer et configurer le serveur. " * 40
+        db.add_event("agent_step", "info", "g", {"step": 1, "content": text, "action": text, "raw": text + "!"})
+        db.add_event("agent_step", "info", "g", {"step": 2, "content": text, "title": "court"})
+
+        raw = db.conn.execute("SELECT data FROM events ORDER BY id LIMIT 1").fetchone()[0]
+        stored = json.loads(raw)
+        assert stored["content"] == {"$blob": sha256_text(text)} and stored["step"] == 1
+        # 2 textes distincts pour 4 valeurs longues : dédupliqués, compressés
+        assert db.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 2
+        codec, size, packed = db.conn.execute("SELECT codec, size, length(data) FROM blobs LIMIT 1").fetchone()
+        assert codec == "zlib" and packed < size
+
+        rows = db.list_events(kind="agent_step", goal="g")
+        assert rows[1]["data"]["content"] == text and rows[1]["data"]["raw"] == text + "!"
+        assert rows[0]["data"] == {"step": 2, "content": text, "title": "court"}
+    finally:
+        db.close()
+
+def test_migrate_blobs_rewrites_existing_events(tmp_path: Path):
+    path = tmp_path / "old.db"
+    text = "x" * 2000
+    db = MemoryDB(path, blob_threshold=0)  # ancien comportement : tout dans events.data
+    try:
+        db.add_event("agent_step", "info", "g", {"content": text, "raw": text})
+        db.add_event("agent_step", "info", "g", {"content": "court"})
+    finally:
+        db.close()
+
+    p = subprocess.run([sys.executable, "-m", "neuravia", "memory", "migrate-blobs", "--db", str(path)],
+                       text=True, capture_output=True)
+    assert p.returncode == 0, p.stderr
+    assert "1 events réécrits, 1 blobs" in p.stdout
+
+    db = MemoryDB(path)
+    try:
+        assert len(db.conn.execute("SELECT data FROM events ORDER BY id LIMIT 1").fetchone()[0]) < 200
+        assert [e["data"].get("raw") for e in db.list_events()] == [None, text]
+    finally:
+        db.close()
+
+def test_agent_memory_get_recent_reads_blobs_before_close(tmp_path: Path):
+    from neuravia.memory.agent_memory import get_recent, store_step
+    path = tmp_path / "mem.db"
+    store_step("g", 1, "x" * 2000, tags=["long"], db_path=path)
+    store_step("g", 2, "court", db_path=path)
+    entries = get_recent("g", db_path=path)
+    assert [e.step for e in entries] == [1, 2]
+    assert entries[0].content == "x" * 2000 and entries[0].tags == ["long"]
@@ -1,5 +1,6 @@
 from pathlib import Path
-from neuravia.memory.db import MemoryDB
+import time
+from neuravia.memory.db import MemoryDB, to_epoch
 
 def test_memory_db_events(tmp_path: Path):
     db = MemoryDB(tmp_path / "mem.db")
@@ -10,3 +11,199 @@ def test_memory_db_events(tmp_path: Path):
         assert rows and rows[0]["message"] == "hello"
     finally:
         db.close()
+
+def test_memory_db_goal_scoped_events(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        first = db.add_event("agent_step", "info", "goal A", {"step": 1})
+        # beaucoup d'events d'autres goals après : ceux de "goal A" sortent des N derniers
+        for i in range(300):
+            db.add_event("agent_step", "info", f"goal {i}", {"step": i})
+        last = db.add_event("agent_step", "info", "goal A", {"step": 2})
+
+        rows = db.list_events(kind="agent_step", goal="goal A", limit=10)
+        assert [r["id"] for r in rows] == [last, first]
+        assert [r["data"]["step"] for r in rows] == [2, 1]
+
+        rows = db.list_events(kind="agent_step", goal="goal A", after_id=first)
+        assert [r["id"] for r in rows] == [last]
+
+        plan = db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM events WHERE kind=? AND message=? ORDER BY id DESC LIMIT 5",
+            ("agent_step", "goal A"),
+        ).fetchall()
+        assert any("idx_events_kind_message_id" in str(r) for r in plan)
+    finally:
+        db.close()
+
+def test_memory_db_batched_writes(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        n = db.add_events_many([
+            ("bulk", "info", "a", {"i": 0}),
+            {"kind": "bulk", "level": "info", "message": "b", "data": {"i": 1}},
+        ])
+        assert n == 2
+        assert [r["message"] for r in db.list_events(kind="bulk")] == ["b", "a"]
+
+        try:
+            with db.batch():
+                db.add_event("bulk", "info", "c")
+                db.add_action("plan", "ok")
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        assert len(db.list_events(kind="bulk")) == 2  # rollback du bloc entier
+
+        with db.buffered(max_rows=3, max_delay=3600) as buf:
+            buf.add_event("buf", "info", "1")
+            buf.add_event("buf", "info", "2")
+            assert db.list_events(kind="buf") == []
+            buf.add_event("buf", "info", "3")  # seuil de taille atteint
+            assert len(db.list_events(kind="buf")) == 3
+            buf.add_event("buf", "info", "4")
+        assert len(db.list_events(kind="buf")) == 4  # vidé à la sortie
+    finally:
+        db.close()
+
+def test_memory_db_iter_events_keyset(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        ids = [db.add_event("it", "info", "g" if i % 2 else "h", {"i": i}) for i in range(25)]
+        it = db.iter_events(kind="it", batch_size=4)
+        assert next(it)["id"] == ids[0]  # générateur paresseux
+        assert [e["id"] for e in db.iter_events(kind="it", batch_size=4)] == ids
+        assert [e["data"]["i"] for e in db.iter_events(kind="it", goal="g", batch_size=3)] == list(range(1, 25, 2))
+        assert [e["id"] for e in db.iter_events(after_id=ids[20], batch_size=2)] == ids[21:]
+        assert [e["id"] for e in db.iter_events(before_id=ids[3], descending=True, batch_size=2)] == ids[2::-1]
+    finally:
+        db.close()
+
+def test_memory_db_event_rows_decode_lazily(tmp_path: Path):
+    import json
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        db.add_event("lazy", "info", "goal", {"step": 1})
+        e = db.list_events(kind="lazy")[0]
+        assert e._raw is not None  # pas encore décodé
+        assert e.get("message") == "goal" and e["kind"] == "lazy"
+        assert e._raw is not None
+        assert e.get("data") == {"step": 1} and e.data is e["data"]  # décodé une fois, en cache
+        assert dict(e) == e.to_dict() and set(e) == {"id", "ts", "kind", "level", "message", "data"}
+        assert json.loads(json.dumps(e.to_dict()))["data"] == {"step": 1}
+        assert e.get("absent") is None and not hasattr(e, "__dict__")
+    finally:
+        db.close()
+
+def test_memory_db_materialized_counters(tmp_path: Path):
+    import sqlite3
+    path = tmp_path / "mem.db"
+    # base "ancienne" remplie sans compteurs : rétro-remplissage à l'ouverture
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, kind TEXT NOT NULL, level TEXT NOT NULL, message TEXT NOT NULL, data TEXT)")
+    con.executemany("INSERT INTO events(ts, kind, level, message) VALUES ('t', ?, 'info', 'm')", [("run",), ("run",), ("unit",)])
+    con.commit()
+    con.close()
+
+    db = MemoryDB(path)
+    try:
+        assert db.counts() == {"events": 3, "actions": 0, "artifacts": 0}
+        db.add_event("unit", "warn", "x")
+        db.add_events_many([("agent_step", "info", "g")] * 2)
+        db.add_action("plan", "ok")
+        db.add_artifact("a.txt")
+        db.conn.execute("DELETE FROM events WHERE kind='run'")
+        db.conn.commit()
+        assert db.counts() == {"events": 4, "actions": 1, "artifacts": 1}
+        assert db.counts_by("events.kind") == {"agent_step": 2, "unit": 2}
+        assert db.counts_by("events.level") == {"info": 3, "warn": 1}
+        assert db.counts_by("actions.status") == {"ok": 1}
+    finally:
+        db.close()
+
+def test_memory_db_time_range_and_histogram(tmp_path: Path):
+    db = MemoryDB(tmp_path / "t.db")
+    try:
+        for ts, kind in [("2025-01-01T10:00:05Z", "a"), ("2025-01-01T10:00:50Z", "b"),
+                         ("2025-01-01T10:02:00Z", "a"), ("2025-01-01T11:30:00+01:00", "a")]:
+            db.conn.execute("INSERT INTO events(ts, kind, level, message, data) VALUES (?, ?, 'info', 'm', '{}')", (ts, kind))
+        db.conn.commit()
+        # rows insérées sans ts_epoch : complétées par le trigger
+        assert db.conn.execute("SELECT COUNT(*) FROM events WHERE ts_epoch IS NULL").fetchone()[0] == 0
+        t0 = to_epoch("2025-01-01T10:00:00Z")
+        assert [e["kind"] for e in db.events_between(t0, t0 + 60)] == ["a", "b"]
+        assert len(db.events_between("2025-01-01T10:00:00Z", "2025-01-01T10:30:00Z", kind="a")) == 2  # 11:30+01:00 exclu
+        assert db.events_histogram(60) == [(t0, 2), (t0 + 120, 1), (t0 + 1800, 1)]
+        assert db.events_histogram(3600, kind="a") == [(t0, 3)]
+        plan = " ".join(r[-1] for r in db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM events WHERE kind='a' AND ts_epoch >= 0 AND ts_epoch < 1"))
+        assert "idx_events_kind_ts_epoch" in plan
+        eid = db.add_event("c", "info", "now")
+        assert db.events_between(time.time() - 5, time.time() + 5)[-1]["id"] == eid
+    finally:
+        db.close()
+
+def test_memory_db_backfills_ts_epoch(tmp_path: Path):
+    import sqlite3
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, kind TEXT NOT NULL, "
+                 "level TEXT NOT NULL, message TEXT NOT NULL, data TEXT)")
+    conn.execute("INSERT INTO events(ts, kind, level, message, data) VALUES ('2025-01-01T00:00:00Z', 'k', 'info', 'm', '{}')")
+    conn.commit(); conn.close()
+    db = MemoryDB(path)
+    try:
+        assert db.conn.execute("SELECT ts_epoch FROM events").fetchone()[0] == to_epoch("2025-01-01T00:00:00Z") == 1735689600
+    finally:
+        db.close()
+
+def test_memory_db_goal_context_pack(tmp_path: Path):
+    path = tmp_path / "ctx.db"
+    db = MemoryDB(path)
+    other = MemoryDB(path)
+    try:
+        steps = [db.add_event("agent_step", "info", "g1", {"step": i}) for i in range(12)]
+        db.add_event("agent_step", "info", "g2", {"step": 0})
+        rev = db.add_event("agent_review", "info", "g1", {"summary": "ok"})
+        mp = db.add_event("agent_masterplan", "info", "g1", {"steps": []})
+        ctx = db.goal_context("g1", max_steps=10, max_reviews=5)
+        assert [e.id for e in ctx["steps"]] == steps[-10:]
+        assert [e.id for e in ctx["reviews"]] == [rev] and ctx["masterplan"].id == mp
+        assert db.goal_context("absent") == {"steps": [], "reviews": [], "masterplan": None}
+
+        # une lecture par clé : même plan que list_events, sans scan
+        plan = " ".join(r[-1] for r in db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT steps FROM goal_context WHERE goal='g1'"))
+        assert "SEARCH goal_context USING PRIMARY KEY" in plan
+
+        # cache invalidé par un commit d'une autre connexion (PRAGMA data_version)
+        assert db.goal_context("g1")["steps"][-1].id == steps[-1]
+        new = other.add_event("agent_step", "info", "g1", {"step": 12})
+        assert db.goal_context("g1")["steps"][-1].id == new
+        # ... et par les suppressions (trigger)
+        other.conn.execute("DELETE FROM events WHERE id=?", (mp,))
+        other.conn.commit()
+        assert db.goal_context("g1")["masterplan"] is None
+        # au-delà de la profondeur matérialisée : repli sur list_events
+        assert len(db.goal_context("g1", max_steps=100)["steps"]) == 13
+    finally:
+        other.close()
+        db.close()
+
+def test_memory_db_goal_context_backfill(tmp_path: Path):
+    path = tmp_path / "legacy_ctx.db"
+    db = MemoryDB(path)
+    try:
+        ids = [db.add_event("agent_step", "info", "g", {"i": i}) for i in range(3)]
+        db.conn.execute("DROP TABLE goal_context")
+        db.conn.execute("DELETE FROM meta WHERE key='goal_context.version'")
+        db.conn.commit()
+    finally:
+        db.close()
+    import neuravia.memory.db as dbmod
+    dbmod._SCHEMA_READY.clear()
+    db = MemoryDB(path)
+    try:
+        assert [e.id for e in db.goal_context("g")["steps"]] == ids
+    finally:
+        db.close()
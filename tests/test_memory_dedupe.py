@@ -0,0 +1,78 @@
+from pathlib import Path
+from neuravia.memory.db import MemoryDB
+from neuravia.memory.dedupe import collapse_near_duplicates, find_near_duplicates
+from neuravia.memory.minhash import similarity, text_minhash
+from neuravia.agent.runner import _generate_step
+
+A = "Analyser les logs du serveur pour identifier les erreurs fréquentes"
+A2 = "Analyser les logs serveur afin d'identifier les erreurs les plus fréquentes"
+B = "Écrire des tests unitaires pour le module de paiement"
+
+
+def test_minhash_similarity():
+    assert similarity(text_minhash(A), text_minhash(A2)) >= 0.6
+    assert similarity(text_minhash(A), text_minhash(B)) < 0.3
+    assert text_minhash("le la les") is None
+
+
+def test_signatures_written_and_searched(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        a = db.add_event("agent_step", "info", "goal 1", {"step": 1, "action": A})
+        db.add_events_many([("agent_step", "info", "goal 2", {"step": 1, "action": A}),
+                            ("agent_step", "info", "goal 1", {"step": 2, "content": B}),
+                            ("unit", "info", "goal 1", {"action": A})])
+        assert db.conn.execute("SELECT COUNT(*) FROM step_signatures").fetchone()[0] == 3
+        assert db.conn.execute("SELECT COUNT(DISTINCT event_id) FROM step_bands").fetchone()[0] == 3
+
+        hits = find_near_duplicates(db, A2)
+        assert len(hits) == 2 and all(s >= 0.6 for _, s in hits)
+        hits = find_near_duplicates(db, A2, goal=["goal 1"])
+        assert [e.id for e, _ in hits] == [a]
+        assert find_near_duplicates(db, "Déployer l'application en production") == []
+
+        # suppression d'un event : signature et bandes suivent (trigger)
+        db.conn.execute("DELETE FROM events WHERE id=?", (a,))
+        db.conn.commit()
+        assert db.conn.execute("SELECT COUNT(*) FROM step_bands WHERE event_id=?", (a,)).fetchone()[0] == 0
+        assert find_near_duplicates(db, A2, goal="goal 1") == []
+    finally:
+        db.close()
+
+
+def test_collapse_near_duplicates_keeps_latest(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        for text in (A, B, A2):
+            db.add_event("agent_step", "info", "g", {"action": text})
+        steps = list(reversed(db.list_events(kind="agent_step", goal="g")))
+        kept = collapse_near_duplicates(db, steps)
+        assert [e["data"]["action"] for e in kept] == [B, A2]
+    finally:
+        db.close()
+
+
+class _ScriptedLLM:
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.prompts = []
+
+    def generate(self, req):
+        self.prompts.append(req.prompt)
+        return self.outputs.pop(0)
+
+
+def test_runner_regenerates_duplicate_step(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        old = db.add_event("agent_step", "info", "g", {"step": 1, "action": A})
+        llm = _ScriptedLLM([f"TITRE: Logs\nACTION: {A2}\nRÉSULTAT ATTENDU: x", f"TITRE: Tests\nACTION: {B}\nRÉSULTAT ATTENDU: y"])
+        parsed = _generate_step(llm, db, "PROMPT", ["g"])
+        assert parsed["action"] == B and "duplicate_of" not in parsed
+        assert "ATTENTION" in llm.prompts[1]
+
+        llm = _ScriptedLLM([f"ACTION: {A2}"])
+        parsed = _generate_step(llm, db, "PROMPT", ["g"], retries=0)
+        assert parsed["duplicate_of"] == old
+    finally:
+        db.close()
@@ -0,0 +1,128 @@
+from pathlib import Path
+import neuravia.memory.db as dbmod
+from neuravia.memory.db import MemoryDB
+from neuravia.memory.goals import (
+    get_goal, goal_id, goal_variants, list_goals, list_projects, normalize_goal,
+    register_goal, set_project,
+)
+from neuravia.memory.simhash import hamming, text_simhash
+from neuravia.agent.runner import _load_context
+
+
+def test_goal_normalization_and_id():
+    assert normalize_goal("  Créer   le Rapport, vite ! ") == "creer le rapport vite"
+    assert goal_id("Créer le rapport") == goal_id("creer LE rapport")
+    assert goal_id("Créer le rapport") != goal_id("Supprimer le rapport")
+
+
+def test_simhash_reformulations_are_close():
+    a = text_simhash("Analyser les logs du serveur")
+    assert hamming(a, text_simhash("analyser le log du serveur")) <= 6
+    assert hamming(a, text_simhash("Écrire une documentation utilisateur")) > 6
+
+
+def test_register_goal_clusters_reformulations(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        g1 = register_goal(db, "Analyser les logs du serveur", project="infra")
+        assert register_goal(db, "Analyser les logs du serveur")["id"] == g1["id"]  # idempotent
+        g2 = register_goal(db, "analyser le log du serveur")
+        assert g2["id"] != g1["id"] and g2["cluster"] == g1["id"]
+        assert g2["project"] == "infra"  # hérité du cluster
+        g3 = register_goal(db, "Écrire une documentation utilisateur")
+        assert g3["cluster"] == g3["id"] and g3["project"] is None
+
+        assert get_goal(db, "analyser le log du serveur")["id"] == g2["id"]
+        assert get_goal(db, g1["id"])["text"] == "Analyser les logs du serveur"
+        assert set(goal_variants(db, "Analyser les logs du serveur")) == {
+            "Analyser les logs du serveur", "analyser le log du serveur"}
+        assert goal_variants(db, "goal inconnu") == ["goal inconnu"]
+
+        assert [g["id"] for g in list_goals(db, project="infra")] == [g1["id"]]
+        assert set_project(db, g3["id"], "docs") == 1
+        assert list_projects(db) == [{"project": "docs", "goals": 1}, {"project": "infra", "goals": 1}]
+    finally:
+        db.close()
+
+
+def test_goal_runs_and_multi_goal_events(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        register_goal(db, "Analyser les logs du serveur")
+        register_goal(db, "analyser le log du serveur")
+        s1 = db.add_event("agent_step", "info", "Analyser les logs du serveur", {"step": 1})
+        db.add_event("agent_step", "info", "autre chose", {"step": 1})
+        s2 = db.add_event("agent_step", "info", "analyser le log du serveur", {"step": 1})
+        db.add_event("agent_review", "info", "analyser le log du serveur", {"summary": "ok"})
+
+        variants = goal_variants(db, "Analyser les logs du serveur")
+        rows = db.list_events(kind="agent_step", goal=variants)
+        assert [r["id"] for r in rows] == [s2, s1]
+        assert db.list_events(goal=[]) == []
+        assert list_goals(db)[0]["runs"] == 1
+
+        # le contexte de l'agent fusionne les reformulations
+        steps, reviews = _load_context(db, "Analyser les logs du serveur", max_steps=5)
+        assert [s["id"] for s in steps] == [s1, s2] and len(reviews) == 1
+    finally:
+        db.close()
+
+
+def test_goals_backfilled_from_events(tmp_path: Path):
+    path = tmp_path / "mem.db"
+    db = MemoryDB(path)
+    try:
+        db.add_event("agent_step", "info", "Préparer la démo", {"step": 1})
+        db.add_event("agent_review", "info", "Préparer la démo", {"summary": "ok"})
+        db.conn.executescript("DELETE FROM goal_aliases; DELETE FROM goal_bands; DELETE FROM goals;"
+                              "DELETE FROM meta WHERE key='goals.version';")
+    finally:
+        db.close()
+    dbmod._SCHEMA_READY.clear()  # force les migrations à la réouverture
+    db = MemoryDB(path)
+    try:
+        g = get_goal(db, "Préparer la démo")
+        assert g is not None and g["id"] == goal_id("preparer la demo")
+    finally:
+        db.close()
+
+
+def test_goals_differing_by_one_word_are_not_merged(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        users, stocks = ("Créer une API REST pour la gestion des utilisateurs",
+                         "Créer une API REST pour la gestion des stocks")
+        assert hamming(text_simhash(users), text_simhash(stocks)) <= 6  # candidats LSH
+        g1 = register_goal(db, users)
+        g2 = register_goal(db, stocks)
+        assert g2["cluster"] == g2["id"] and g2["near"] == g1["id"]
+        assert goal_variants(db, stocks) == [stocks]
+
+        db.add_event("agent_step", "info", users, {"step": 1})
+        steps, _ = _load_context(db, stocks, max_steps=5)
+        assert steps == []
+    finally:
+        db.close()
+
+
+def test_loose_clusters_split_on_migration(tmp_path: Path):
+    path = tmp_path / "mem.db"
+    db = MemoryDB(path)
+    try:
+        g1 = register_goal(db, "Créer une API REST pour la gestion des utilisateurs")
+        g2 = register_goal(db, "Créer une API REST pour la gestion des stocks")
+        g3 = register_goal(db, "créer une API REST pour la gestion de l'utilisateur")
+        assert g3["cluster"] == g1["id"]
+        # fusion faite par une version qui ne regardait que SimHash
+        db.conn.execute("UPDATE goals SET cluster=?, near=NULL WHERE id=?", (g1["id"], g2["id"]))
+        db.conn.execute("UPDATE meta SET value=1 WHERE key='goals.version'")
+        db.conn.commit()
+    finally:
+        db.close()
+    dbmod._SCHEMA_READY.clear()
+    db = MemoryDB(path)
+    try:
+        assert get_goal(db, g2["id"])["cluster"] == g2["id"] and get_goal(db, g2["id"])["near"] == g1["id"]
+        assert get_goal(db, g3["id"])["cluster"] == g1["id"]
+    finally:
+        db.close()
@@ -1,6 +1,8 @@
+import pytest
 from pathlib import Path
 from neuravia.memory.db import MemoryDB
-from neuravia.memory.index import TextIndexerSimple
+from neuravia.memory.fts import has_fts5
+from neuravia.memory.index import TextIndexerSimple, open_indexer
 
 def test_simple_index_search(tmp_path: Path):
     db = MemoryDB(tmp_path / "idx.db")
@@ -13,3 +15,170 @@ def test_simple_index_search(tmp_path: Path):
         assert res and res[0][0] == "d1"
     finally:
         db.close()
+
+def test_index_bm25_reindex_and_remove(tmp_path: Path):
+    db = MemoryDB(tmp_path / "idx.db")
+    try:
+        idx = TextIndexerSimple(db)
+        idx.add("d1", "memory sqlite memory")
+        idx.add("d2", "sqlite index")
+        idx.add("d3", "unrelated words only")
+        res = idx.search("memory", top_k=5)
+        assert [d for d, _ in res] == ["d1"]  # seuls les docs contenant le terme
+
+        idx.add("d1", "vision ocr")  # ré-indexation : les anciens postings disparaissent
+        assert idx.search("memory") == []
+        assert idx.search("ocr")[0][0] == "d1"
+
+        assert db.index_remove_document("d1") is True
+        assert idx.search("ocr") == []
+        assert db.conn.execute("SELECT value FROM index_stats WHERE key='doc_count'").fetchone()[0] == 2
+    finally:
+        db.close()
+
+def test_index_migrates_legacy_table(tmp_path: Path):
+    import sqlite3
+    path = tmp_path / "legacy.db"
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE index_docs (doc_id TEXT PRIMARY KEY, text TEXT NOT NULL, tokens TEXT NOT NULL)")
+    con.execute("INSERT INTO index_docs VALUES ('old', 'legacy quick fox', 'legacy quick fox')")
+    con.commit()
+    con.close()
+
+    db = MemoryDB(path)
+    try:
+        assert TextIndexerSimple(db).search("fox")[0][0] == "old"
+    finally:
+        db.close()
+
+@pytest.mark.skipif(not has_fts5(), reason="SQLite sans FTS5")
+def test_fts5_engine_accents_and_snippets(tmp_path: Path):
+    db = MemoryDB(tmp_path / "fts.db")
+    try:
+        idx = TextIndexerSimple(db, engine="fts5")
+        idx.add("s1", "Définir une étape de vérification des résultats")
+        idx.add("s2", "Préparer le déploiement sur le serveur")
+        idx.add("s1", "Rédiger une étape de vérification des résultats")  # remplacement
+        res = idx.search("etape verification", top_k=5)
+        assert [d for d, _ in res] == ["s1"]
+        hits = idx.search_snippets("deploiement")
+        assert hits[0]["doc_id"] == "s2" and "[déploiement]" in hits[0]["snippet"]
+        assert idx.remove("s2") is True
+        assert idx.search("deploiement") == []
+    finally:
+        db.close()
+
+def test_open_indexer_follows_memory_settings(tmp_path: Path):
+    from neuravia.config import Memory
+    db = MemoryDB(tmp_path / "cfg.db")
+    try:
+        assert open_indexer(db, Memory(index_enabled=False)) is None
+        idx = open_indexer(db, Memory(index_enabled=True, index_engine="simple"))
+        idx.add("d1", "quick fox")
+        assert idx.search_snippets("fox")[0]["snippet"] == "quick [fox]"
+    finally:
+        db.close()
+
+def test_tokenizer_folds_accents_and_stems():
+    from neuravia.memory.tokens import tokenize
+    assert tokenize("Étape déjà : cœur MÉMOIRE v2") == ["etape", "deja", "coeur", "memoire", "v2"]
+    assert tokenize("recherches rechercher chevaux", stem=True) == ["recherch", "recherch", "cheval"]
+
+def test_index_stores_packed_term_ids(tmp_path: Path):
+    db = MemoryDB(tmp_path / "ids.db")
+    try:
+        idx = TextIndexerSimple(db)
+        idx.add("d1", "mémoire sqlite mémoire")
+        terms = db.index_doc_terms("d1")
+        assert list(terms) == sorted(terms) and len(terms) == 2
+        names = {tid: t for t, tid in db.conn.execute("SELECT term, term_id FROM index_terms")}
+        assert {names[t] for t in terms} == {"memoire", "sqlite"}
+        assert idx.search("memoire")[0][0] == "d1"  # accents repliés côté requête comme côté document
+        assert db.index_doc_terms("absent") is None
+    finally:
+        db.close()
+
+def test_index_stemming_setting_triggers_rebuild(tmp_path: Path):
+    from neuravia.config import Memory
+    path = tmp_path / "stem.db"
+    db = MemoryDB(path)
+    try:
+        idx = open_indexer(db, Memory(index_enabled=True))
+        idx.add("d1", "Rechercher les étapes")
+        assert idx.search("recherches") == []
+        idx = open_indexer(db, Memory(index_enabled=True, index_stemming=True))
+        assert idx.search("recherches")[0][0] == "d1"
+        assert idx.search_snippets("recherches")[0]["snippet"] == "[Rechercher] les étapes"
+    finally:
+        db.close()
+    db = MemoryDB(path)  # réglage conservé par la base
+    try:
+        assert TextIndexerSimple(db).search("étape")[0][0] == "d1"
+    finally:
+        db.close()
+
+def test_index_migrates_text_tokens_column(tmp_path: Path):
+    import sqlite3
+    path = tmp_path / "v1.db"
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE index_docs (id INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, text TEXT NOT NULL, "
+                "tokens TEXT NOT NULL, length INTEGER NOT NULL DEFAULT 0)")
+    con.execute("INSERT INTO index_docs(doc_id, text, tokens, length) VALUES ('v1', 'Vérification rapide', 'v rification rapide', 3)")
+    con.commit()
+    con.close()
+    db = MemoryDB(path)
+    try:
+        assert "terms" in db._columns("index_docs") and "tokens" not in db._columns("index_docs")
+        assert TextIndexerSimple(db).search("verification")[0][0] == "v1"
+    finally:
+        db.close()
+
+def test_index_add_documents_matches_one_by_one(tmp_path: Path):
+    docs = [(f"d{i}", f"sqlite mémoire étape {i} " + "index " * (i % 4)) for i in range(60)]
+    one = MemoryDB(tmp_path / "one.db")
+    bulk = MemoryDB(tmp_path / "bulk.db")
+    try:
+        for d, t in docs:
+            one.index_add_document(d, t)
+        assert bulk.index_add_documents(docs + [("d0", "remplacé")], batch_size=16, processes=2) == 61
+        one.index_add_document("d0", "remplacé")
+        for q in ("index", "etape 7", "remplace"):
+            assert bulk.index_search(q, top_k=10) == one.index_search(q, top_k=10)
+        stats = "SELECT key, value FROM index_stats ORDER BY key"
+        assert bulk.conn.execute(stats).fetchall() == one.conn.execute(stats).fetchall()
+        terms = "SELECT term, df FROM index_terms WHERE df > 0 ORDER BY term"
+        assert bulk.conn.execute(terms).fetchall() == one.conn.execute(terms).fetchall()
+    finally:
+        one.close()
+        bulk.close()
+
+@pytest.mark.parametrize("engine", ["simple", "fts5"])
+def test_indexer_syncs_new_events_incrementally(tmp_path: Path, engine: str):
+    if engine == "fts5" and not has_fts5():
+        pytest.skip("SQLite sans FTS5")
+    db = MemoryDB(tmp_path / f"ev-{engine}.db")
+    try:
+        idx = TextIndexerSimple(db, engine=engine, events=True)
+        sid = db.add_event("agent_step", "info", "goal", {"title": "Configurer la sauvegarde", "action": "cron"})
+        db.add_event("unit", "info", "sauvegarde ignorée")  # kind non indexé
+        assert [d for d, _ in idx.search("sauvegarde")] == [f"event:{sid}"]
+        assert idx.sync_events() == 0  # filigrane : rien de nouveau
+        mid = db.add_event("agent_masterplan", "info", "goal",
+                           {"steps": [{"title": "Restaurer la sauvegarde", "action": "tester"}], "notes": "hebdo"})
+        assert {d for d, _ in idx.search("sauvegarde")} == {f"event:{sid}", f"event:{mid}"}
+        assert db.get_meta(f"index.{engine}.events_id") == mid
+    finally:
+        db.close()
+
+def test_retention_forgets_indexed_events(tmp_path: Path):
+    from neuravia.memory.retention import apply_retention
+    db = MemoryDB(tmp_path / "ret.db")
+    try:
+        db.add_events_many([{"kind": "agent_step", "level": "info", "message": "g",
+                             "data": {"title": "vieille étape"}, "ts": "2020-01-01T00:00:00Z"}])
+        idx = TextIndexerSimple(db, events=True)
+        assert idx.search("vieille")
+        apply_retention(db, {"agent_step": 30}, archive_dir=tmp_path / "arch")
+        assert idx.search("vieille") == []
+    finally:
+        db.close()
@@ -0,0 +1,32 @@
+import sqlite3
+import threading
+from pathlib import Path
+import pytest
+from neuravia.memory.db import MemoryDB
+from neuravia.memory.pool import MemoryDBPool
+
+def test_pool_reuses_per_thread_connections(tmp_path: Path):
+    pool = MemoryDBPool(tmp_path / "pool.db")
+    try:
+        rw = pool.get()
+        assert pool.get() is rw
+        ro = pool.get(readonly=True)
+        assert ro is not rw and pool.get(readonly=True) is ro
+
+        rw.add_event("unit", "info", "hello")
+        assert ro.list_events(kind="unit")[0]["message"] == "hello"  # lecture voit le commit
+        with pytest.raises(sqlite3.OperationalError):
+            ro.add_event("unit", "info", "interdit")
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(pool.get(readonly=True)))
+        t.start(); t.join()
+        assert other[0] is not ro
+    finally:
+        pool.close_all()
+    assert pool.get(readonly=True) is not ro  # rouvre après close_all
+    pool.close_all()
+
+def test_readonly_requires_existing_db(tmp_path: Path):
+    with pytest.raises(sqlite3.OperationalError):
+        MemoryDB(tmp_path / "absent.db", readonly=True).list_events()
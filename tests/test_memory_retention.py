@@ -0,0 +1,79 @@
+from pathlib import Path
+from neuravia.memory.db import MemoryDB, to_epoch
+from neuravia.memory import cli
+from neuravia.memory.retention import apply_retention, archive_path, compact, historical_events
+
+NOW = to_epoch("2025-03-15T00:00:00Z")
+
+def _seed(db: MemoryDB) -> None:
+    rows = [
+        ("agent_step", "2025-01-10T00:00:00Z", "old step"),
+        ("agent_step", "2025-02-20T00:00:00Z", "recent step"),
+        ("unit", "2025-01-05T00:00:00Z", "old unit"),
+        ("agent_review", "2024-12-01T00:00:00Z", "kept forever"),
+    ]
+    db.add_events_many([(kind, "info", msg, {"big": msg * 200}, ts) for kind, ts, msg in rows])
+
+def test_retention_archives_monthly_and_gc_blobs(tmp_path: Path):
+    db = MemoryDB(tmp_path / "m.db")
+    try:
+        _seed(db)
+        assert db.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 4
+        policy = {"agent_step": 30, "agent_review": 0, "*": 60}
+        stats = apply_retention(db, policy, archive_dir=tmp_path / "arch", now=NOW)
+        assert stats["events"] == 2 and stats["blobs"] == 2
+        assert stats["archives"] == [str(archive_path(tmp_path / "arch", "2025-01"))]
+        assert sorted(e["message"] for e in db.list_events()) == ["kept forever", "recent step"]
+        assert db.counts()["events"] == 2
+        # rejouer ne fait rien
+        assert apply_retention(db, policy, archive_dir=tmp_path / "arch", now=NOW)["events"] == 0
+
+        hist = historical_events(db, "2024-12-01T00:00:00Z", "2025-03-01T00:00:00Z", archive_dir=tmp_path / "arch")
+        assert [e["message"] for e in hist] == ["kept forever", "old unit", "old step", "recent step"]
+        # archive autonome : textes réintégrés, sans référence à `blobs`
+        assert hist[1]["data"]["big"] == "old unit" * 200
+        assert [e["message"] for e in historical_events(
+            db, "2025-01-01T00:00:00Z", "2025-02-01T00:00:00Z", kind="agent_step", archive_dir=tmp_path / "arch")] == ["old step"]
+    finally:
+        db.close()
+
+def test_compact_reclaims_space(tmp_path: Path):
+    db = MemoryDB(tmp_path / "c.db", blob_threshold=0)
+    try:
+        db.add_events_many([("bulk", "info", "x" * 2000, None, "2020-01-01T00:00:00Z") for _ in range(500)])
+        apply_retention(db, {"bulk": 1}, archive_dir=tmp_path / "arch")
+        sizes = compact(db)
+        assert sizes["reclaimed"] > 500_000
+        assert db.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    finally:
+        db.close()
+
+def test_cli_compact(tmp_path: Path, capsys):
+    path = tmp_path / "cli.db"
+    db = MemoryDB(path)
+    try:
+        db.add_events_many([("unit", "info", "old", None, "2020-06-01T00:00:00Z")])
+    finally:
+        db.close()
+    rc = cli.main(["compact", "--db", str(path), "--ttl", "*=30", "--archive-dir", str(tmp_path / "arch")])
+    out = capsys.readouterr().out
+    assert rc == 0 and "1 events archivés" in out and "récupérés" in out
+    assert archive_path(tmp_path / "arch", "2020-06").exists()
+
+def test_retention_with_running_writer(tmp_path: Path):
+    from neuravia.memory.index import sync_event_index
+    from neuravia.memory.writer import MemoryWriter
+    path = tmp_path / "m.db"
+    MemoryDB(path, writer="").close()
+    with MemoryWriter(path, busy_timeout=2.0) as writer:
+        db = MemoryDB(path, writer=writer.address, busy_timeout=2.0)
+        try:
+            _seed(db)
+            assert sync_event_index(db) == 3 and db.delegates_writes
+            stats = apply_retention(db, {"agent_step": 30, "agent_review": 0, "*": 60}, archive_dir=tmp_path / "arch", now=NOW)
+            assert stats["events"] == 2
+            assert [d for d, _ in db.index_search("step", top_k=5)] == ["event:2"]
+            db.add_event("unit", "info", "après compact")  # le writer reprend la main
+            assert db.counts()["events"] == 3
+        finally:
+            db.close()
@@ -0,0 +1,100 @@
+import gzip
+import json
+from pathlib import Path
+import pytest
+from neuravia.memory import cli
+from neuravia.memory.db import MemoryDB
+from neuravia.memory.transfer import export_memory, import_memory, has_pyarrow
+
+def _seed(path: Path) -> None:
+    db = MemoryDB(path)
+    try:
+        db.add_events_many([("agent_step", "info", f"goal {i}", {"i": i, "long": "é" * 1000}, f"2025-01-0{1 + i % 5}T00:00:00Z")
+                            for i in range(25)])
+        db.add_action("plan", "ok", {"a": 1}, {"b": 2})
+        db.add_artifact("out.txt", {"size": 4}, content_bytes=b"data")
+        db.index_add_document("doc:1", "mémoire persistante et recherche")
+        db.index_add_documents((f"doc:{i}", f"recherche en mémoire, note {i}") for i in range(2, 14))
+    finally:
+        db.close()
+
+def _dump(path: Path) -> dict:
+    db = MemoryDB(path)
+    try:
+        return {
+            "events": [(e["ts"], e["kind"], e["message"], e["data"]) for e in db.iter_events()],
+            "actions": db.conn.execute("SELECT ts, name, status, input, output FROM actions ORDER BY id").fetchall(),
+            "artifacts": db.conn.execute("SELECT ts, path, sha256, meta FROM artifacts ORDER BY id").fetchall(),
+            "search": db.index_search("recherche", top_k=20),
+            "docs": db.conn.execute("SELECT doc_id, text, length FROM index_docs ORDER BY doc_id").fetchall(),
+        }
+    finally:
+        db.close()
+
+@pytest.mark.parametrize("fmt", ["jsonl", "parquet"])
+def test_export_import_roundtrip(tmp_path: Path, fmt: str):
+    if fmt == "parquet" and not has_pyarrow():
+        pytest.skip("pyarrow non installé")
+    src, dst = tmp_path / "src.db", tmp_path / "dst.db"
+    _seed(src)
+    seen = []
+    db = MemoryDB(src)
+    try:
+        counts = export_memory(db, tmp_path / "exp", fmt=fmt, batch_size=7, progress=lambda t, n: seen.append((t, n)))
+    finally:
+        db.close()
+    assert counts == {"events": 25, "actions": 1, "artifacts": 1, "index_docs": 13}
+    assert ("events", 7) in seen and ("events", 25) in seen
+
+    db = MemoryDB(dst)
+    try:
+        assert import_memory(db, tmp_path / "exp", batch_size=10) == counts
+        assert db.counts()["events"] == 25
+    finally:
+        db.close()
+    assert _dump(dst) == _dump(src)
+
+def test_export_jsonl_inlines_blobs(tmp_path: Path):
+    src = tmp_path / "src.db"
+    _seed(src)
+    db = MemoryDB(src)
+    try:
+        export_memory(db, tmp_path / "exp", tables=["events"])
+    finally:
+        db.close()
+    with gzip.open(tmp_path / "exp" / "events.jsonl.gz", "rt", encoding="utf-8") as f:
+        first = json.loads(f.readline())
+    assert first["data"]["long"] == "é" * 1000
+    assert json.loads((tmp_path / "exp" / "manifest.json").read_text())["tables"] == {"events": 25}
+
+def test_cli_export_import(tmp_path: Path, capsys):
+    src, dst = tmp_path / "src.db", tmp_path / "dst.db"
+    _seed(src)
+    assert cli.main(["export", str(tmp_path / "exp"), "--db", str(src)]) == 0
+    assert cli.main(["import", str(tmp_path / "exp"), "--db", str(dst), "--table", "events", "--quiet"]) == 0
+    captured = capsys.readouterr()
+    assert "events=25" in captured.out and "events:" in captured.err
+    assert _dump(dst)["events"] == _dump(src)["events"]
+
+def test_import_does_not_overwrite_local_event_documents(tmp_path: Path):
+    from neuravia.memory.index import sync_event_index
+    src, dst = tmp_path / "src.db", tmp_path / "dst.db"
+    db = MemoryDB(src)
+    try:
+        db.add_event("agent_step", "info", "Planifier la sauvegarde", {"step": 1, "content": "sauvegarde nocturne"})
+        assert sync_event_index(db) == 1
+        export_memory(db, tmp_path / "exp")
+    finally:
+        db.close()
+
+    db = MemoryDB(dst)
+    try:
+        local = db.add_event("agent_step", "info", "Rédiger le guide", {"step": 1, "content": "documentation"})
+        assert local == 1 and sync_event_index(db) == 1
+        import_memory(db, tmp_path / "exp")
+        assert [d for d, _ in db.index_search("documentation")] == ["event:1"]
+        assert db.index_search("sauvegarde") == []
+        assert sync_event_index(db) == 1
+        assert [d for d, _ in db.index_search("sauvegarde")] == ["event:2"]
+    finally:
+        db.close()
@@ -0,0 +1,79 @@
+from pathlib import Path
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from neuravia.memory.db import MemoryDB
+from neuravia.memory.vectors import HashingEmbedder, VectorStore
+
+def test_hashing_embedder_is_normalized_and_deterministic():
+    emb = HashingEmbedder(dim=64)
+    a = emb.embed("installer le serveur web")
+    assert a.dtype == np.float32 and a.shape == (64,)
+    assert abs(float(np.linalg.norm(a)) - 1.0) < 1e-5
+    assert np.array_equal(a, emb.embed("installer le serveur web"))
+
+def test_vector_store_topk_and_incremental_append(tmp_path: Path):
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        store = VectorStore(db)
+        assert store.path == tmp_path / "mem.vectors.npy"
+        store.add_many([
+            ("d1", "configure the web server and the firewall"),
+            ("d2", "write unit tests for the parser"),
+            ("d3", "benchmark sqlite memory queries"),
+        ])
+        assert store.add("d1", "ignored: already present") == 0  # ligne existante
+        size = store.path.stat().st_size
+        store.add("d4", "deploy the web server behind a proxy")
+        # ajout en fin de fichier, en-tête de taille fixe
+        assert store.path.stat().st_size == size + store.dim * 4
+        assert np.load(store.path, mmap_mode="r").shape == (4, store.dim)
+
+        res = store.search("web server", top_k=2)
+        assert {r for r, _ in res} == {"d1", "d4"}
+        assert res[0][1] >= res[1][1]
+    finally:
+        db.close()
+
+    db = MemoryDB(tmp_path / "mem.db")
+    try:
+        store = VectorStore(db)
+        assert len(store) == 4
+        assert store.search("unit tests parser", top_k=1)[0][0] == "d2"
+    finally:
+        db.close()
+
+def _add_vectors(db_path: str, worker: int, n: int) -> None:
+    db = MemoryDB(db_path, writer="")
+    try:
+        store = VectorStore(db)
+        for i in range(n):
+            store.add(f"w{worker}-{i}", f"processus {worker} texte {i} mot{worker * 1000 + i}")
+            store.add(f"commun-{i}", f"texte partagé {i}")  # même ref ajoutée par tous les processus
+    finally:
+        db.close()
+
+def test_concurrent_writers_keep_rows_and_refs_aligned(tmp_path: Path):
+    import multiprocessing as mp
+    db_path = tmp_path / "mem.db"
+    VectorStore(MemoryDB(db_path)).db.close()
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=_add_vectors, args=(str(db_path), w, 60)) for w in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=120)
+    assert all(p.exitcode == 0 for p in procs)
+
+    db = MemoryDB(db_path)
+    try:
+        store = VectorStore(db)
+        assert len(store) == 3 * 60 + 60
+        mat = store.matrix()
+        for row, ref in db.conn.execute("SELECT row, ref FROM vectors"):
+            w, _, i = ref.partition("-")
+            text = f"texte partagé {i}" if w == "commun" else f"processus {w[1:]} texte {i} mot{int(w[1:]) * 1000 + int(i)}"
+            assert np.array_equal(mat[row], store.embedder.embed(text)), ref
+    finally:
+        db.close()
@@ -0,0 +1,151 @@
+import multiprocessing as mp
+import threading
+import time
+from pathlib import Path
+from neuravia.memory.db import MemoryDB
+from neuravia.memory.writer import MemoryWriter, WriterClient, read_authkey
+
+N_PROCS = 4
+N_EVENTS = 200
+
+def _write_events(db_path: str, writer: str, worker: int) -> None:
+    db = MemoryDB(db_path, writer=writer)
+    try:
+        for i in range(N_EVENTS):
+            db.add_event("stress", "info", f"w{worker}-{i}", {"i": i})
+    finally:
+        db.close()
+
+def _stress(db_path: Path, writer: str) -> float:
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=_write_events, args=(str(db_path), writer, w)) for w in range(N_PROCS)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+    elapsed = time.perf_counter() - t0
+    assert all(p.exitcode == 0 for p in procs)
+    db = MemoryDB(db_path, writer="")
+    try:
+        messages = [m for (m,) in db.conn.execute("SELECT message FROM events WHERE kind='stress'")]
+    finally:
+        db.close()
+    assert sorted(messages) == sorted(f"w{w}-{i}" for w in range(N_PROCS) for i in range(N_EVENTS))
+    return N_PROCS * N_EVENTS / elapsed
+
+def test_writer_process_stress_no_lost_events(tmp_path: Path):
+    db_path = tmp_path / "stress.db"
+    with MemoryWriter(db_path) as writer:
+        rate = _stress(db_path, writer.address)
+        assert writer.stats["ops"] == N_PROCS * N_EVENTS
+        assert writer.stats["commits"] <= writer.stats["ops"]
+    print(f"writer unique : {rate:.0f} events/s")
+    assert rate > 50
+
+def test_direct_writers_wait_instead_of_locking(tmp_path: Path):
+    db_path = tmp_path / "direct.db"
+    MemoryDB(db_path).close()
+    rate = _stress(db_path, "")  # sans writer : busy_timeout + retries
+    print(f"écrivains directs : {rate:.0f} events/s")
+
+def test_writer_client_roundtrip_and_errors(tmp_path: Path):
+    db_path = tmp_path / "rt.db"
+    with MemoryWriter(db_path) as writer:
+        client = WriterClient(writer.address, db_path=db_path)
+        try:
+            assert client.ping()
+            eid = client.add_event("unit", "info", "hello", {"text": "x" * 2000})
+            assert client.add_events_many([("unit", "info", "a"), {"kind": "unit", "level": "info", "message": "b"}]) == 2
+            assert client.add_action("plan", "ok", {"a": 1}) > 0
+            assert client.add_artifact("out.txt", {"n": 1}, content_bytes=b"data") > 0
+            try:
+                client._call("event", "unit")  # arguments manquants : erreur renvoyée, connexion intacte
+            except RuntimeError as e:
+                assert "TypeError" in str(e)
+            else:
+                raise AssertionError("RuntimeError attendue")
+            assert client.ping()
+            # le 1er event a déjà écrit son blob quand le 2e échoue : rien ne doit rester
+            try:
+                client.add_events_many([("unit", "info", "partiel", {"text": "y" * 2000}), ("unit",)])
+            except RuntimeError as e:
+                assert "TypeError" in str(e)
+            else:
+                raise AssertionError("RuntimeError attendue")
+        finally:
+            client.close()
+        db = MemoryDB(db_path, writer="")
+        try:
+            assert db.get_events([eid])[0]["data"]["text"] == "x" * 2000
+            assert db.counts()["events"] == 3 and db.counts()["actions"] == 1
+            assert db.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+            assert db.list_events(goal="partiel") == []
+        finally:
+            db.close()
+        authkey = read_authkey(db_path)
+    assert not Path(writer.address).exists()
+    assert len(authkey) == 32
+
+def test_retry_on_locked_database(tmp_path: Path):
+    db_path = tmp_path / "lock.db"
+    holder = MemoryDB(db_path, check_same_thread=False)
+    db = MemoryDB(db_path, busy_timeout=0.05, lock_retries=10)
+    try:
+        holder.conn.execute("BEGIN IMMEDIATE")
+        holder.conn.execute("INSERT INTO meta(key, value) VALUES ('x', 1)")
+        threading.Timer(0.3, holder.conn.commit).start()
+        assert db.add_event("unit", "info", "after lock") > 0
+        failing = MemoryDB(db_path, busy_timeout=0.01, lock_retries=0)
+        holder.conn.execute("BEGIN IMMEDIATE")
+        try:
+            failing.add_event("unit", "info", "no retry")
+        except Exception as e:
+            assert "locked" in str(e)
+        else:
+            raise AssertionError("verrou attendu")
+        finally:
+            holder.conn.rollback()
+            failing.close()
+    finally:
+        db.close()
+        holder.close()
+
+def test_missing_writer_falls_back_to_direct_writes(tmp_path: Path, capsys):
+    db_path = tmp_path / "nowriter.db"
+    db = MemoryDB(db_path, writer="auto")  # aucun writer lancé : l'ouverture ne doit pas échouer
+    try:
+        assert db.list_events() == []
+        assert db.add_event("unit", "info", "direct") > 0
+        assert not db.delegates_writes
+    finally:
+        db.close()
+    assert "écriture directe" in capsys.readouterr().err
+
+def test_derived_writes_are_routed_through_writer(tmp_path: Path):
+    from neuravia.memory.dedupe import find_near_duplicates
+    from neuravia.memory.goals import get_goal, register_goal, set_project
+    from neuravia.memory.index import TextIndexerSimple
+    from neuravia.memory.retrieval import semantic_events
+    from neuravia.memory.vectors import has_numpy
+    db_path = tmp_path / "routed.db"
+    with MemoryWriter(db_path) as writer:
+        db = MemoryDB(db_path, writer=writer.address)
+        try:
+            db.add_event("agent_step", "info", "g", {"title": "Installer le serveur web", "action": "apt install nginx"})
+            assert register_goal(db, "g", project="p")["project"] == "p"
+            assert set_project(db, "g", "q") == 1
+            db.set_meta("unit.mark", 7)
+            index = TextIndexerSimple(db, stem=True, events=True)
+            assert index.search("serveur")[0][0].startswith("event:")
+            assert find_near_duplicates(db, "Installer le serveur web : apt install nginx", goal="g")
+            if has_numpy():
+                hits = semantic_events(db, "serveur web", kinds=["agent_step"], top_k=3, mode="ann")
+                assert [e["message"] for e in hits] == ["g"]
+            # tout a été écrit par le writer : la connexion du client n'a rien modifié
+            assert db.conn.total_changes == 0
+            assert get_goal(db, "g")["project"] == "q" and db.get_meta("unit.mark") == 7
+            assert db.get_meta("steps.events_id") > 0 and db.get_meta("index.simple.events_id") > 0
+        finally:
+            db.close()
+        assert writer.stats["ops"] >= 6
@@ -27,3 +27,83 @@ def test_api_health_and_stats(tmp_path: Path):
     r = client.get("/")
     assert r.status_code == 200
     assert "Neuravia" in r.text
+
+def test_api_uses_pooled_connections(tmp_path: Path):
+    db_path = tmp_path / "pool.db"
+    app = create_app(str(db_path), sandbox_path=str(tmp_path/"sandbox"), log_dir=str(tmp_path/"logs"))
+    with TestClient(app) as client:  # lifespan : schéma à l'ouverture, fermeture à l'arrêt
+        assert client.get("/api/stats").json()["events"] == 0
+        db = MemoryDB(db_path)
+        db.add_event("unit", "info", "later")
+        db.close()
+        assert client.get("/api/stats").json()["events"] == 1
+        assert client.get("/api/events").json()[0]["message"] == "later"
+        assert app.state.db_pool._opened
+    assert app.state.db_pool._opened == []
+
+def test_api_events_cursor_pagination(tmp_path: Path):
+    db_path = tmp_path / "page.db"
+    db = MemoryDB(db_path)
+    try:
+        ids = [db.add_event("unit", "info", f"m{i}") for i in range(5)]
+    finally:
+        db.close()
+    client = TestClient(create_app(str(db_path), sandbox_path=str(tmp_path/"sandbox"), log_dir=str(tmp_path/"logs")))
+
+    page = client.get("/api/events/page", params={"limit": 2}).json()
+    assert [e["id"] for e in page["items"]] == [ids[4], ids[3]]
+    page = client.get("/api/events/page", params={"limit": 2, "cursor": page["next_cursor"]}).json()
+    assert [e["id"] for e in page["items"]] == [ids[2], ids[1]]
+    page = client.get("/api/events/page", params={"limit": 2, "cursor": page["next_cursor"]}).json()
+    assert [e["id"] for e in page["items"]] == [ids[0]] and page["next_cursor"] is None
+
+    page = client.get("/api/events/page", params={"limit": 3, "order": "asc", "cursor": ids[1]}).json()
+    assert [e["id"] for e in page["items"]] == ids[2:]
+
+def test_api_stats_kinds(tmp_path: Path):
+    db_path = tmp_path / "kinds.db"
+    db = MemoryDB(db_path)
+    try:
+        db.add_event("agent_step", "info", "g")
+        db.add_event("agent_step", "info", "g")
+        db.add_event("agent_review", "warn", "g")
+    finally:
+        db.close()
+    client = TestClient(create_app(str(db_path), sandbox_path=str(tmp_path/"sandbox"), log_dir=str(tmp_path/"logs")))
+    js = client.get("/api/stats/kinds").json()
+    assert js["events_by_kind"] == {"agent_review": 1, "agent_step": 2}
+    assert js["events_by_level"] == {"info": 2, "warn": 1}
+
+def test_api_activity_histogram(tmp_path: Path):
+    db_path = tmp_path / "act.db"
+    db = MemoryDB(db_path)
+    try:
+        for _ in range(3):
+            db.add_event("unit", "info", "tick")
+        db.add_event("other", "info", "tock")
+    finally:
+        db.close()
+    client = TestClient(create_app(str(db_path), sandbox_path=str(tmp_path/"sandbox"), log_dir=str(tmp_path/"logs")))
+    js = client.get("/api/activity", params={"bucket": "hour"}).json()
+    assert js["seconds"] == 3600 and sum(p["n"] for p in js["series"]) == 4
+    js = client.get("/api/activity", params={"bucket": "minute", "kind": "unit"}).json()
+    assert sum(p["n"] for p in js["series"]) == 3
+    assert client.get("/api/activity", params={"bucket": "day"}).status_code == 422
+
+def test_api_goals_and_projects(tmp_path: Path):
+    from neuravia.memory.goals import register_goal
+    db_path = tmp_path / "goals.db"
+    db = MemoryDB(db_path)
+    try:
+        g = register_goal(db, "Analyser les logs du serveur", project="infra")
+        register_goal(db, "analyser le log du serveur")
+        db.add_event("agent_step", "info", "analyser le log du serveur", {"step": 1})
+    finally:
+        db.close()
+    client = TestClient(create_app(str(db_path), sandbox_path=str(tmp_path/"sandbox"), log_dir=str(tmp_path/"logs")))
+    assert client.get("/api/projects").json() == [{"project": "infra", "goals": 1}]
+    goals = client.get("/api/goals", params={"project": "infra"}).json()
+    assert [x["id"] for x in goals] == [g["id"]] and len(goals[0]["variants"]) == 2
+    js = client.get(f"/api/goals/{g['id']}").json()
+    assert js["text"] == "Analyser les logs du serveur" and len(js["events"]) == 1
+    assert client.get("/api/goals/inconnu").status_code == 404